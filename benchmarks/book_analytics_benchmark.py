@@ -0,0 +1,103 @@
+"""
+Order-book analytics benchmark: streams random L2 deltas into a set of deep
+local books (one per watch slot) and times the depth metrics after every
+update, incrementally via DepthAnalytics and by recomputing them from plain
+level lists.
+
+    python benchmarks/book_analytics_benchmark.py --books 10 --depth 500
+"""
+import os, sys, time, math, random, argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from services.order_book import LocalOrderBook
+
+BANDS_PCT = (0.1, 0.5, 1.0)
+NOTIONAL = 50_000
+TICK = 0.5
+
+def make_book(symbol, depth, rng):
+    book = LocalOrderBook(symbol, max_depth=depth)
+    mid = 60_000 + rng.uniform(-500, 500)
+    bids = [[round(mid - (i + 1) * TICK, 1), rng.uniform(0.01, 3)] for i in range(depth)]
+    asks = [[round(mid + (i + 1) * TICK, 1), rng.uniform(0.01, 3)] for i in range(depth)]
+    book.apply_snapshot(bids, asks, seq=0)
+    return book
+
+def random_delta(book, rng, levels):
+    """
+    A delta touching `levels` price levels per side, mostly near the top.
+    """
+    deltas = []
+    for side in (book.bids, book.asks):
+        best = side.prices[0] if len(side) else 60_000
+        step = -TICK if side.descending else TICK
+        changes = []
+        for _ in range(levels):
+            offset = min(int(rng.expovariate(1 / 20)), side.max_depth - 1)
+            qty = 0 if rng.random() < 0.2 else rng.uniform(0.01, 3)
+            changes.append([round(best + offset * step, 1), qty])
+        deltas.append(changes)
+    return deltas
+
+def naive_summary(bids, asks):
+    """
+    The same metrics recomputed from [price, qty] lists on every update.
+    """
+    mid = (bids[0][0] + asks[0][0]) / 2
+    scale = mid * 0.5 / 100
+    w_bid = sum(q * math.exp((p - mid) / scale) for p, q in bids)
+    w_ask = sum(q * math.exp((mid - p) / scale) for p, q in asks)
+    depth = {}
+    for pct in BANDS_PCT:
+        depth[pct] = (
+            sum(q for p, q in bids if p >= mid * (1 - pct / 100)),
+            sum(q for p, q in asks if p <= mid * (1 + pct / 100))
+        )
+    slippage = {}
+    for name, levels in (('buy', asks), ('sell', bids)):
+        left, qty = NOTIONAL, 0.0
+        for p, q in levels:
+            take = min(left, p * q)
+            qty += take / p
+            left -= take
+            if left <= 0: break
+        slippage[name] = NOTIONAL / qty if left <= 0 else None
+    return (w_bid - w_ask) / (w_bid + w_ask), depth, slippage
+
+def run(books, deltas, summarize):
+    start = time.perf_counter()
+    for slot, (bid_changes, ask_changes) in deltas:
+        book = books[slot]
+        book.apply_delta(bid_changes, ask_changes)
+        summarize(book)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=10)
+    parser.add_argument('--depth', type=int, default=500)
+    parser.add_argument('--updates', type=int, default=20_000)
+    parser.add_argument('--levels', type=int, default=4, help='levels changed per side per delta')
+    args = parser.parse_args()
+
+    results = {}
+    for name, summarize in (
+        ('incremental', lambda book: book.analytics.summary(BANDS_PCT, NOTIONAL)),
+        ('naive', lambda book: naive_summary(list(book.bids.top(args.depth)), list(book.asks.top(args.depth)))),
+        ('book only', lambda book: None)
+    ):
+        rng = random.Random(11)
+        books = [make_book(f"SYM{i}/USDT", args.depth, rng) for i in range(args.books)]
+        slots = [rng.randrange(args.books) for _ in range(args.updates)]
+        deltas = [(slot, random_delta(books[slot], rng, args.levels)) for slot in slots]
+        results[name] = run(books, deltas, summarize)
+
+    print(f"{args.books} books x {args.depth} levels, {args.updates:,} deltas of {args.levels} levels/side")
+    print(f"{'mode':>12} {'us/update':>10} {'updates/s':>11}")
+    for name, elapsed in results.items():
+        print(f"{name:>12} {elapsed / args.updates * 1e6:>10.1f} {args.updates / elapsed:>11,.0f}")
+
+if __name__ == '__main__':
+    main()
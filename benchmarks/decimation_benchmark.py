@@ -0,0 +1,68 @@
+"""
+Chart decimation benchmark: times the vertex preparation GraphCanvas does for
+the spread bars and bid/ask lines, with and without decimate_for_chart, as the
+raw row count grows. With decimation the render cost should stay flat.
+
+    python benchmarks/decimation_benchmark.py --width 1200
+"""
+import os, sys, time, argparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+from services.time_series import TimeSeries, CANDLE_COLUMNS
+from ui.trend_graph.decimation import decimate_for_chart
+from ui.trend_graph.render_batch import quad_points
+
+def make_series(rows, span_ms, rng):
+    ts = np.linspace(0, span_ms, rows).astype(np.int64)
+    mid = 100000 + np.cumsum(rng.normal(0, 5, rows))
+    spread = np.abs(rng.normal(2, 1, rows)) + 0.01
+    return TimeSeries(ts, bid=mid - spread / 2, ask=mid + spread / 2, spread=spread)
+
+def prepare_vertices(bars, bid, ask, span_ms, width):
+    """
+    The CPU side of draw_chart for one main exchange: bar quads and line points.
+    """
+    scale = width / span_ms
+    px = bars.ts * scale
+    count = len(quad_points(px - 0.6, 0, px + 0.6, bars['spread']).ravel().tolist()) // 2
+    for series, name in ((bid, 'bid'), (ask, 'ask')):
+        count += len(np.column_stack((series.ts * scale, series[name])).ravel().tolist()) // 2
+    return count
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--width', type=int, default=1200)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    span_ms = 86_400_000
+    candles = TimeSeries.empty(*CANDLE_COLUMNS)
+
+    print(f"{'rows':>10} {'raw render':>11} {'decimate':>9} {'render':>8} {'vertices':>9}")
+    for rows in args.rows:
+        db = make_series(rows, span_ms, rng)
+        raw_ms, _ = best_of(lambda: prepare_vertices(db, db, db, span_ms, args.width), args.repeat)
+        dec_ms, data = best_of(lambda: decimate_for_chart(candles, db, 0, span_ms, args.width, True), args.repeat)
+        render_ms, vertices = best_of(
+            lambda: prepare_vertices(data['db'], data['bid'], data['ask'], span_ms, args.width), args.repeat
+        )
+        print(f"{rows:>10,} {raw_ms:>9.2f}ms {dec_ms:>7.2f}ms {render_ms:>6.2f}ms {vertices:>9,}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Cold start benchmark: launches the app several times and reports the time
+from interpreter start to the first rendered frame.
+
+    python benchmarks/startup_benchmark.py --runs 5
+"""
+import os, sys, json, time, argparse, statistics, subprocess, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_once(timeout):
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = os.path.join(tmp, 'startup.json')
+        env = dict(os.environ, BITANALYZER_STARTUP_REPORT=report_path)
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, 'src/main.py'], cwd=ROOT, env=env, timeout=timeout,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        with open(report_path) as f:
+            report = json.load(f)
+        report['process_ms'] = wall_ms
+        return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    reports = []
+    for i in range(args.runs):
+        try:
+            report = run_once(args.timeout)
+        except Exception as e:
+            print(f"run {i + 1}: failed ({e})")
+            continue
+        reports.append(report)
+        print(f"run {i + 1}: first frame {report['first_frame_ms']:.0f} ms, "
+              f"clients at first frame: {report['exchange_clients'] or 'none'}")
+
+    if not reports:
+        sys.exit(1)
+
+    frames = [r['first_frame_ms'] for r in reports]
+    print(f"time-to-first-frame: median {statistics.median(frames):.0f} ms, "
+          f"min {min(frames):.0f} ms, max {max(frames):.0f} ms ({len(frames)} runs)")
+
+if __name__ == '__main__':
+    main()
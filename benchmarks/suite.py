@@ -0,0 +1,203 @@
+"""
+Offline benchmark suite for the analysis, storage and rendering hot paths,
+on synthetic order books, histories and market lists. Every case runs at a
+realistic and an extreme size; results can be saved as a JSON baseline and
+later runs compared against it.
+
+    python benchmarks/suite.py                       # run, compare to baseline if present
+    python benchmarks/suite.py --check               # exit 1 on regressions
+    python benchmarks/suite.py --update-baseline     # record a new baseline
+    python benchmarks/suite.py --only analysis --size realistic
+
+Window cases (graph.*, explorer.filter_list) need a Kivy GL window and run in
+a child process; on a headless machine run the suite under xvfb-run. Database
+cases use BENCH_MONGO_URI when set, otherwise mongomock. Baselines are
+only comparable on the machine that recorded them, so they are kept out of
+the repository.
+"""
+import os, sys, json, time, argparse, platform, statistics, subprocess
+from datetime import datetime, timezone
+
+from suite_cases import CASES, Skip
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, 'baselines', 'baseline.json')
+MIN_SAMPLE_S = 0.05
+TOLERANCE = 0.25
+
+def measure(fn, repeat):
+    """
+    Best and median time per call in ms, looping each sample up to MIN_SAMPLE_S.
+    noise is how far the median sits above the best sample, relative to it.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SAMPLE_S or loops >= 1 << 20:
+            break
+        loops *= 2
+
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    best, median = min(samples), statistics.median(samples)
+    return {'ms': best * 1000, 'median_ms': median * 1000, 'noise': median / best - 1 if best else 0.0, 'loops': loops}
+
+def run_case(name, size_name):
+    spec = CASES[name]
+    try:
+        prepared = spec['setup'](spec['sizes'][size_name])
+    except Skip as e:
+        return {'skipped': str(e)}
+    fn, backend = prepared if isinstance(prepared, tuple) else (prepared, None)
+    result = measure(fn, spec['repeat'])
+    if backend:
+        result['backend'] = backend
+    return result
+
+def run_in_child(name, size_name, timeout):
+    env = dict(os.environ, KIVY_NO_ARGS='1', KIVY_NO_CONSOLELOG='1')
+    try:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', name, size_name],
+            env=env, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {'skipped': f"timed out after {timeout:.0f}s"}
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {'skipped': f"no GL window (exit {proc.returncode})"}
+    return json.loads(lines[-1])
+
+def run_key(key, timeout):
+    name, size_name = key.rsplit('/', 1)
+    print(f"running {key}...", file=sys.stderr)
+    try:
+        if CASES[name]['window']:
+            return run_in_child(name, size_name, timeout)
+        return run_case(name, size_name)
+    except Exception as e:
+        return {'skipped': f"error: {e}"}
+
+def compare(results, baseline, tolerance):
+    """
+    Returns {key: (status, change)} for keys measured in both runs. Medians
+    are compared, and a change only counts once it exceeds the tolerance
+    plus the noise of the noisier run, so microsecond cases are not flagged
+    for jitter.
+    """
+    verdicts = {}
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base or 'median_ms' not in result or 'median_ms' not in base:
+            continue
+        if result.get('backend') != base.get('backend'):
+            continue
+        change = result['median_ms'] / base['median_ms'] - 1 if base['median_ms'] else 0.0
+        margin = tolerance + max(result.get('noise', 0.0), base.get('noise', 0.0))
+        status = 'ok'
+        if change > margin:
+            status = 'REGRESSION'
+        elif change < -margin:
+            status = 'faster'
+        verdicts[key] = (status, change)
+    return verdicts
+
+def _format_ms(ms):
+    if ms >= 100:
+        return f"{ms:,.0f}ms"
+    if ms >= 1:
+        return f"{ms:.2f}ms"
+    return f"{ms * 1000:.1f}us"
+
+def print_results(results, baseline, verdicts):
+    print(f"{'case':<42} {'time':>10} {'median':>10} {'baseline':>10} {'change':>8}  status")
+    for key, result in results.items():
+        if 'skipped' in result:
+            print(f"{key:<42} {'-':>10} {'-':>10} {'-':>10} {'-':>8}  skipped: {result['skipped']}")
+            continue
+        base = baseline.get(key, {})
+        status, change = verdicts.get(key, ('new' if key not in baseline else 'not compared', None))
+        print(f"{key:<42} {_format_ms(result['ms']):>10} {_format_ms(result['median_ms']):>10} "
+              f"{_format_ms(base['median_ms']) if 'median_ms' in base else '-':>10} "
+              f"{f'{change:+.0%}' if change is not None else '-':>8}  {status}")
+
+def machine_info():
+    import numpy
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='*', default=[], help='case name prefixes')
+    parser.add_argument('--size', choices=['realistic', 'extreme', 'all'], default='all')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help='exit 1 when a case regressed')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown, 0.25 = 25%%')
+    parser.add_argument('--output', help='also write this run to a JSON file')
+    parser.add_argument('--timeout', type=float, default=600, help='per window case, seconds')
+    parser.add_argument('--child', nargs=2, metavar=('CASE', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(*args.child)))
+        return
+
+    sizes = ['realistic', 'extreme'] if args.size == 'all' else [args.size]
+    results = {}
+    for name in CASES:
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        for size_name in sizes:
+            key = f"{name}/{size_name}"
+            results[key] = run_key(key, args.timeout)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+    verdicts = compare(results, baseline, args.tolerance)
+
+    # A slowdown only counts if a second run confirms it
+    for key, (status, _) in list(verdicts.items()):
+        if status != 'REGRESSION': continue
+        retry = run_key(key, args.timeout)
+        if retry.get('median_ms', float('inf')) < results[key]['median_ms']:
+            results[key] = retry
+    verdicts = compare(results, baseline, args.tolerance)
+    print_results(results, baseline, verdicts)
+
+    report = {'machine': machine_info(), 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        # Keep baseline entries for cases that were not run this time
+        merged = dict(baseline)
+        merged.update({k: v for k, v in results.items() if 'ms' in v})
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'machine': report['machine'], 'results': merged}, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+
+    regressions = [key for key, (status, _) in verdicts.items() if status == 'REGRESSION']
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}: {', '.join(regressions)}")
+        if args.check:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+"""
+Cases for benchmarks/suite.py. Each case builds synthetic inputs for one
+size and returns the call to time; window cases need a Kivy GL window and
+are run in a child process by the suite.
+"""
+import os, sys, random, string
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+from services.order_book import LocalOrderBook
+from services.time_series import TimeSeries
+
+CASES = {}
+QUOTES = ['KRW', 'USDT', 'USD', 'USDC', 'BUSD', 'BTC', 'ETH']
+EXCHANGES = ['Binance', 'Upbit', 'Bybit', 'Bitfinex', 'KuCoin', 'Okx', 'Kraken', 'Gate', 'Mexc', 'Bitget']
+SEARCHES = ['B', 'BT', 'BTC', 'ETH', 'DOGE', 'X', '']
+
+class Skip(Exception):
+    pass
+
+def case(name, sizes, window=False, repeat=5):
+    def register(setup):
+        CASES[name] = {'setup': setup, 'sizes': sizes, 'window': window, 'repeat': repeat}
+        return setup
+    return register
+
+# --- synthetic data ---
+
+def synthetic_book(levels, mid=95_000.0, rng=None, symbol='BTC/USDT'):
+    rng = rng or random.Random(1)
+    book = LocalOrderBook(symbol, max_depth=max(levels, 1))
+    tick = mid * 0.00001
+    book.apply_snapshot(
+        [[mid - (i + 1) * tick, rng.uniform(0.01, 3)] for i in range(levels)],
+        [[mid + (i + 1) * tick, rng.uniform(0.01, 3)] for i in range(levels)]
+    )
+    return book
+
+def synthetic_spreads(rows, end_ms, span_ms, mid=95_000.0, seed=3):
+    rng = np.random.default_rng(seed)
+    ts = np.linspace(end_ms - span_ms, end_ms, rows).astype(np.int64)
+    price = mid + np.cumsum(rng.normal(0, mid * 0.0002, rows))
+    spread = np.abs(rng.normal(mid * 0.00002, mid * 0.00001, rows)) + mid * 0.000001
+    bid, ask = price - spread / 2, price + spread / 2
+    cols = {'bid': bid, 'ask': ask, 'spread': spread}
+    for name in ('bid', 'ask', 'spread'):
+        for suffix in ('_min', '_max', '_avg'):
+            cols[name + suffix] = cols[name]
+    return TimeSeries(ts, **cols)
+
+def synthetic_candles(count, end_ms, span_ms, mid=95_000.0, seed=5):
+    rng = np.random.default_rng(seed)
+    ts = np.linspace(end_ms - span_ms, end_ms, count).astype(np.int64)
+    close = mid + np.cumsum(rng.normal(0, mid * 0.002, count))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    wick = np.abs(rng.normal(0, mid * 0.001, count))
+    return TimeSeries(ts, open=open_, high=np.maximum(open_, close) + wick,
+                      low=np.minimum(open_, close) - wick, price=close,
+                      volume=rng.uniform(1, 100, count))
+
+def synthetic_markets(count, seed=9):
+    rng = random.Random(seed)
+    bases = {'BTC', 'ETH', 'DOGE', 'XRP', 'SOL'}
+    while len(bases) * len(QUOTES) < count:
+        bases.add(''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(2, 6))))
+    pairs = [(base, quote) for base in sorted(bases) for quote in QUOTES]
+    rng.shuffle(pairs)
+    return [
+        {'symbol': f"{base}/{quote}", 'base': base, 'quote': quote, 'active': True}
+        for base, quote in pairs[:count]
+    ]
+
+def synthetic_spread_rows(count, pairs, seed=6):
+    from datetime import datetime, timezone, timedelta
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(count):
+        bid = 95_000 + rng.uniform(-50, 50)
+        ask = bid + rng.uniform(0.1, 5)
+        rows.append({'exchange': 'Binance', 'symbol': f"P{i % pairs}/USDT", 'bid': bid, 'ask': ask,
+                     'spread': ask - bid, 'timestamp': now - timedelta(seconds=count - i)})
+    return rows
+
+def graph_data(exchanges, rows, period):
+    from ui.trend_graph.constants import TIME_SPAN_MAP
+    from datetime import datetime, timezone
+    end_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+    span_ms = TIME_SPAN_MAP.get(period, 86400) * 1000
+    data = {}
+    for i, name in enumerate(EXCHANGES[:exchanges]):
+        symbol = 'BTC/KRW' if name == 'Upbit' else 'BTC/USDT'
+        mid = 95_000.0 * (1400 if symbol.endswith('KRW') else 1)
+        data[name] = {
+            'symbol': symbol,
+            'api': synthetic_candles(96, end_ms, span_ms, mid, seed=i),
+            'db': synthetic_spreads(rows, end_ms, span_ms, mid, seed=i)
+        }
+    return data
+
+# --- analysis ---
+
+@case('analysis.order_book_trend', {'realistic': 5, 'extreme': 500})
+def order_book_trend(levels):
+    from services.analysis_service import analyze_order_book_trend
+    ob = synthetic_book(levels).top(levels)
+    return lambda: analyze_order_book_trend(ob['bids'], ob['asks'])
+
+@case('analysis.depth_trend', {'realistic': 50, 'extreme': 500})
+def depth_trend(levels):
+    """
+    One small delta per call, then the depth-weighted verdict.
+    """
+    from services.analysis_service import analyze_depth_trend
+    book = synthetic_book(levels)
+    rng = random.Random(2)
+    tick = 95_000.0 * 0.00001
+    deltas = [
+        ([[95_000.0 - rng.randint(1, levels) * tick, rng.choice([0, 1.5])]],
+         [[95_000.0 + rng.randint(1, levels) * tick, rng.choice([0, 0.7])]])
+        for _ in range(1024)
+    ]
+    state = {'i': 0}
+
+    def run():
+        bids, asks = deltas[state['i'] & 1023]
+        state['i'] += 1
+        book.apply_delta(bids, asks)
+        return analyze_depth_trend(book.analytics)
+    return run
+
+@case('analysis.k_premium', {'realistic': 5, 'extreme': 500})
+def k_premium(levels):
+    from services.analysis_service import calculate_k_premium
+    upbit = synthetic_book(levels, 95_000.0 * 1400, symbol='BTC/KRW').top(levels)
+    binance = synthetic_book(levels).top(levels)
+    return lambda: calculate_k_premium(upbit, binance, 1400.0)
+
+@case('analysis.premium_matrix', {'realistic': 2, 'extreme': 100})
+def premium_matrix(slots):
+    """
+    The tracker's analysis label: the matrix plus calculate_k_premium on its KRW/USDT pair.
+    """
+    from services.analysis_service import describe_premium_matrix
+    from services.premium_matrix import FxTable, build_premium_matrix
+    fx = FxTable(ttl=float('inf'))
+    fx.set_cross('KRW', 1400.0, now=0)
+    rng = random.Random(4)
+    entries = []
+    for i in range(slots):
+        symbol = 'BTC/KRW' if i % 2 == 0 else 'BTC/USDT'
+        mid = 95_000.0 * (1400 if symbol.endswith('KRW') else 1) * rng.uniform(0.99, 1.03)
+        entries.append({'label': f"Ex{i} {symbol}", 'symbol': symbol, 'ob': synthetic_book(5, mid, rng, symbol).top(5)})
+    return lambda: describe_premium_matrix(build_premium_matrix(entries, fx), 1400.0)
+
+# --- chart ---
+
+@case('graph.decimate', {'realistic': 1_000, 'extreme': 1_000_000})
+def decimate(rows):
+    from ui.trend_graph.decimation import decimate_for_chart
+    data = graph_data(1, rows, '1D')['Binance']
+    end_ms = int(data['db'].ts[-1])
+    start_ms = end_ms - 86_400_000
+    return lambda: decimate_for_chart(data['api'], data['db'], start_ms, end_ms, 1340, True)
+
+def _graph_widget(exchanges, rows, period):
+    from kivy.core.window import Window
+    from ui.trend_graph.graph_widget import TrendGraphWidget
+    Window.size = (1400, 900)
+    widget = TrendGraphWidget(main_exchange='Binance', size=(1400, 700), size_hint=(None, None))
+    widget.canvas_area.size = (1400, 675)
+    widget.update_graph(graph_data(exchanges, rows, period), period, 1400.0)
+    return widget
+
+@case('graph.redraw_with_filter', {
+    'realistic': {'exchanges': 3, 'rows': 1_000, 'cold': False},
+    'extreme': {'exchanges': 10, 'rows': 100_000, 'cold': True}
+}, window=True)
+def redraw_with_filter(size):
+    """
+    Warm: toggling exchanges on a loaded chart. Cold: new history each call.
+    """
+    widget = _graph_widget(size['exchanges'], size['rows'], '1D')
+
+    def run():
+        if size['cold']:
+            widget.series_cache.clear()
+            widget.settled_cache.clear()
+            widget.canvas_area.history_key = None
+        widget.redraw_with_filter()
+    return run
+
+@case('graph.draw_chart', {
+    'realistic': {'exchanges': 3, 'rows': 1_000, 'cold': False},
+    'extreme': {'exchanges': 10, 'rows': 100_000, 'cold': True}
+}, window=True)
+def draw_chart(size):
+    widget = _graph_widget(size['exchanges'], size['rows'], '1D')
+    canvas = widget.canvas_area
+    start_ms, end_ms, chart_w = canvas.plot_window('1D')
+    entries = {name: widget._cached_series(name, start_ms, end_ms, chart_w) for name in widget.raw_data_map}
+    visible = {name: entry['chart'] for name, entry in entries.items()}
+    p_min = min(e['bounds'][0] for e in entries.values())
+    p_max = max(e['bounds'][1] for e in entries.values())
+    s_max = max(e['s_max'] for e in entries.values())
+
+    def run():
+        if size['cold']:
+            canvas.history_key = None
+            canvas.background_key = None
+        canvas.draw_chart(visible, p_min, p_max, s_max, '1D')
+    return run
+
+# --- storage ---
+
+def _database():
+    """
+    DatabaseService on BENCH_MONGO_URI when set, else on mongomock.
+    Returns (service, backend).
+    """
+    import services.database_service as database_service
+    uri = os.getenv('BENCH_MONGO_URI')
+    os.environ['MONGO_DB_NAME'] = os.getenv('BENCH_MONGO_DB', 'bitanalyzer_bench')
+    if uri:
+        os.environ['MONGO_URI'] = uri
+        backend = 'mongod'
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            raise Skip("needs BENCH_MONGO_URI or mongomock")
+        database_service.MongoClient = mongomock.MongoClient
+        backend = 'mongomock'
+
+    if not database_service.MONGO_AVAILABLE:
+        raise Skip("pymongo not installed")
+    db = database_service.DatabaseService()
+    if not db.enabled:
+        raise Skip("database unavailable")
+
+    db.spread_col.delete_many({})
+    for col in db.rollup_cols.values():
+        col.delete_many({})
+        if backend == 'mongomock':
+            _upsert_one_by_one(col)
+    if backend == 'mongomock':
+        # mongomock re-scans TTL indexes on every insert; expiry is not measured here
+        db.spread_col.drop_index('timestamp_1')
+    return db, backend
+
+def _upsert_one_by_one(col):
+    """
+    mongomock's bulk_write cannot take pymongo's UpdateOne ops; apply the
+    rollup upserts one at a time instead, so the write path still runs.
+    """
+    def bulk_write(ops, ordered=True):
+        for op in ops:
+            col.update_one(op._filter, op._doc, upsert=op._upsert)
+    col.bulk_write = bulk_write
+
+@case('db.save_spread', {'realistic': 1, 'extreme': 10_000})
+def save_spread(burst):
+    """
+    Cost on the caller's thread: one save, or a burst that overflows the queue.
+    """
+    db, backend = _database()
+    rng = random.Random(6)
+    quotes = [(95_000 + rng.uniform(-50, 50), 95_001 + rng.uniform(-50, 50)) for _ in range(burst)]
+
+    def run():
+        for bid, ask in quotes:
+            db.save_spread('Binance', 'BTC/USDT', bid, ask)
+    return run, backend
+
+@case('db.flush', {'realistic': 5, 'extreme': 200})
+def flush(pairs):
+    """
+    Cost on the writer thread: insert_many of one full batch plus its rollup
+    upserts, the batch spread over `pairs` pairs (one upsert per pair and
+    tier at the extreme). The writer is stopped so only the timed flush writes.
+    """
+    db, backend = _database()
+    db.close()
+    batch = synthetic_spread_rows(db.batch_size, pairs)
+
+    def run():
+        # insert_many stamps _id onto the rows, so each flush gets fresh ones
+        db._flush([dict(row) for row in batch])
+    return run, backend
+
+@case('db.get_spread_history', {'realistic': ('1H', 3_600), 'extreme': ('1D', 86_400)}, repeat=3)
+def get_spread_history(size):
+    """
+    Cold reads (history cache cleared) over one row per second of the period.
+    """
+    from datetime import datetime, timezone, timedelta
+    period, rows = size
+    db, backend = _database()
+    if backend == 'mongomock' and rows > 10_000:
+        raise Skip("too slow on mongomock; set BENCH_MONGO_URI")
+
+    now = datetime.now(timezone.utc)
+    batch = [{
+        'exchange': 'Binance', 'symbol': 'BTC/USDT',
+        'bid': 95_000.0 + i % 100, 'ask': 95_001.0 + i % 100, 'spread': 1.0,
+        'timestamp': now - timedelta(seconds=rows - i)
+    } for i in range(rows)]
+    for start in range(0, rows, 10_000):
+        chunk = batch[start:start + 10_000]
+        db.spread_col.insert_many(chunk, ordered=False)
+        if backend == 'mongod':
+            db._update_rollups(chunk)
+
+    def run():
+        db.history_cache.clear()
+        return db.get_spread_history('Binance', 'BTC/USDT', period)
+    return run, backend
+
+# --- market explorer ---
+
+@case('explorer.search', {'realistic': 5_000, 'extreme': 50_000})
+def explorer_search(count):
+    from services.market_search import MarketSearchIndex
+    index = MarketSearchIndex(synthetic_markets(count))
+    state = {'i': 0}
+
+    def run():
+        text = SEARCHES[state['i'] % len(SEARCHES)]
+        state['i'] += 1
+        return index.search(text, 'USDT' if state['i'] % 2 else 'All')
+    return run
+
+@case('explorer.filter_list', {'realistic': 5_000, 'extreme': 50_000}, window=True)
+def explorer_filter(count):
+    """
+    apply_filter, i.e. what a debounced filter_list call runs: search and
+    RecycleView update.
+    """
+    from kivy.lang import Builder
+    from ui.market_explorer import MarketExplorer
+    Builder.load_file(os.path.join(ROOT, 'src', 'ui', 'market_explorer.kv'))
+    explorer = MarketExplorer(price_service=None)
+    explorer.set_markets(synthetic_markets(count))
+    state = {'i': 0}
+
+    def run():
+        explorer.ids.search_input.text = SEARCHES[state['i'] % len(SEARCHES)]
+        state['i'] += 1
+        explorer.apply_filter()
+    return run
@@ -0,0 +1,217 @@
+"""
+Headless spread collector: records bid/ask spreads for a watchlist of
+(exchange, symbol) pairs without the Kivy UI, sharded across worker
+processes that each run their own PriceService, DatabaseService and
+asyncio loop.
+
+    (cd src && python -m collector.spread_collector --watchlist ../watchlist.txt --workers 4)
+
+Watchlist: one pair per line as "Binance BTC/USDT" or "upbit:BTC/KRW";
+blank lines and lines starting with '#' are ignored.
+"""
+import os, time, signal, asyncio, argparse, queue
+import multiprocessing as mp
+
+from services.exchange_registry import display_name
+
+SAVE_INTERVAL = float(os.getenv('COLLECTOR_SAVE_INTERVAL', 1.0))
+REPORT_INTERVAL = float(os.getenv('COLLECTOR_REPORT_INTERVAL', 10.0))
+
+def load_watchlist(path):
+    items, seen = [], set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line: continue
+            parts = line.split() if ' ' in line or '\t' in line else line.split(':', 1)
+            if len(parts) != 2:
+                print(f"Watchlist Error: line {line_no} '{line}' is not 'exchange symbol'")
+                continue
+            exchange, symbol = parts
+            key = (exchange.lower(), symbol)
+            if key in seen: continue
+            seen.add(key)
+            items.append({'exchange': display_name(exchange), 'symbol': symbol})
+    return items
+
+def shard_watchlist(items, workers):
+    """
+    Deals pairs out round-robin after grouping them by exchange, so every
+    shard gets a similar count and each exchange is spread evenly.
+    """
+    ordered = sorted(items, key=lambda item: item['exchange'].lower())
+    shards = [ordered[i::workers] for i in range(workers)]
+    return [shard for shard in shards if shard]
+
+def rate_shares(shards):
+    """
+    {exchange: 1 / number of shards polling it}, so the shards together
+    stay within each exchange's REST limit.
+    """
+    counts = {}
+    for shard in shards:
+        for exchange in {item['exchange'].lower() for item in shard}:
+            counts[exchange] = counts.get(exchange, 0) + 1
+    return {exchange: 1 / count for exchange, count in counts.items()}
+
+class ShardCollector:
+    """
+    Saves the best bid/ask of each pair at most once per save_interval as
+    MarketStream pushes order books, and counts what went through.
+    """
+    def __init__(self, shard_id, items, price_service, db_service=None, save_interval=SAVE_INTERVAL):
+        self.shard_id = shard_id
+        self.price_service = price_service
+        self.db_service = db_service
+        self.save_interval = save_interval
+        self.targets = [
+            {'key': f"{item['exchange']}:{item['symbol']}", 'exchange': item['exchange'], 'symbol': item['symbol']}
+            for item in items
+        ]
+        self.by_key = {t['key']: t for t in self.targets}
+        self.last_saved = {}
+        self.counts = {'updates': 0, 'saves': 0, 'errors': 0}
+
+    def on_update(self, key, kind, payload):
+        if kind != 'ob': return
+        target = self.by_key.get(key)
+        if not target: return
+        self.counts['updates'] += 1
+
+        bids, asks = payload.get('bids'), payload.get('asks')
+        if 'error' in payload or not bids or not asks:
+            self.counts['errors'] += 1
+            return
+
+        now = time.monotonic()
+        if now - self.last_saved.get(key, 0) < self.save_interval:
+            return
+        self.last_saved[key] = now
+        self.counts['saves'] += 1
+        if self.db_service:
+            try:
+                self.db_service.save_spread(target['exchange'], target['symbol'], bids[0][0], asks[0][0])
+            except Exception as e:
+                print(f"DB Save Error: {e}")
+
+    def report(self, elapsed, previous):
+        stream = self.price_service.stream
+        modes = [stream.mode(t['exchange']) for t in self.targets] if stream else []
+        report = {
+            'shard': self.shard_id,
+            'pid': os.getpid(),
+            'targets': len(self.targets),
+            'streaming': modes.count('stream'),
+            **self.counts,
+            'updates_per_s': (self.counts['updates'] - previous.get('updates', 0)) / elapsed,
+            'saves_per_s': (self.counts['saves'] - previous.get('saves', 0)) / elapsed,
+        }
+        if self.db_service and self.db_service.enabled:
+            stats = self.db_service.get_write_stats()
+            report.update(written=stats['written'], dropped=stats['dropped'], queue_depth=stats['queue_depth'])
+        return report
+
+    async def run(self, stop_event, report_queue, report_interval=REPORT_INTERVAL):
+        # Spreads are stored in each pair's own quote, so the USDT/KRW rate is not needed
+        self.price_service.start_stream(self.targets, self.on_update, with_rate=False)
+        previous, last_report = dict(self.counts), time.monotonic()
+        try:
+            while not stop_event.is_set():
+                await asyncio.sleep(0.5)
+                now = time.monotonic()
+                if now - last_report >= report_interval:
+                    report_queue.put(self.report(now - last_report, previous))
+                    previous, last_report = dict(self.counts), now
+        finally:
+            await self.price_service.close_all()
+
+def run_shard(shard_id, items, shares, use_db, stop_event, report_queue, report_interval):
+    """
+    Worker process entry point. Ctrl-C is left to the parent, which sets
+    stop_event so each shard can flush its write queue before exiting.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from services.price_service import PriceService
+    from services.database_service import DatabaseService
+
+    price_service = PriceService()
+    price_service.scheduler.rate_shares = shares
+    # No UI thread to keep responsive: wait for room in the write queue rather than drop spreads
+    db_service = DatabaseService(full_policy='block') if use_db else None
+    collector = ShardCollector(shard_id, items, price_service, db_service)
+    try:
+        asyncio.run(collector.run(stop_event, report_queue, report_interval))
+    finally:
+        if db_service:
+            db_service.close()
+
+def print_reports(reports):
+    print(f"{'shard':>5} {'pid':>7} {'pairs':>5} {'stream':>6} {'updates/s':>10} {'saves/s':>8} "
+          f"{'written':>9} {'dropped':>7} {'queue':>6}")
+    for r in sorted(reports.values(), key=lambda r: r['shard']):
+        print(f"{r['shard']:>5} {r['pid']:>7} {r['targets']:>5} {r['streaming']:>6} "
+              f"{r['updates_per_s']:>10.1f} {r['saves_per_s']:>8.1f} {r.get('written', '-'):>9} "
+              f"{r.get('dropped', '-'):>7} {r.get('queue_depth', '-'):>6}")
+    total_updates = sum(r['updates_per_s'] for r in reports.values())
+    total_saves = sum(r['saves_per_s'] for r in reports.values())
+    print(f"{'all':>5} {'':>7} {sum(r['targets'] for r in reports.values()):>5} "
+          f"{sum(r['streaming'] for r in reports.values()):>6} {total_updates:>10.1f} {total_saves:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--watchlist', required=True)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--report-interval', type=float, default=REPORT_INTERVAL)
+    parser.add_argument('--duration', type=float, default=0, help='seconds to run, 0 runs until Ctrl-C')
+    parser.add_argument('--no-db', action='store_true', help='collect without writing to MongoDB')
+    args = parser.parse_args()
+
+    items = load_watchlist(args.watchlist)
+    if not items:
+        print("Collector: watchlist is empty.")
+        return
+    shards = shard_watchlist(items, max(1, args.workers))
+    shares = rate_shares(shards)
+
+    ctx = mp.get_context('spawn')
+    stop_event = ctx.Event()
+    report_queue = ctx.Queue()
+    workers = [
+        ctx.Process(
+            target=run_shard, name=f"collector-{i}",
+            args=(i, shard, shares, not args.no_db, stop_event, report_queue, args.report_interval)
+        )
+        for i, shard in enumerate(shards)
+    ]
+    for worker in workers:
+        worker.start()
+    print(f"Collector: {len(items)} pairs across {len(workers)} shards")
+
+    reports = {}
+    last_print = time.monotonic()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while any(w.is_alive() for w in workers):
+            if deadline and time.monotonic() >= deadline:
+                break
+            try:
+                report = report_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            reports[report['shard']] = report
+            if time.monotonic() - last_print >= args.report_interval * 0.9:
+                print_reports(reports)
+                last_print = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("Collector: stopping shards...")
+        stop_event.set()
+        for worker in workers:
+            worker.join(15)
+            if worker.is_alive():
+                worker.terminate()
+
+if __name__ == '__main__':
+    main()
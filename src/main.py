@@ -1,4 +1,7 @@
-import asyncio
+import time
+STARTUP_T0 = time.perf_counter()
+
+import asyncio, os, json
 from kivy.app import App
 from kivy.core.window import Window
 from kivy.uix.screenmanager import ScreenManager, Screen, SlideTransition
@@ -56,6 +59,23 @@ class BitAnalyzerApp(App):
 
         return self.sm
 
+    def on_start(self):
+        Window.bind(on_flip=self.on_first_frame)
+
+    def on_first_frame(self, *args):
+        Window.unbind(on_flip=self.on_first_frame)
+        elapsed_ms = (time.perf_counter() - STARTUP_T0) * 1000
+        print(f"Startup: first frame in {elapsed_ms:.0f} ms")
+
+        report_path = os.getenv('BITANALYZER_STARTUP_REPORT')
+        if report_path:
+            with open(report_path, 'w') as f:
+                json.dump({
+                    'first_frame_ms': elapsed_ms,
+                    'exchange_clients': list(self.price_service.exchanges.clients)
+                }, f)
+            self.stop()
+
     def switch_to_tracker(self, exchange_name, selected_items):
         self.tracker_screen.update_targets(exchange_name, selected_items)
         self.sm.transition.direction = 'left'
@@ -85,4 +105,6 @@ if __name__ == '__main__':
     finally:
         if hasattr(app, 'price_service'):
             loop.run_until_complete(app.price_service.close_all())
+        if hasattr(app, 'db_service'):
+            app.db_service.close()
         loop.close()
\ No newline at end of file
@@ -1,5 +1,11 @@
-def analyze_order_book_trend(bids, asks, strong_threshold=2.0):
+from services.premium_matrix import book_price
+
+# The tracker used to fetch 5 levels; strong_threshold is calibrated to them
+TREND_LEVELS = 5
+
+def analyze_order_book_trend(bids, asks, strong_threshold=2.0, levels=TREND_LEVELS):
     try:
+        bids, asks = bids[:levels], asks[:levels]
         bid_volume = sum(qty for price, qty in bids)
         ask_volume = sum(qty for price, qty in asks)
 
@@ -17,7 +23,35 @@ def analyze_order_book_trend(bids, asks, strong_threshold=2.0):
         print(f"Trend analysis error: {e}")
         return {'text': "Trend: Analysis Error", 'color': (1, 0.3, 0.3, 1)}
 
-def calculate_k_premium(upbit_data, binance_data, usdt_krw_price):
+def analyze_depth_trend(analytics, strong_imbalance=1/3):
+    """
+    Same verdicts as analyze_order_book_trend, from the depth-weighted
+    imbalance of the whole local book. 1/3 matches a 2:1 volume ratio.
+    """
+    try:
+        imbalance = analytics.imbalance()
+        if imbalance is None:
+            return {'text': "Trend: No Volume", 'color': (0.8, 0.8, 0.8, 1)}
+
+        if imbalance > strong_imbalance:
+            text, color = "Trend: Strong Buy Pressure", (0.4, 1, 0.4, 1)
+        elif imbalance < -strong_imbalance:
+            text, color = "Trend: Strong Sell Pressure", (1, 0.4, 0.4, 1)
+        else:
+            text, color = "Trend: Balanced", (0.9, 0.9, 0.9, 1)
+        return {'text': f"{text} ({imbalance:+.2f})", 'color': color}
+
+    except Exception as e:
+        print(f"Trend analysis error: {e}")
+        return {'text': "Trend: Analysis Error", 'color': (1, 0.3, 0.3, 1)}
+
+def calculate_k_premium(upbit_data, binance_data, usdt_krw_price, label="Upbit/Binance", mode='mid', notional_usdt=None):
+    """
+    Kimchi premium of a KRW book over a USDT book. Prices are top-of-book
+    mids unless mode is 'micro' or 'vwap' (see premium_matrix.book_price);
+    notional_usdt is the VWAP trade size. The result also carries
+    'premium_pct', None on errors.
+    """
     try:
         if not usdt_krw_price:
             raise ValueError("Unable to get USDT/KRW exchange rate.")
@@ -30,27 +64,60 @@ def calculate_k_premium(upbit_data, binance_data, usdt_krw_price):
         if not binance_data.get('asks') or not binance_data.get('bids'):
             raise ValueError("Binance data is incomplete.")
 
-        upbit_ask = upbit_data['asks'][0][0]
-        upbit_bid = upbit_data['bids'][0][0]
-        upbit_mid_price = (upbit_ask + upbit_bid) / 2
-        
-        binance_ask = binance_data['asks'][0][0]
-        binance_bid = binance_data['bids'][0][0]
-        binance_mid_price = (binance_ask + binance_bid) / 2
+        upbit_notional = notional_usdt * usdt_krw_price if notional_usdt else None
+        upbit_mid_price = book_price(upbit_data, mode, upbit_notional)
+        binance_mid_price = book_price(binance_data, mode, notional_usdt)
         
-        if upbit_mid_price <= 0 or binance_mid_price <= 0:
+        if not upbit_mid_price > 0 or not binance_mid_price > 0:
             raise ValueError("Invalid Price Data")
 
         binance_price_in_krw = binance_mid_price * usdt_krw_price
-        premium_pct = ((upbit_mid_price / binance_price_in_krw) - 1) * 100
+        premium_pct = float((upbit_mid_price / binance_price_in_krw - 1) * 100)
         color = (0.4, 1, 0.4, 1) if premium_pct > 0 else (1, 0.4, 0.4, 1)
         
         text = (
-            f"Kimchi Premium (Upbit/Binance): {premium_pct:+.2f}% "
+            f"Kimchi Premium ({label}): {premium_pct:+.2f}% "
             f"(₩{usdt_krw_price:,.0f})"
         )
-        return {'text': text, 'color': color}
+        return {'text': text, 'color': color, 'premium_pct': premium_pct}
 
     except Exception as e:
         print(f"Kimchi Premium Calculation Error: {e}")
-        return {'text': f"Kimchi Premium: Error ({e})", 'color': (1, 0.3, 0.3, 1)}
\ No newline at end of file
+        return {'text': f"Kimchi Premium: Error ({e})", 'color': (1, 0.3, 0.3, 1), 'premium_pct': None}
+
+def describe_premium_matrix(matrix, usdt_krw_price=None):
+    """
+    Analysis label for a PremiumMatrix: calculate_k_premium for the first
+    KRW slot over the first USDT-valued slot, and the widest spread across
+    all slots once there are more than two.
+    """
+    try:
+        valid = matrix.valid()
+        if len(valid) < 2:
+            raise ValueError("Select at least two priced markets.")
+
+        lines = []
+        pair = matrix.kimchi_pair()
+        if pair is not None:
+            krw, usd = pair
+            kimchi = calculate_k_premium(
+                matrix.books[krw], matrix.books[usd], usdt_krw_price or 1 / matrix.rates[krw],
+                label=f"{matrix.labels[krw]} vs {matrix.labels[usd]}",
+                mode=matrix.mode, notional_usdt=matrix.notional_usdt
+            )
+            lines.append(kimchi['text'])
+            color = kimchi['color']
+        else:
+            color = (0.9, 0.9, 0.9, 1)
+
+        if len(valid) > 2 or not lines:
+            rich, cheap, premium_pct = matrix.widest()
+            lines.append(
+                f"Widest ({len(valid)} venues): {matrix.labels[rich]} over "
+                f"{matrix.labels[cheap]} {premium_pct:+.2f}%"
+            )
+        return {'text': "\n".join(lines), 'color': color}
+
+    except Exception as e:
+        print(f"Premium Calculation Error: {e}")
+        return {'text': f"Premium: Error ({e})", 'color': (1, 0.3, 0.3, 1)}
@@ -0,0 +1,176 @@
+import numpy as np
+
+DEFAULT_BANDS_PCT = (0.1, 0.5, 1.0)
+IMBALANCE_SCALE_PCT = 0.5
+
+class SideDepth:
+    """
+    NumPy mirror of one BookSide with cumulative quantity and notional.
+    Only levels from the side's first dirty index onward are copied and
+    re-accumulated on refresh; untouched levels keep their sums.
+    """
+    def __init__(self, side):
+        self.side = side
+        self.version = None
+        self.n = 0
+        self.prices = np.zeros(side.max_depth)
+        self.qtys = np.zeros(side.max_depth)
+        self.cum_qty = np.zeros(side.max_depth)
+        self.cum_notional = np.zeros(side.max_depth)
+
+    def refresh(self):
+        side = self.side
+        if side.version == self.version:
+            return
+        self.version = side.version
+
+        n = len(side.prices)
+        start = min(side.take_dirty(), n, self.n)
+        self.n = n
+        if start >= n:
+            return
+
+        # Copy out of the array('d') buffers straight away: a live buffer
+        # export would stop the book from inserting or deleting levels.
+        self.prices[start:n] = np.frombuffer(side.prices, dtype=np.float64)[start:n]
+        self.qtys[start:n] = np.frombuffer(side.qtys, dtype=np.float64)[start:n]
+
+        base_qty = self.cum_qty[start - 1] if start else 0.0
+        base_notional = self.cum_notional[start - 1] if start else 0.0
+        qtys = self.qtys[start:n]
+        np.cumsum(qtys, out=self.cum_qty[start:n])
+        self.cum_qty[start:n] += base_qty
+        np.cumsum(self.prices[start:n] * qtys, out=self.cum_notional[start:n])
+        self.cum_notional[start:n] += base_notional
+
+    def best(self):
+        return self.prices[0] if self.n else None
+
+    def levels_within(self, limit_price):
+        """
+        Number of levels at or better than limit_price.
+        """
+        prices = self.prices[:self.n]
+        if self.side.descending:
+            return int(np.searchsorted(-prices, -limit_price, side='right'))
+        return int(np.searchsorted(prices, limit_price, side='right'))
+
+    def cumulative(self, count):
+        if count <= 0:
+            return 0.0, 0.0
+        return float(self.cum_qty[count - 1]), float(self.cum_notional[count - 1])
+
+    def vwap_for(self, notional):
+        """
+        Average fill price when taking `notional` (quote currency) from this
+        side, or None when the visible book is too thin.
+        """
+        n = self.n
+        if not n or notional <= 0 or self.cum_notional[n - 1] < notional:
+            return None
+        k = int(np.searchsorted(self.cum_notional[:n], notional, side='left'))
+        filled_notional = self.cum_notional[k - 1] if k else 0.0
+        filled_qty = self.cum_qty[k - 1] if k else 0.0
+        qty = filled_qty + (notional - filled_notional) / self.prices[k]
+        return notional / qty
+
+class DepthAnalytics:
+    """
+    Depth-aware metrics for a LocalOrderBook: depth-weighted imbalance,
+    cumulative depth within ±x% of mid, VWAP slippage for a notional and
+    micro-price. Side mirrors refresh incrementally as the book changes and
+    summary() is cached until either side's version moves.
+    """
+    def __init__(self, book):
+        self.book = book
+        self.bids = SideDepth(book.bids)
+        self.asks = SideDepth(book.asks)
+        self._summary_key = None
+        self._summary = None
+
+    def refresh(self):
+        self.bids.refresh()
+        self.asks.refresh()
+
+    def mid(self):
+        self.refresh()
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return float((bid + ask) / 2)
+
+    def micro_price(self):
+        """
+        Top-of-book price weighted towards the side with less size.
+        """
+        self.refresh()
+        if not self.bids.n or not self.asks.n:
+            return None
+        bid, ask = self.bids.prices[0], self.asks.prices[0]
+        bid_qty, ask_qty = self.bids.qtys[0], self.asks.qtys[0]
+        total = bid_qty + ask_qty
+        if total <= 0:
+            return (bid + ask) / 2
+        return float((ask * bid_qty + bid * ask_qty) / total)
+
+    def imbalance(self, scale_pct=IMBALANCE_SCALE_PCT):
+        """
+        (W_bid - W_ask) / (W_bid + W_ask) in [-1, 1], where each level's size
+        is weighted by exp(-distance from mid / scale_pct%).
+        """
+        mid = self.mid()
+        if mid is None:
+            return None
+        scale = mid * scale_pct / 100
+        bids, asks = self.bids, self.asks
+        w_bid = np.dot(bids.qtys[:bids.n], np.exp((bids.prices[:bids.n] - mid) / scale))
+        w_ask = np.dot(asks.qtys[:asks.n], np.exp((mid - asks.prices[:asks.n]) / scale))
+        total = w_bid + w_ask
+        return float((w_bid - w_ask) / total) if total > 0 else 0.0
+
+    def depth_within(self, pct):
+        """
+        Cumulative size and notional resting within ±pct% of mid on each side.
+        """
+        mid = self.mid()
+        if mid is None:
+            return None
+        bid_qty, bid_notional = self.bids.cumulative(self.bids.levels_within(mid * (1 - pct / 100)))
+        ask_qty, ask_notional = self.asks.cumulative(self.asks.levels_within(mid * (1 + pct / 100)))
+        return {
+            'bid_qty': bid_qty, 'ask_qty': ask_qty,
+            'bid_notional': bid_notional, 'ask_notional': ask_notional
+        }
+
+    def slippage(self, notional):
+        """
+        VWAP slippage in basis points versus the best price for a market buy
+        (taking asks) and a market sell (taking bids) of `notional`.
+        """
+        self.refresh()
+        result = {}
+        for name, depth, sign in (('buy', self.asks, 1), ('sell', self.bids, -1)):
+            vwap = depth.vwap_for(notional)
+            best = depth.best()
+            result[name] = None if vwap is None else float(sign * (vwap / best - 1) * 10000)
+            result[f'{name}_vwap'] = None if vwap is None else float(vwap)
+        return result
+
+    def summary(self, bands_pct=DEFAULT_BANDS_PCT, notional=None):
+        self.refresh()
+        key = (self.bids.version, self.asks.version, tuple(bands_pct), notional)
+        if key == self._summary_key:
+            return self._summary
+
+        summary = {
+            'mid': self.mid(),
+            'micro_price': self.micro_price(),
+            'imbalance': self.imbalance(),
+            'depth': {pct: self.depth_within(pct) for pct in bands_pct}
+        }
+        if notional:
+            summary['slippage'] = self.slippage(notional)
+
+        self._summary_key = key
+        self._summary = summary
+        return summary
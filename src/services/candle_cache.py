@@ -0,0 +1,106 @@
+import time
+from collections import OrderedDict
+from services.time_series import TimeSeries, CANDLE_COLUMNS
+
+TIMEFRAME_MS = {
+    '1m': 60_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '1h': 3_600_000,
+    '4h': 14_400_000,
+    '1d': 86_400_000,
+}
+
+class CandleEntry:
+    def __init__(self, timeframe_ms):
+        self.timeframe_ms = timeframe_ms
+        self.closed = TimeSeries.empty(*CANDLE_COLUMNS)
+        self.open = None
+        self.fetched_at = 0.0
+        self.limit = 0
+
+    def __len__(self):
+        return len(self.closed) + (1 if self.open is not None else 0)
+
+    def last_ts(self):
+        if self.open is not None: return self.open.last_ts()
+        return self.closed.last_ts()
+
+    def merge(self, candles, now_ms):
+        incoming = TimeSeries.from_candles(candles)
+        open_from = now_ms - self.timeframe_ms + 1
+        closed = incoming.before(open_from)
+        last_closed = self.closed.last_ts()
+        if last_closed is not None:
+            closed = closed.between(last_closed + 1)
+        self.closed.extend(closed)
+
+        still_open = incoming.between(open_from)
+        self.open = still_open.tail(1).copy() if len(still_open) else None
+        if len(self.closed) > self.limit:
+            self.closed.drop_head(len(self.closed) - self.limit)
+        self.fetched_at = time.monotonic()
+
+    def candles(self, limit):
+        if self.open is None:
+            return self.closed.tail(limit)
+        return TimeSeries.concat([self.closed.tail(limit - 1), self.open])
+
+class CandleCache:
+    """
+    OHLCV cache keyed by (exchange, symbol, timeframe). Closed candles are kept
+    until evicted; only the open candle and anything newer is re-fetched, at
+    most every open_ttl seconds and immediately once the open candle closes.
+    Memory is capped by total candle count with LRU eviction.
+    """
+    def __init__(self, max_candles=50000, open_ttl=5.0):
+        self.entries = OrderedDict()
+        self.max_candles = max_candles
+        self.open_ttl = open_ttl
+        self.total = 0
+
+    def plan(self, key, timeframe, limit, now_ms):
+        """
+        Returns (entry, since). since is None for a full fetch, the timestamp
+        to fetch from for an incremental one, or False when the cache is fresh.
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry.limit < limit or not len(entry):
+            return entry, None
+        self.entries.move_to_end(key)
+
+        tf_ms = entry.timeframe_ms
+        last_ts = entry.last_ts()
+        if (now_ms - last_ts) // tf_ms >= limit:
+            return entry, None
+
+        open_is_live = entry.open is not None and entry.open.last_ts() + tf_ms > now_ms
+        if open_is_live and time.monotonic() - entry.fetched_at < self.open_ttl:
+            return entry, False
+        return entry, last_ts
+
+    def store(self, key, timeframe, limit, candles, now_ms, entry=None, full=True):
+        """
+        Merges candles into `entry` (full=False) or a new entry, replacing
+        whatever the cache holds under key. entry may have been evicted
+        while its candles were fetched, so the count comes off the entry
+        actually cached.
+        """
+        cached = self.entries.get(key)
+        if cached is not None:
+            self.total -= len(cached)
+        if entry is None or full:
+            entry = CandleEntry(TIMEFRAME_MS.get(timeframe, 3_600_000))
+        entry.limit = max(entry.limit, limit)
+        entry.merge(candles, now_ms)
+
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        self.total += len(entry)
+        self._evict()
+        return entry
+
+    def _evict(self):
+        while self.total > self.max_candles and len(self.entries) > 1:
+            _, entry = self.entries.popitem(last=False)
+            self.total -= len(entry)
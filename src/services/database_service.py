@@ -1,17 +1,64 @@
-import os, urllib.parse
+import os, urllib.parse, queue, threading, time, math
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+from services.time_series import TimeSeries, SPREAD_COLUMNS
 
 try:
-    from pymongo import MongoClient, ASCENDING, DESCENDING
+    from pymongo import MongoClient, UpdateOne, ASCENDING, DESCENDING
+    from pymongo.errors import BulkWriteError
     MONGO_AVAILABLE = True
 except ImportError:
     MONGO_AVAILABLE = False
     print("Warning: 'pymongo' not installed. Database features disabled.")
 
+_STOP = object()
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+SPREAD_FIELDS = SPREAD_COLUMNS
+HISTORY_COLUMNS = tuple(f + suffix for f in SPREAD_FIELDS for suffix in ('', '_min', '_max', '_avg'))
+RAW_RETENTION = 604800
+MIN_CHART_POINTS = 300
+HISTORY_CACHE_SIZE = 32
+HISTORY_CACHE_IDLE = 300
+
+PERIOD_SECONDS = {
+    '1H': 3600,
+    '1D': 86400,
+    '1M': 30 * 86400,
+    '3M': 90 * 86400,
+    '1Y': 365 * 86400,
+}
+
+# (tier, bucket seconds, retention seconds or None to keep forever)
+ROLLUP_TIERS = [
+    ('1m', 60, 90 * 86400),
+    ('1h', 3600, 2 * 365 * 86400),
+    ('1d', 86400, None),
+]
+
 class DatabaseService:
-    def __init__(self):
+    """
+    When the write queue is full, full_policy 'drop_oldest' (the default)
+    discards the oldest queued row and 'drop' the new one, so save_spread
+    never blocks the caller (the Kivy thread). 'block' waits up to
+    block_timeout seconds for room before dropping the new row; it is for
+    callers without a UI thread, such as the headless collector. Every
+    discarded row is counted as dropped.
+    """
+    def __init__(self, queue_size=10000, batch_size=200, flush_interval=1.0, full_policy='drop_oldest',
+                 block_timeout=1.0):
         self.enabled = MONGO_AVAILABLE
+        self.write_queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self.writer = None
+        self.write_stats = {'written': 0, 'dropped': 0, 'flushes': 0, 'last_flush_ms': None, 'max_flush_ms': 0.0}
+        self.stats_lock = threading.Lock()
+        self.history_cache = OrderedDict()
+        self.cache_lock = threading.Lock()
         if not self.enabled:
             return
 
@@ -39,13 +86,27 @@ class DatabaseService:
             self.spread_col = self.db["spread_history"]
             
             try:
-                self.spread_col.create_index("timestamp", expireAfterSeconds=604800)
+                self.spread_col.create_index("timestamp", expireAfterSeconds=RAW_RETENTION)
             except:
                 pass
             
             self.spread_col.create_index([("exchange", ASCENDING), ("symbol", ASCENDING), ("timestamp", DESCENDING)])
+
+            self.rollup_cols = {}
+            for tier, _, retention in ROLLUP_TIERS:
+                col = self.db[f"spread_rollup_{tier}"]
+                if retention:
+                    try:
+                        col.create_index("timestamp", expireAfterSeconds=retention)
+                    except:
+                        pass
+                col.create_index([("exchange", ASCENDING), ("symbol", ASCENDING), ("timestamp", ASCENDING)], unique=True)
+                self.rollup_cols[tier] = col
             
-            print(f"✅ MongoDB Connected to '{db_name}'. Collection: 'spread_history'")
+            print(f"✅ MongoDB Connected to '{db_name}'. Collection: 'spread_history' (+ rollups {', '.join(self.rollup_cols)})")
+
+            self.writer = threading.Thread(target=self._writer_loop, name="spread-writer", daemon=True)
+            self.writer.start()
             
         except Exception as e:
             print(f"❌ MongoDB Connection Error: {e}")
@@ -67,42 +128,232 @@ class DatabaseService:
         }
         
         try:
-            self.spread_col.insert_one(data)
+            if self.full_policy == 'block':
+                self.write_queue.put(data, timeout=self.block_timeout)
+            else:
+                self.write_queue.put_nowait(data)
+            return
+        except queue.Full:
+            pass
+
+        if self.full_policy == 'drop_oldest':
+            try:
+                oldest = self.write_queue.get_nowait()
+                if oldest is _STOP:
+                    # Closing: keep the stop marker and drop the new row instead
+                    self.write_queue.put_nowait(oldest)
+                else:
+                    self.write_queue.put_nowait(data)
+            except (queue.Empty, queue.Full):
+                pass
+        with self.stats_lock:
+            self.write_stats['dropped'] += 1
+
+    def _writer_loop(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.write_queue.get(timeout=max(0, deadline - time.monotonic()))
+                if item is _STOP:
+                    self._flush(batch)
+                    return
+                batch.append(item)
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch):
+        if not batch: return
+
+        start = time.perf_counter()
+        written = batch
+        try:
+            self.spread_col.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            failed = {err['index'] for err in e.details.get('writeErrors', [])}
+            written = [row for i, row in enumerate(batch) if i not in failed]
+            print(f"DB Save Error: {len(failed)} of {len(batch)} spreads not written")
         except Exception as e:
+            written = []
             print(f"DB Save Error: {e}")
 
-    def get_spread_history(self, exchange, symbol, period_code):
-        if not self.enabled: return []
+        # Rollups only count rows that made it into spread_history
+        if written:
+            try:
+                self._update_rollups(written)
+            except Exception as e:
+                print(f"DB Rollup Error: {e}")
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self.stats_lock:
+            self.write_stats['written'] += len(written)
+            self.write_stats['flushes'] += 1
+            self.write_stats['last_flush_ms'] = elapsed_ms
+            self.write_stats['max_flush_ms'] = max(self.write_stats['max_flush_ms'], elapsed_ms)
+
+    def _update_rollups(self, batch):
+        for tier, seconds, _ in ROLLUP_TIERS:
+            buckets = {}
+            for row in batch:
+                ts = row['timestamp']
+                start = datetime.fromtimestamp(int(ts.timestamp() // seconds) * seconds, timezone.utc)
+                key = (row['exchange'], row['symbol'], start)
+                agg = buckets.get(key)
+                if agg is None:
+                    agg = buckets[key] = {'count': 0, 'last_ts': ts, 'min': {}, 'max': {}, 'sum': {}, 'last': {}}
+                agg['count'] += 1
+                agg['last_ts'] = ts
+                for field in SPREAD_FIELDS:
+                    val = row[field]
+                    agg['min'][field] = min(val, agg['min'].get(field, val))
+                    agg['max'][field] = max(val, agg['max'].get(field, val))
+                    agg['sum'][field] = agg['sum'].get(field, 0) + val
+                    agg['last'][field] = val
+
+            ops = []
+            for (exchange, symbol, start), agg in buckets.items():
+                update = {
+                    '$inc': {'count': agg['count']},
+                    '$min': {},
+                    '$max': {'last_ts': agg['last_ts']},
+                    '$set': {}
+                }
+                for field in SPREAD_FIELDS:
+                    update['$inc'][f"{field}_sum"] = agg['sum'][field]
+                    update['$min'][f"{field}_min"] = agg['min'][field]
+                    update['$max'][f"{field}_max"] = agg['max'][field]
+                    update['$set'][f"{field}_last"] = agg['last'][field]
+                ops.append(UpdateOne({'exchange': exchange, 'symbol': symbol, 'timestamp': start}, update, upsert=True))
+
+            if ops:
+                self.rollup_cols[tier].bulk_write(ops, ordered=False)
+
+    def _pick_tier(self, span_sec, buckets):
+        min_points = min(buckets, MIN_CHART_POINTS)
+        for tier, seconds, retention in reversed(ROLLUP_TIERS):
+            if span_sec / seconds >= min_points:
+                return tier, seconds
+        if span_sec > RAW_RETENTION:
+            return ROLLUP_TIERS[0][:2]
+        return None, 1
+
+    def queue_depth(self):
+        return self.write_queue.qsize()
+
+    def get_write_stats(self):
+        with self.stats_lock:
+            stats = dict(self.write_stats)
+        return {**stats, 'queue_depth': self.queue_depth()}
+
+    def close(self, timeout=5.0):
+        if not self.writer or not self.writer.is_alive(): return
+        try:
+            self.write_queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print("DB Close Error: write queue is full, pending spreads not flushed.")
+            return
+        self.writer.join(timeout)
+
+    def get_spread_history(self, exchange, symbol, period_code, buckets=1000):
+        """
+        Downsamples the period into at most `buckets` time buckets on the server,
+        reading from the coarsest rollup tier that still fills the chart.
+        Returns a TimeSeries keyed by bucket start (epoch ms) with the last
+        bid/ask/spread of each bucket plus their min/max/avg columns. The
+        series is shared with the cache and must not be modified in place.
+
+        Series are cached per (exchange, symbol, period). A repeated call only
+        re-aggregates from the newest cached bucket onward, appends the result
+        and trims buckets that fell out of the window.
+        """
+        if not self.enabled: return TimeSeries.empty(*HISTORY_COLUMNS)
 
         now = datetime.now(timezone.utc)
-        start_time = now
-
-        if period_code == '1D':
-            start_time = now - timedelta(days=1)
-        elif period_code == '1M':
-            start_time = now - timedelta(days=30)
-        elif period_code == '3M':
-            start_time = now - timedelta(days=90)
-        elif period_code == '1Y':
-            start_time = now - timedelta(days=365)
-        else:
-            start_time = now - timedelta(hours=24)
+        start_time = now - timedelta(seconds=PERIOD_SECONDS.get(period_code, 86400))
+        span_sec = (now - start_time).total_seconds()
+        tier, tier_sec = self._pick_tier(span_sec, buckets)
+        bucket_sec = max(tier_sec, span_sec / max(1, buckets))
+        bucket_ms = int(math.ceil(bucket_sec / tier_sec)) * tier_sec * 1000
+
+        key = (exchange, symbol, period_code)
+        with self.cache_lock:
+            entry = self.history_cache.get(key)
+            if entry and (entry['tier'], entry['bucket_ms']) != (tier, bucket_ms):
+                entry = None
+
+        since = start_time
+        if entry and len(entry['series']):
+            since = max(start_time, EPOCH_UTC + timedelta(milliseconds=entry['series'].last_ts()))
+
+        fresh = self._aggregate_history(exchange, symbol, tier, bucket_ms, since)
+        if fresh is None:
+            return entry['series'] if entry else TimeSeries.empty(*HISTORY_COLUMNS)
+
+        start_bucket = int((start_time - EPOCH_UTC).total_seconds() * 1000) // bucket_ms * bucket_ms
+        series = fresh
+        if entry:
+            kept = entry['series'].between(start_bucket)
+            if len(fresh):
+                kept = kept.before(fresh.ts[0])
+            series = TimeSeries.concat([kept, fresh])
 
+        with self.cache_lock:
+            self.history_cache[key] = {'tier': tier, 'bucket_ms': bucket_ms, 'series': series, 'used': time.monotonic()}
+            self.history_cache.move_to_end(key)
+            self._evict_history()
+
+        return series
+
+    def _evict_history(self):
+        idle_before = time.monotonic() - HISTORY_CACHE_IDLE
+        for key in [k for k, v in self.history_cache.items() if v['used'] < idle_before]:
+            del self.history_cache[key]
+        while len(self.history_cache) > HISTORY_CACHE_SIZE:
+            self.history_cache.popitem(last=False)
+
+    def _aggregate_history(self, exchange, symbol, tier, bucket_ms, since):
         query = {
             "exchange": exchange,
             "symbol": symbol,
-            "timestamp": {"$gte": start_time}
+            "timestamp": {"$gte": since}
         }
 
-        cursor = self.spread_col.find(query).sort("timestamp", ASCENDING).limit(3000)
-        
-        history = []
-        for doc in cursor:
-            history.append({
-                'ts': doc['timestamp'],
-                'bid': doc.get('bid', 0),
-                'ask': doc.get('ask', 0),
-                'spread': doc.get('spread', 0)
-            })
-            
-        return history
\ No newline at end of file
+        def source(field, kind):
+            return f"${field}_{kind}" if tier else f"${field}"
+
+        epoch_ms = {"$subtract": ["$timestamp", EPOCH]}
+        group = {
+            "_id": {"$subtract": [epoch_ms, {"$mod": [epoch_ms, bucket_ms]}]},
+            "count": {"$sum": "$count" if tier else 1}
+        }
+        project = {"_id": 0, "bucket": "$_id"}
+        for field in SPREAD_FIELDS:
+            group[field] = {"$last": source(field, 'last')}
+            group[f"{field}_min"] = {"$min": source(field, 'min')}
+            group[f"{field}_max"] = {"$max": source(field, 'max')}
+            group[f"{field}_sum"] = {"$sum": source(field, 'sum')}
+            project[field] = 1
+            project[f"{field}_min"] = 1
+            project[f"{field}_max"] = 1
+            project[f"{field}_avg"] = {"$divide": [f"${field}_sum", "$count"]}
+
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"timestamp": ASCENDING}},
+            {"$group": group},
+            {"$sort": {"_id": ASCENDING}},
+            {"$project": project}
+        ]
+
+        col = self.rollup_cols[tier] if tier else self.spread_col
+        try:
+            cursor = col.aggregate(pipeline, allowDiskUse=True)
+            return TimeSeries.from_rows(cursor, 'bucket', HISTORY_COLUMNS)
+        except Exception as e:
+            print(f"DB Read Error: {e}")
+            return None
@@ -0,0 +1,45 @@
+import importlib
+
+# How the UI names each exchange (and stores its spreads), by ccxt id
+EXCHANGE_NAMES = {'binance': 'Binance', 'upbit': 'Upbit', 'bybit': 'Bybit', 'bitfinex': 'Bitfinex', 'kucoin': 'KuCoin'}
+
+def display_name(exchange_name):
+    """
+    'kucoin' or 'KUCOIN' -> 'KuCoin'. Unknown exchanges are capitalized.
+    """
+    return EXCHANGE_NAMES.get(exchange_name.lower(), exchange_name.capitalize())
+
+class ExchangeRegistry:
+    """
+    Creates exchange clients on first use. The ccxt module itself is only
+    imported when the first client is requested.
+    """
+    def __init__(self, module_name, configs=None, defaults=None, factory=None):
+        self.module_name = module_name
+        self.configs = configs or {}
+        self.defaults = defaults or {}
+        self.factory = factory
+        self.clients = {}
+
+    def get(self, exchange_name):
+        name = exchange_name.lower()
+        client = self.clients.get(name)
+        if client is None:
+            if self.factory:
+                client = self.factory(name)
+            else:
+                module = importlib.import_module(self.module_name)
+                client = getattr(module, name)({**self.defaults, **self.configs.get(name, {})})
+            self.clients[name] = client
+        return client
+
+    def __contains__(self, exchange_name):
+        return exchange_name.lower() in self.clients
+
+    async def close_all(self):
+        clients, self.clients = self.clients, {}
+        for name, client in clients.items():
+            try:
+                await client.close()
+            except Exception as e:
+                print(f"{name} Close Error: {e}")
@@ -0,0 +1,42 @@
+import os, json, time
+
+CACHE_DIR = os.getenv('BITANALYZER_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.bitanalyzer', 'cache'))
+MARKET_CACHE_TTL = 6 * 3600
+
+class MarketCache:
+    """
+    Market lists persisted as one JSON file per exchange with the time they
+    were saved, so the explorer can render before load_markets() returns.
+    """
+    def __init__(self, cache_dir=CACHE_DIR, ttl=MARKET_CACHE_TTL):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _path(self, exchange_name):
+        return os.path.join(self.cache_dir, f"markets_{exchange_name.lower()}.json")
+
+    def load(self, exchange_name):
+        """
+        Returns (markets, is_fresh). markets is None when nothing is cached.
+        """
+        try:
+            with open(self._path(exchange_name), 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            markets = payload['markets']
+            return markets, time.time() - payload.get('saved_at', 0) < self.ttl
+        except FileNotFoundError:
+            return None, False
+        except Exception as e:
+            print(f"Market Cache Read Error ({exchange_name}): {e}")
+            return None, False
+
+    def save(self, exchange_name, markets):
+        path = self._path(exchange_name)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': time.time(), 'markets': markets}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Market Cache Write Error ({exchange_name}): {e}")
@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+GRAM_SIZE = 3
+
+class MarketSearchIndex:
+    """
+    Search index over one exchange's market list, built once when it loads.
+
+    Every substring of a base coin up to GRAM_SIZE characters maps to the
+    positions of the markets containing it, so queries of up to three
+    characters are a single lookup. Longer queries intersect the postings
+    of their trigrams and confirm the match. Markets are also bucketed by
+    quote. Results keep the original market order, with bases that start
+    with the query listed first.
+    """
+    def __init__(self, markets):
+        self.markets = list(markets)
+        self.grams = defaultdict(list)
+        self.quotes = defaultdict(list)
+
+        for pos, market in enumerate(self.markets):
+            base = market['base'].upper()
+            self.quotes[market['quote']].append(pos)
+            grams = {base[i:i + n] for n in range(1, GRAM_SIZE + 1) for i in range(len(base) - n + 1)}
+            for gram in grams:
+                self.grams[gram].append(pos)
+
+    def search(self, text, quote='All'):
+        """
+        Returns the markets whose base contains `text` and, unless quote is
+        'All', whose quote matches.
+        """
+        text = text.upper()
+        positions = self._match_base(text) if text else None
+
+        if quote != 'All':
+            bucket = self.quotes.get(quote, [])
+            if positions is None:
+                positions = bucket
+            else:
+                allowed = set(bucket)
+                positions = [pos for pos in positions if pos in allowed]
+        elif positions is None:
+            return list(self.markets)
+
+        matches = [self.markets[pos] for pos in positions]
+        if not text:
+            return matches
+        prefix = [m for m in matches if m['base'].upper().startswith(text)]
+        if len(prefix) == len(matches):
+            return matches
+        return prefix + [m for m in matches if not m['base'].upper().startswith(text)]
+
+    def _match_base(self, text):
+        if len(text) <= GRAM_SIZE:
+            return self.grams.get(text, [])
+
+        postings = [self.grams.get(text[i:i + GRAM_SIZE], []) for i in range(len(text) - GRAM_SIZE + 1)]
+        postings.sort(key=len)
+        candidates = postings[0]
+        for other in postings[1:]:
+            other = set(other)
+            candidates = [pos for pos in candidates if pos in other]
+            if not candidates:
+                return []
+        return [pos for pos in candidates if text in self.markets[pos]['base'].upper()]
@@ -0,0 +1,155 @@
+from array import array
+from services.book_analytics import DepthAnalytics
+
+class BookSide:
+    """
+    One side of an L2 book as parallel price/qty arrays sorted best-first
+    (bids descending, asks ascending). Levels are updated in place.
+
+    version counts changes and dirty is the lowest level index touched since
+    the last take_dirty(), so derived data can be refreshed from there on.
+    """
+    def __init__(self, descending, max_depth=500):
+        self.descending = descending
+        self.max_depth = max_depth
+        self.prices = array('d')
+        self.qtys = array('d')
+        self.version = 0
+        self.dirty = 0
+
+    def __len__(self):
+        return len(self.prices)
+
+    def _find(self, price):
+        prices = self.prices
+        lo, hi = 0, len(prices)
+        if self.descending:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if prices[mid] > price: lo = mid + 1
+                else: hi = mid
+        else:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if prices[mid] < price: lo = mid + 1
+                else: hi = mid
+        return lo, lo < len(prices) and prices[lo] == price
+
+    def update(self, price, qty):
+        i, found = self._find(price)
+        if qty <= 0:
+            if not found: return
+            del self.prices[i]
+            del self.qtys[i]
+        elif found:
+            if self.qtys[i] == qty: return
+            self.qtys[i] = qty
+        elif i < self.max_depth:
+            self.prices.insert(i, price)
+            self.qtys.insert(i, qty)
+            if len(self.prices) > self.max_depth:
+                del self.prices[self.max_depth:]
+                del self.qtys[self.max_depth:]
+        else:
+            return
+        self.version += 1
+        if i < self.dirty: self.dirty = i
+
+    def replace(self, levels):
+        levels = sorted(levels, key=lambda lvl: lvl[0], reverse=self.descending)[:self.max_depth]
+        self.prices = array('d', [lvl[0] for lvl in levels if lvl[1] > 0])
+        self.qtys = array('d', [lvl[1] for lvl in levels if lvl[1] > 0])
+        self.version += 1
+        self.dirty = 0
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, self.max_depth
+        return dirty
+
+    def top(self, n):
+        return LevelView(self, n)
+
+class LevelView:
+    """
+    Read-only window over the best n levels of a BookSide, indexed like a list
+    of [price, qty] pairs without copying. Valid until the book's next update.
+    """
+    __slots__ = ('side', 'n')
+
+    def __init__(self, side, n):
+        self.side = side
+        self.n = n
+
+    def __len__(self):
+        return min(self.n, len(self.side.prices))
+
+    def __getitem__(self, i):
+        size = len(self)
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(size))]
+        if i < 0: i += size
+        if not 0 <= i < size:
+            raise IndexError("level index out of range")
+        return (self.side.prices[i], self.side.qtys[i])
+
+    def __iter__(self):
+        prices, qtys = self.side.prices, self.side.qtys
+        for i in range(len(self)):
+            yield (prices[i], qtys[i])
+
+class LocalOrderBook:
+    """
+    In-memory L2 book for one (exchange, symbol). Snapshots reset it, deltas
+    are applied in place and checked for sequence gaps; after a gap the book
+    is marked unsynced and deltas are ignored until the next snapshot.
+    """
+    def __init__(self, symbol, max_depth=500):
+        self.symbol = symbol
+        self.bids = BookSide(descending=True, max_depth=max_depth)
+        self.asks = BookSide(descending=False, max_depth=max_depth)
+        self.seq = None
+        self.timestamp = None
+        self.synced = False
+        self.analytics = DepthAnalytics(self)
+
+    def apply_snapshot(self, bids, asks, seq=None, timestamp=None):
+        self.bids.replace(bids)
+        self.asks.replace(asks)
+        self.seq = seq
+        self.timestamp = timestamp
+        self.synced = True
+
+    def apply_delta(self, bids, asks, first_seq=None, last_seq=None, timestamp=None):
+        """
+        first_seq/last_seq: sequence range covered by this delta. Returns False
+        when the book needs a fresh snapshot.
+        """
+        if not self.synced:
+            return False
+
+        if last_seq is not None and self.seq is not None:
+            if last_seq <= self.seq:
+                return True
+            if first_seq is not None and first_seq > self.seq + 1:
+                print(f"{self.symbol} OrderBook gap: have {self.seq}, got {first_seq}. Resyncing.")
+                self.synced = False
+                return False
+
+        for lvl in bids:
+            self.bids.update(lvl[0], lvl[1])
+        for lvl in asks:
+            self.asks.update(lvl[0], lvl[1])
+
+        if last_seq is not None:
+            self.seq = last_seq
+        self.timestamp = timestamp
+        return True
+
+    def top(self, n):
+        return {
+            'symbol': self.symbol,
+            'bids': self.bids.top(n),
+            'asks': self.asks.top(n),
+            'timestamp': self.timestamp,
+            'analytics': self.analytics
+        }
@@ -0,0 +1,192 @@
+import os, time
+import numpy as np
+
+REFERENCE_QUOTE = 'USDT'
+FX_RATE_TTL = float(os.getenv('FX_RATE_TTL', 30))
+
+# Quotes treated at par with USDT unless a live rate has been set
+PEGGED_QUOTES = ('USD', 'USDC', 'BUSD')
+
+# Where the USDT value of other quotes comes from: {quote: (exchange, symbol, inverse)}
+# inverse means the symbol is priced in the quote (USDT/KRW), not in USDT.
+CROSS_SOURCES = {
+    'KRW': ('Upbit', 'USDT/KRW', True),
+    'BTC': ('Binance', 'BTC/USDT', False),
+    'ETH': ('Binance', 'ETH/USDT', False),
+}
+
+# 'mid' (top of book), 'micro' (size-weighted top of book) or 'vwap'
+# (mean of the buy and sell VWAP for PREMIUM_NOTIONAL USDT)
+PRICE_MODES = ('mid', 'micro', 'vwap')
+PREMIUM_PRICE_MODE = os.getenv('PREMIUM_PRICE_MODE', 'mid')
+PREMIUM_NOTIONAL = float(os.getenv('PREMIUM_NOTIONAL', 10000))
+
+def quote_of(symbol):
+    """
+    'BTC/KRW' -> 'KRW', 'BTC/USDT:USDT' -> 'USDT'
+    """
+    pair = symbol.split(':')[0]
+    return pair.split('/')[1] if '/' in pair else None
+
+class FxTable:
+    """
+    USDT value of one unit of each quote currency, with the time it was set.
+    Rates older than ttl count as missing. vector() is cached until a rate
+    changes, so a tick with no FX news reuses the previous array.
+    """
+    def __init__(self, ttl=FX_RATE_TTL):
+        self.ttl = ttl
+        self.rates = {REFERENCE_QUOTE: (1.0, float('inf'))}
+        self.version = 0
+        self._vectors = {}
+
+    def set(self, quote, value, now=None):
+        if not value or value <= 0: return
+        self.rates[quote] = (float(value), time.monotonic() if now is None else now)
+        self.version += 1
+
+    def set_cross(self, quote, price, now=None):
+        """
+        Stores a rate from its CROSS_SOURCES ticker price.
+        """
+        source = CROSS_SOURCES.get(quote)
+        if not source or not price or price <= 0: return
+        self.set(quote, 1 / price if source[2] else price, now)
+
+    def value(self, quote, now=None):
+        entry = self.rates.get(quote)
+        if entry is None:
+            return 1.0 if quote in PEGGED_QUOTES else None
+        now = time.monotonic() if now is None else now
+        if now - entry[1] > self.ttl:
+            return 1.0 if quote in PEGGED_QUOTES else None
+        return entry[0]
+
+    def missing(self, quotes, now=None):
+        """
+        Quotes with a cross source whose rate is unknown or stale.
+        """
+        return [q for q in dict.fromkeys(quotes) if q in CROSS_SOURCES and self.value(q, now) is None]
+
+    def vector(self, quotes, now=None):
+        """
+        USDT rates for `quotes` as a float array, NaN where unknown.
+        """
+        quotes = tuple(quotes)
+        now = time.monotonic() if now is None else now
+        # Staleness is re-checked once a second at most
+        key = (quotes, self.version, int(now))
+        cached = self._vectors.get(quotes)
+        if cached and cached[0] == key:
+            return cached[1]
+        rates = np.array([self.value(q, now) or np.nan for q in quotes], dtype=np.float64)
+        self._vectors[quotes] = (key, rates)
+        return rates
+
+def book_price(ob, mode='mid', notional=None):
+    """
+    Price of one order book in its own quote: top-of-book mid, micro-price,
+    or the mean buy/sell VWAP for `notional` (quote currency). Depth modes
+    need the book's DepthAnalytics and fall back to the mid without it.
+    """
+    if not ob or 'error' in ob:
+        return np.nan
+    analytics = ob.get('analytics')
+    if analytics is not None and mode != 'mid':
+        if mode == 'micro':
+            price = analytics.micro_price()
+            return price if price else np.nan
+        if mode == 'vwap' and notional:
+            slip = analytics.slippage(notional)
+            if slip['buy_vwap'] and slip['sell_vwap']:
+                return (slip['buy_vwap'] + slip['sell_vwap']) / 2
+            return np.nan
+
+    bids, asks = ob.get('bids'), ob.get('asks')
+    if not bids or not asks:
+        return np.nan
+    mid = (bids[0][0] + asks[0][0]) / 2
+    return mid if mid > 0 else np.nan
+
+class PremiumMatrix:
+    """
+    Pairwise premium of every slot over every other, in percent, after
+    converting each slot's price to USDT through an FxTable:
+
+        matrix[i, j] = usdt_price[i] / usdt_price[j] - 1
+
+    Rows and columns follow `labels`. Slots without a price or FX rate are
+    NaN across their row and column. `books` keeps each slot's order book
+    so a pair can be priced again with calculate_k_premium.
+    """
+    def __init__(self, labels, quotes, prices, rates, books=None, mode='mid', notional_usdt=None):
+        self.labels = labels
+        self.quotes = quotes
+        self.prices = prices
+        self.rates = rates
+        self.books = books if books is not None else [None] * len(labels)
+        self.mode = mode
+        self.notional_usdt = notional_usdt
+        self.usdt_prices = prices * rates
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.matrix = (self.usdt_prices[:, None] / self.usdt_prices[None, :] - 1) * 100
+
+    def __len__(self):
+        return len(self.labels)
+
+    def valid(self):
+        return np.flatnonzero(np.isfinite(self.usdt_prices))
+
+    def widest(self):
+        """
+        (rich, cheap, premium_pct) for the most expensive slot over the
+        cheapest one, or None when fewer than two slots are priced.
+        """
+        valid = self.valid()
+        if len(valid) < 2:
+            return None
+        rich = valid[np.argmax(self.usdt_prices[valid])]
+        cheap = valid[np.argmin(self.usdt_prices[valid])]
+        return rich, cheap, float(self.matrix[rich, cheap])
+
+    def kimchi_pair(self):
+        """
+        (krw, usd): the first priced KRW slot and the first priced slot
+        quoted in USDT or a USD stablecoin, or None without both.
+        """
+        valid = self.valid()
+        krw = next((i for i in valid if self.quotes[i] == 'KRW'), None)
+        usd = next((i for i in valid if self.quotes[i] in (REFERENCE_QUOTE,) + PEGGED_QUOTES), None)
+        if krw is None or usd is None:
+            return None
+        return krw, usd
+
+    def premium(self, i, j):
+        value = self.matrix[i, j]
+        return float(value) if np.isfinite(value) else None
+
+    def as_dict(self):
+        return {
+            a: {b: self.premium(i, j) for j, b in enumerate(self.labels) if i != j}
+            for i, a in enumerate(self.labels)
+        }
+
+def build_premium_matrix(entries, fx, mode=PREMIUM_PRICE_MODE, notional_usdt=PREMIUM_NOTIONAL):
+    """
+    entries: [{'label': 'Upbit BTC/KRW', 'symbol': 'BTC/KRW', 'ob': {...}}, ...]
+    For 'vwap' the USDT notional is converted to each slot's quote first, so
+    every venue is priced for the same trade size.
+    """
+    if mode not in PRICE_MODES:
+        mode = 'mid'
+    labels = [e['label'] for e in entries]
+    quotes = [quote_of(e['symbol']) for e in entries]
+    rates = fx.vector(quotes)
+
+    books = [e.get('ob') for e in entries]
+
+    prices = np.empty(len(entries), dtype=np.float64)
+    for i, ob in enumerate(books):
+        notional = notional_usdt / rates[i] if mode == 'vwap' and np.isfinite(rates[i]) else None
+        prices[i] = book_price(ob, mode, notional)
+    return PremiumMatrix(labels, quotes, prices, rates, books, mode, notional_usdt)
@@ -1,7 +1,43 @@
-import os, asyncio
-import ccxt.async_support as ccxt
+import os, asyncio, importlib.util
 from dotenv import load_dotenv
-from datetime import datetime
+from services.time_series import TimeSeries, CANDLE_COLUMNS
+from services.stream_service import MarketStream
+from services.order_book import LocalOrderBook
+from services.candle_cache import CandleCache
+from services.market_cache import MarketCache
+from services.premium_matrix import FxTable, CROSS_SOURCES
+from services.tick_log import TickRecorder, TICK_LOG_DIR
+from services.exchange_registry import ExchangeRegistry
+from services.request_scheduler import RequestScheduler, INTERACTIVE, BACKGROUND
+
+# ccxt ships ccxt.pro; checking the spec avoids importing it before first use.
+# This only gates streaming: REST clients fail on first use without ccxt.
+STREAM_AVAILABLE = importlib.util.find_spec('ccxt') is not None
+if not STREAM_AVAILABLE:
+    print("Warning: 'ccxt' not installed. WebSocket streaming disabled and exchange requests will fail.")
+
+STREAM_EXCHANGES = ['binance', 'upbit', 'bybit', 'bitfinex', 'kucoin']
+
+# REST order book depths accepted by exchanges that reject arbitrary limits
+SNAPSHOT_LIMITS = {
+    'binance': [5, 10, 20, 50, 100, 500, 1000, 5000],
+    'bitfinex': [1, 25, 100],
+    'kucoin': [20, 100],
+}
+
+# Relative cost of each REST call in units of the exchange's ccxt `rateLimit`
+REQUEST_WEIGHTS = {
+    'fetch_ticker': 1,
+    'fetch_tickers': 4,
+    'fetch_l2_order_book': 2,
+    'fetch_ohlcv': 1,
+    'load_markets': 10,
+}
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
 
 class PriceService:
     def __init__(self):
@@ -9,84 +45,228 @@ class PriceService:
         api_key = os.getenv('BINANCE_API_KEY')
         api_secret = os.getenv('BINANCE_API_SECRET')
         
-        self.binance_client = ccxt.binance({'apiKey': api_key, 'secret': api_secret})
-        self.upbit_client = ccxt.upbit()
-        self.bybit_client = ccxt.bybit()
-        self.bitfinex_client = ccxt.bitfinex()
-        self.kucoin_client = ccxt.kucoin()
-        
-        self.clients = [
-            self.binance_client, self.upbit_client, self.bybit_client,
-            self.bitfinex_client, self.kucoin_client
-        ]
+        # Throttling is done by self.scheduler, so ccxt's own limiter is disabled
+        self.fake_exchange = os.getenv('FAKE_EXCHANGE')
+        self.exchanges = ExchangeRegistry('ccxt.async_support', configs={
+            'binance': {'apiKey': api_key, 'secret': api_secret}
+        }, defaults={'enableRateLimit': False}, factory=self._create_fake_exchange if self.fake_exchange else None)
+        self.scheduler = RequestScheduler()
+
+        self.fake_stream_url = os.getenv('FAKE_STREAM_URL')
+        self.replay_dir = os.getenv('TICK_REPLAY_DIR')
+        self.streaming_enabled = bool(self.replay_dir) or (
+            os.getenv('BITANALYZER_STREAMING', '1') != '0'
+            and (STREAM_AVAILABLE or bool(self.fake_stream_url))
+        )
+        self.ws_clients = ExchangeRegistry('ccxt.pro', factory=self._create_stream_client if self.fake_stream_url else None)
+        self.stream = None
+
+        self.book_depth = int(os.getenv('ORDER_BOOK_DEPTH', 50))
+        self.books = {}
+
+        self.candle_cache = CandleCache()
+        self.market_cache = MarketCache()
+        self.fx = FxTable()
+        self.recorder = TickRecorder(TICK_LOG_DIR, on_new_segment=self._record_books) if TICK_LOG_DIR else None
 
     async def close_all(self):
-        for client in self.clients:
-            await client.close()
+        self.stop_stream()
+        await self.exchanges.close_all()
+        await self.ws_clients.close_all()
+        if self.recorder:
+            self.recorder.close()
+
+    async def _request(self, exchange_name, method, *args, priority=BACKGROUND, weight=None, **kwargs):
+        name = exchange_name.lower()
+        client = self.exchanges.get(name)
+        self.scheduler.configure(name, client.rateLimit)
+        if weight is None:
+            weight = REQUEST_WEIGHTS.get(method, 1)
+        key = (name, method, _freeze(args), _freeze(sorted(kwargs.items())))
+        return await self.scheduler.submit(
+            name, key, lambda: getattr(client, method)(*args, **kwargs), weight, priority
+        )
+
+    def has_stream(self, exchange_name):
+        return self.streaming_enabled and exchange_name.lower() in STREAM_EXCHANGES
+
+    def get_stream_client(self, exchange_name):
+        return self.ws_clients.get(exchange_name)
+
+    def _create_fake_exchange(self, name):
+        from simulator.fake_exchange import FakeExchange, parse_config
+        return FakeExchange(name, **parse_config(self.fake_exchange))
+
+    def _create_stream_client(self, name):
+        from simulator.fake_ws_server import FakeStreamClient
+        return FakeStreamClient(name, self.fake_stream_url)
+
+    def get_local_book(self, exchange_name, symbol):
+        key = (exchange_name.lower(), symbol)
+        if key not in self.books:
+            self.books[key] = LocalOrderBook(symbol)
+        return self.books[key]
+
+    def _record_books(self):
+        for (name, symbol), book in self.books.items():
+            if book.synced:
+                self.recorder.record_book(name, symbol, book.bids, book.asks, seq=book.seq)
+
+    def record_book(self, exchange_name, symbol, bids, asks, snapshot=True, seq=None, last_seq=None):
+        if self.recorder:
+            self.recorder.record_book(exchange_name, symbol, bids, asks, snapshot, seq, last_seq)
+
+    def record_ticker(self, exchange_name, symbol, last, change_pct=None):
+        if self.recorder:
+            self.recorder.record_ticker(exchange_name, symbol, last, change_pct)
+
+    def _snapshot_limit(self, exchange_name, depth):
+        allowed = SNAPSHOT_LIMITS.get(exchange_name)
+        if not allowed:
+            return depth
+        return next((l for l in allowed if l >= depth), allowed[-1])
+
+    def start_stream(self, targets, on_update, with_rate=True):
+        """
+        targets: [{'key': 'slot_0', 'exchange': 'Binance', 'symbol': 'BTC/USDT'}, ...]
+        on_update(key, kind, payload): kind is 'ob', 'ticker' or 'rate'
+        with_rate=False skips the USDT/KRW rate updates.
+        """
+        self.stop_stream()
+        if self.replay_dir:
+            from simulator.tick_replay import ReplayStream
+            self.stream = ReplayStream(self, on_update, os.path.expanduser(self.replay_dir))
+        else:
+            self.stream = MarketStream(self, on_update)
+        self.stream.start(targets, with_rate)
+        return self.stream
+
+    def stop_stream(self):
+        if self.stream:
+            self.stream.stop()
+            self.stream = None
     
-    async def get_usdt_krw_price(self):
+    async def get_usdt_krw_price(self, priority=BACKGROUND):
         try:
-            ticker = await self.upbit_client.fetch_ticker('USDT/KRW')
+            ticker = await self._request('upbit', 'fetch_ticker', 'USDT/KRW', priority=priority)
+            self.record_ticker('upbit', 'USDT/KRW', ticker['last'], ticker.get('percentage'))
             return ticker['last']
         except Exception as e:
             print(f"USDT/KRW Error: {e}")
             return None
 
-    async def get_btc_order_book(self, client_name, symbol, limit=5):
+    async def refresh_fx_rates(self, quotes, priority=BACKGROUND):
+        """
+        Fetches the CROSS_SOURCES tickers for quotes whose FX rate is missing
+        or stale, one bulk ticker request per exchange.
+        """
+        by_exchange = {}
+        for quote in self.fx.missing(quotes):
+            exchange, symbol, _ = CROSS_SOURCES[quote]
+            by_exchange.setdefault(exchange, {})[symbol] = quote
+        if not by_exchange:
+            return
+
+        exchanges = list(by_exchange)
+        results = await asyncio.gather(
+            *[self.get_tickers(ex, list(by_exchange[ex]), priority) for ex in exchanges],
+            return_exceptions=True
+        )
+        for ex, tickers in zip(exchanges, results):
+            if isinstance(tickers, Exception):
+                print(f"FX Rate Error ({ex}): {tickers}")
+                continue
+            for symbol, quote in by_exchange[ex].items():
+                self.fx.set_cross(quote, (tickers.get(symbol) or {}).get('last'))
+
+    async def get_btc_order_book(self, client_name, symbol, limit=5, priority=BACKGROUND):
         try:
-            client = getattr(self, f"{client_name.lower()}_client")
-            
-            request_limit = limit
-            if client_name.lower() == 'bitfinex':
-                request_limit = 25
-            elif client_name.lower() == 'kucoin':
-                request_limit = 20
+            name = client_name.lower()
+            request_limit = self._snapshot_limit(name, limit)
+            weight = REQUEST_WEIGHTS['fetch_l2_order_book'] * (1 + request_limit // 100)
+            ob = await self._request(name, 'fetch_l2_order_book', symbol, limit=request_limit,
+                                     priority=priority, weight=weight)
             
-            ob = await client.fetch_l2_order_book(symbol, limit=request_limit)
-            
-            return {
-                'symbol': symbol, 
-                'bids': ob['bids'][:limit], 
-                'asks': ob['asks'][:limit]
-            }
+            book = self.get_local_book(name, symbol)
+            book.apply_snapshot(ob['bids'], ob['asks'], seq=ob.get('nonce'), timestamp=ob.get('timestamp'))
+            self.record_book(name, symbol, book.bids, book.asks, seq=book.seq)
+            return book.top(limit)
         except Exception as e:
             print(f"{client_name} OrderBook Error: {e}")
             return {'error': str(e)}
     
-    async def get_ticker(self, client_name, symbol):
+    async def get_ticker(self, client_name, symbol, priority=BACKGROUND):
         try:
-            client = getattr(self, f"{client_name.lower()}_client")
-            ticker = await client.fetch_ticker(symbol)
+            ticker = await self._request(client_name, 'fetch_ticker', symbol, priority=priority)
+            self.record_ticker(client_name, symbol, ticker.get('last'), ticker.get('percentage'))
             return {'symbol': symbol, 'last': ticker.get('last'), 'change_pct': ticker.get('percentage')}
         except Exception as e:
             print(f"{client_name} Ticker Error: {e}")
             return {'error': str(e)}
     
-    async def get_all_markets(self, exchange_name):
+    async def get_all_markets(self, exchange_name, priority=INTERACTIVE):
         try:
-            client = getattr(self, f"{exchange_name.lower()}_client")
-            markets = await client.load_markets()
+            markets = await self._request(exchange_name, 'load_markets', priority=priority)
             
-            return [{
+            market_list = [{
                 'symbol': s, 
                 'base': i['base'], 
                 'quote': i['quote'], 
                 'active': i.get('active', True)
             } for s, i in markets.items()]
+            await asyncio.get_event_loop().run_in_executor(None, self.market_cache.save, exchange_name, market_list)
+            return market_list
         except Exception as e:
             print(f"Market Load Error ({exchange_name}): {e}")
             return []
 
+    async def get_cached_markets(self, exchange_name):
+        """
+        Returns (markets, is_fresh) from the on-disk cache without touching the network.
+        """
+        return await asyncio.get_event_loop().run_in_executor(None, self.market_cache.load, exchange_name)
+
+    async def get_tickers(self, exchange_name, symbols, priority=BACKGROUND):
+        """
+        One fetch_tickers call for all symbols where the exchange supports it,
+        otherwise one fetch_ticker per symbol. Returns {symbol: ticker}.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        try:
+            client = self.exchanges.get(exchange_name)
+            if len(symbols) > 1 and client.has.get('fetchTickers'):
+                tickers = await self._request(exchange_name, 'fetch_tickers', symbols, priority=priority)
+                result = {}
+                for sym in symbols:
+                    ticker = tickers.get(sym)
+                    if ticker:
+                        self.record_ticker(exchange_name, sym, ticker.get('last'), ticker.get('percentage'))
+                        result[sym] = {'symbol': sym, 'last': ticker.get('last'), 'change_pct': ticker.get('percentage')}
+                    else:
+                        result[sym] = {'error': f"{sym} missing from {exchange_name} tickers"}
+                return result
+        except Exception as e:
+            print(f"{exchange_name} Tickers Error: {e}. Falling back to single tickers.")
+
+        results = await asyncio.gather(*[self.get_ticker(exchange_name, sym, priority) for sym in symbols])
+        return dict(zip(symbols, results))
+
     async def fetch_all_tickers(self, targets):
         """
         targets: [{'exchange': 'Binance', 'symbol': 'BTC/USDT'}, ...]
         """
-        tasks = [self.get_ticker(t['exchange'], t['symbol']) for t in targets]
-        return await asyncio.gather(*tasks)
+        by_exchange = {}
+        for t in targets:
+            by_exchange.setdefault(t['exchange'], []).append(t['symbol'])
 
-    async def fetch_ohlcv_history(self, exchange_name, symbol, period):
+        exchanges = list(by_exchange)
+        results = await asyncio.gather(*[self.get_tickers(ex, by_exchange[ex]) for ex in exchanges])
+        tickers = dict(zip(exchanges, results))
+        return [tickers[t['exchange']][t['symbol']] for t in targets]
+
+    async def fetch_ohlcv_history(self, exchange_name, symbol, period, priority=BACKGROUND):
         try:
-            client = getattr(self, f"{exchange_name.lower()}_client")
+            client = self.exchanges.get(exchange_name)
             timeframe = '1h'
             limit = 100
             
@@ -104,22 +284,28 @@ class PriceService:
                 limit = 365
 
             if client.has['fetchOHLCV']:
-                ohlcv = await client.fetch_ohlcv(symbol, timeframe, limit=limit)
+                key = (exchange_name.lower(), symbol, timeframe)
+                now_ms = client.milliseconds()
+                entry, since = self.candle_cache.plan(key, timeframe, limit, now_ms)
+
+                if since is False:
+                    candles = entry.candles(limit)
+                elif since is None:
+                    ohlcv = await self._request(exchange_name, 'fetch_ohlcv', symbol, timeframe,
+                                                limit=limit, priority=priority)
+                    candles = self.candle_cache.store(key, timeframe, limit, ohlcv, now_ms).candles(limit)
+                else:
+                    new_limit = (now_ms - since) // entry.timeframe_ms + 2
+                    ohlcv = await self._request(exchange_name, 'fetch_ohlcv', symbol, timeframe,
+                                                since=since, limit=new_limit, priority=priority)
+                    entry = self.candle_cache.store(key, timeframe, limit, ohlcv, now_ms, entry, full=False)
+                    candles = entry.candles(limit)
                 
-                history = []
-                for candle in ohlcv:
-                    history.append({
-                        'ts': datetime.fromtimestamp(candle[0]/1000),
-                        'price': candle[4],
-                        'bid': candle[3],
-                        'high': candle[2],
-                        'low': candle[3]
-                    })
-                return history
+                return candles
             else:
                 print(f"{exchange_name} does not support OHLCV.")
-                return []
+                return TimeSeries.empty(*CANDLE_COLUMNS)
                 
         except Exception as e:
             print(f"OHLCV Error: {e}")
-            return []
\ No newline at end of file
+            return TimeSeries.empty(*CANDLE_COLUMNS)
\ No newline at end of file
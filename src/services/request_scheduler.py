@@ -0,0 +1,120 @@
+import asyncio, heapq, itertools, time
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, weight):
+        self._refill()
+        needed = min(weight, self.capacity) - self.tokens
+        return needed / self.rate if needed > 0 else 0
+
+    def take(self, weight):
+        self._refill()
+        self.tokens -= weight
+
+class RequestScheduler:
+    """
+    Routes exchange REST calls through one token bucket per exchange.
+    Identical requests in flight share a single call (single-flight), and
+    waiting requests are granted tokens by priority, then arrival order.
+    A caller joining a queued request raises it to the caller's priority.
+
+    rate_shares scales an exchange's budget when several processes call it
+    with the same API limits, e.g. {'binance': 0.25} for one of four.
+    """
+    def __init__(self, burst_seconds=1.0, rate_shares=None):
+        self.burst_seconds = burst_seconds
+        self.rate_shares = rate_shares or {}
+        self.buckets = {}
+        self.queues = {}
+        self.dispatchers = {}
+        self.inflight = {}
+        self.waiting = {}
+        self.order = itertools.count()
+        self.stats = {'requests': 0, 'coalesced': 0, 'throttled_ms': 0.0}
+
+    def configure(self, exchange, rate_limit_ms):
+        """
+        rate_limit_ms: ccxt `rateLimit`, milliseconds per unit of request weight.
+        """
+        if exchange in self.buckets:
+            return
+        rate = 1000.0 / max(rate_limit_ms, 1) * self.rate_shares.get(exchange, 1.0)
+        self.buckets[exchange] = TokenBucket(rate, max(1.0, rate * self.burst_seconds))
+        self.queues[exchange] = []
+
+    async def submit(self, exchange, key, factory, weight=1, priority=BACKGROUND):
+        task = self.inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            self._promote(exchange, key, priority)
+            return await asyncio.shield(task)
+
+        self.stats['requests'] += 1
+        task = asyncio.ensure_future(self._run(exchange, key, factory, weight, priority))
+        self.inflight[key] = task
+        task.add_done_callback(lambda t: self.inflight.pop(key, None) if self.inflight.get(key) is t else None)
+        return await asyncio.shield(task)
+
+    async def _run(self, exchange, key, factory, weight, priority):
+        await self._acquire(exchange, key, weight, priority)
+        return await factory()
+
+    async def _acquire(self, exchange, key, weight, priority):
+        if exchange not in self.buckets:
+            return
+        waiter = asyncio.get_event_loop().create_future()
+        heapq.heappush(self.queues[exchange], (priority, next(self.order), weight, waiter))
+        self.waiting[key] = (priority, weight, waiter)
+
+        dispatcher = self.dispatchers.get(exchange)
+        if dispatcher is None or dispatcher.done():
+            self.dispatchers[exchange] = asyncio.ensure_future(self._dispatch(exchange))
+
+        start = time.monotonic()
+        try:
+            await waiter
+        finally:
+            self.waiting.pop(key, None)
+        self.stats['throttled_ms'] += (time.monotonic() - start) * 1000
+
+    def _promote(self, exchange, key, priority):
+        """
+        Queues the waiting request again at the joining caller's priority.
+        Both heap entries share one waiter; whichever is granted first wins
+        and the dispatcher skips the other.
+        """
+        entry = self.waiting.get(key)
+        if entry is None or priority >= entry[0]:
+            return
+        _, weight, waiter = entry
+        self.waiting[key] = (priority, weight, waiter)
+        heapq.heappush(self.queues[exchange], (priority, next(self.order), weight, waiter))
+
+    async def _dispatch(self, exchange):
+        queue = self.queues[exchange]
+        bucket = self.buckets[exchange]
+        while queue:
+            _, _, weight, waiter = queue[0]
+            if waiter.done():
+                heapq.heappop(queue)
+                continue
+            delay = bucket.delay_for(weight)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            heapq.heappop(queue)
+            bucket.take(weight)
+            waiter.set_result(None)
@@ -0,0 +1,211 @@
+import asyncio, time
+
+RATE_KEY = 'usdt_krw'
+# How long the first slot polling an exchange waits for the others to join its ticker request
+TICKER_BATCH_WINDOW = 0.02
+
+class MarketStream:
+    """
+    Pushes order book / ticker updates for the tracker slots as they arrive.
+    Each exchange streams over WebSocket and falls back to REST polling
+    while its stream is down, retrying the stream with exponential backoff.
+    Polling slots wake on shared poll_interval ticks, so the slots of one
+    exchange fetch their tickers in one get_tickers call per tick.
+    """
+    def __init__(self, price_service, on_update, poll_interval=1.0, max_backoff=60):
+        self.price_service = price_service
+        self.on_update = on_update
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+
+        self.tasks = []
+        self.running = False
+        self.failures = {}
+        self.retry_at = {}
+        self.stats = {}
+        self.ticker_batches = {}
+
+    def start(self, targets, with_rate=True):
+        self.stop()
+        self.running = True
+        loop = asyncio.get_event_loop()
+        for target in targets:
+            self.tasks.append(loop.create_task(self._run_target(target)))
+        if with_rate:
+            self.tasks.append(loop.create_task(self._run_rate()))
+
+    def stop(self):
+        self.running = False
+        for task in self.tasks:
+            task.cancel()
+        self.tasks = []
+        for batch in self.ticker_batches.values():
+            batch['task'].cancel()
+        self.ticker_batches = {}
+
+    def mode(self, exchange):
+        return 'stream' if self._stream_ok(exchange) else 'rest'
+
+    def _stream_ok(self, exchange):
+        if not self.price_service.has_stream(exchange):
+            return False
+        return time.monotonic() >= self.retry_at.get(exchange.lower(), 0)
+
+    def _mark_failed(self, exchange, error):
+        name = exchange.lower()
+        if time.monotonic() < self.retry_at.get(name, 0):
+            return
+        count = self.failures.get(name, 0) + 1
+        self.failures[name] = count
+        delay = min(self.max_backoff, 2 ** count)
+        self.retry_at[name] = time.monotonic() + delay
+        self._stat(exchange)['reconnects'] += 1
+        print(f"{exchange} Stream Error: {error}. Falling back to REST for {delay}s")
+
+    def _mark_ok(self, exchange, exchange_ts=None):
+        name = exchange.lower()
+        self.failures[name] = 0
+        stat = self._stat(exchange)
+        stat['messages'] += 1
+        if exchange_ts:
+            latency = time.time() * 1000 - exchange_ts
+            prev = stat['latency_ms']
+            stat['latency_ms'] = latency if prev is None else prev * 0.9 + latency * 0.1
+
+    def _stat(self, exchange):
+        return self.stats.setdefault(exchange.lower(), {'messages': 0, 'reconnects': 0, 'latency_ms': None})
+
+    def _push(self, key, kind, payload):
+        try:
+            self.on_update(key, kind, payload)
+        except Exception as e:
+            print(f"Stream Update Error ({key}): {e}")
+
+    async def _run_target(self, target):
+        ex = target['exchange']
+        try:
+            while self.running:
+                if self._stream_ok(ex):
+                    try:
+                        await self._stream_target(target)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self._mark_failed(ex, e)
+                else:
+                    await self._poll_target(target)
+                    await asyncio.sleep(self.poll_interval - time.monotonic() % self.poll_interval)
+        except asyncio.CancelledError:
+            pass
+
+    async def _stream_target(self, target):
+        watchers = [
+            asyncio.ensure_future(self._watch_order_book(target)),
+            asyncio.ensure_future(self._watch_ticker(target)),
+        ]
+        try:
+            done, _ = await asyncio.wait(watchers, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in watchers:
+                task.cancel()
+
+    async def _watch_order_book(self, target):
+        ex, sym = target['exchange'], target['symbol']
+        client = self.price_service.get_stream_client(ex)
+        book = self.price_service.get_local_book(ex, sym)
+        depth = self.price_service.book_depth
+        book.synced = False
+
+        if not hasattr(client, 'watch_order_book_delta'):
+            while self.running:
+                ob = await client.watch_order_book(sym)
+                self._mark_ok(ex, ob.get('timestamp'))
+                book.apply_snapshot(ob['bids'], ob['asks'], seq=ob.get('nonce'), timestamp=ob.get('timestamp'))
+                self.price_service.record_book(ex, sym, book.bids, book.asks, seq=book.seq)
+                self._push(target['key'], 'ob', book.top(depth))
+            return
+
+        resyncing = False
+        while self.running:
+            msg = await client.watch_order_book_delta(sym)
+            self._mark_ok(ex, msg.get('timestamp'))
+            if msg['type'] == 'snapshot':
+                book.apply_snapshot(msg['bids'], msg['asks'], seq=msg.get('seq'), timestamp=msg.get('timestamp'))
+                self.price_service.record_book(ex, sym, book.bids, book.asks, seq=book.seq)
+                resyncing = False
+            elif not book.apply_delta(msg['bids'], msg['asks'], msg.get('first_seq'), msg.get('last_seq'), msg.get('timestamp')):
+                if not resyncing:
+                    resyncing = True
+                    await client.request_snapshot(sym)
+                continue
+            else:
+                self.price_service.record_book(ex, sym, msg['bids'], msg['asks'], snapshot=False,
+                                               seq=msg.get('first_seq'), last_seq=msg.get('last_seq'))
+            self._push(target['key'], 'ob', book.top(depth))
+
+    async def _watch_ticker(self, target):
+        ex, sym = target['exchange'], target['symbol']
+        client = self.price_service.get_stream_client(ex)
+        while self.running:
+            ticker = await client.watch_ticker(sym)
+            self._mark_ok(ex, ticker.get('timestamp'))
+            self.price_service.record_ticker(ex, sym, ticker.get('last'), ticker.get('percentage'))
+            self._push(target['key'], 'ticker', {
+                'symbol': sym,
+                'last': ticker.get('last'),
+                'change_pct': ticker.get('percentage')
+            })
+
+    async def _poll_target(self, target):
+        ex, sym = target['exchange'], target['symbol']
+        ob, ticker = await asyncio.gather(
+            self.price_service.get_btc_order_book(ex, sym, self.price_service.book_depth),
+            self._poll_ticker(ex, sym)
+        )
+        self._push(target['key'], 'ob', ob)
+        self._push(target['key'], 'ticker', ticker)
+
+    async def _poll_ticker(self, exchange, symbol):
+        """
+        Joins the exchange's open ticker batch, or opens one that collects
+        symbols for TICKER_BATCH_WINDOW before a single get_tickers call.
+        """
+        batch = self.ticker_batches.get(exchange)
+        if batch is None:
+            batch = self.ticker_batches[exchange] = {'symbols': []}
+            batch['task'] = asyncio.ensure_future(self._fetch_ticker_batch(exchange, batch))
+        batch['symbols'].append(symbol)
+        tickers = await asyncio.shield(batch['task'])
+        return tickers[symbol]
+
+    async def _fetch_ticker_batch(self, exchange, batch):
+        await asyncio.sleep(TICKER_BATCH_WINDOW)
+        if self.ticker_batches.get(exchange) is batch:
+            del self.ticker_batches[exchange]
+        return await self.price_service.get_tickers(exchange, batch['symbols'])
+
+    async def _run_rate(self):
+        try:
+            while self.running:
+                if self._stream_ok('Upbit'):
+                    try:
+                        client = self.price_service.get_stream_client('Upbit')
+                        while self.running:
+                            ticker = await client.watch_ticker('USDT/KRW')
+                            self._mark_ok('Upbit', ticker.get('timestamp'))
+                            if ticker.get('last'):
+                                self.price_service.record_ticker('Upbit', 'USDT/KRW', ticker['last'], ticker.get('percentage'))
+                                self._push(RATE_KEY, 'rate', ticker['last'])
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        self._mark_failed('Upbit', e)
+                else:
+                    rate = await self.price_service.get_usdt_krw_price()
+                    if rate:
+                        self._push(RATE_KEY, 'rate', rate)
+                    await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,341 @@
+import os, json, time, gzip, mmap, shutil, threading, bisect
+import numpy as np
+
+TICK_LOG_DIR = os.getenv('TICK_LOG_DIR')
+SEGMENT_SECONDS = int(os.getenv('TICK_LOG_SEGMENT_SECONDS', 3600))
+TICK_LOG_COMPRESS = os.getenv('TICK_LOG_COMPRESS', '0') == '1'
+FLUSH_BYTES = 1 << 20
+FLUSH_INTERVAL = 1.0
+INDEX_STRIDE_MS = 1000
+
+# Every record is 32 bytes. A book message is one SNAPSHOT or DELTA header
+# whose `count` levels follow it as BID/ASK records; a TICKER stands alone.
+#   SNAPSHOT: a = seq               DELTA: a = first_seq, b = last_seq
+#   BID/ASK:  a = price, b = qty    TICKER: a = last, b = change %
+RECORD_DTYPE = np.dtype([
+    ('ts', '<i8'), ('stream', '<u2'), ('kind', 'u1'), ('flags', 'u1'),
+    ('count', '<u4'), ('a', '<f8'), ('b', '<f8')
+])
+SNAPSHOT, DELTA, BID, ASK, TICKER = 1, 2, 3, 4, 5
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+def _levels_array(levels):
+    """
+    [[price, qty], ...], a LevelView or a BookSide as an (n, 2) float array.
+    """
+    if hasattr(levels, 'prices'):
+        return np.column_stack((np.frombuffer(levels.prices, dtype=np.float64),
+                                np.frombuffer(levels.qtys, dtype=np.float64)))
+    if not len(levels):
+        return np.empty((0, 2))
+    return np.asarray([(lvl[0], lvl[1]) for lvl in levels], dtype=np.float64)
+
+def _nan(value):
+    return np.nan if value is None else value
+
+class TickRecorder:
+    """
+    Appends order book messages and tickers to fixed-width binary segments,
+    one file per SEGMENT_SECONDS and process. Records are buffered and
+    written in blocks; each segment has a JSON sidecar holding its stream
+    table and a sparse time index, rewritten on every flush.
+
+    on_new_segment() runs when a segment opens, so the caller can write
+    fresh snapshots and keep every segment replayable on its own. Closed
+    segments are gzipped in the background when compress is set.
+    """
+    def __init__(self, directory, segment_seconds=SEGMENT_SECONDS, compress=TICK_LOG_COMPRESS, on_new_segment=None):
+        self.directory = directory
+        self.segment_ms = segment_seconds * 1000
+        self.compress = compress
+        self.on_new_segment = on_new_segment
+        self.file = None
+        self.path = None
+        self.segment_end = 0
+        self.streams = {}
+        self.buffer = []
+        self.buffered = 0
+        self.last_flush = time.monotonic()
+        self.stats = {'records': 0, 'bytes': 0, 'segments': 0}
+        self.compressors = []
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self, ts_ms):
+        self._close_segment()
+        start = ts_ms - ts_ms % self.segment_ms
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime(start / 1000))
+        name, n = f"ticks-{stamp}-{os.getpid()}", 0
+        self.path = os.path.join(self.directory, f"{name}.tlog")
+        while os.path.exists(self.path) or os.path.exists(f"{self.path}.gz"):
+            n += 1
+            self.path = os.path.join(self.directory, f"{name}-{n}.tlog")
+        self.file = open(self.path, 'wb')
+        self.segment_end = start + self.segment_ms
+        self.streams = {}
+        self.records = 0
+        self.index = []
+        self.first_ts = None
+        self.last_ts = None
+        self.stats['segments'] += 1
+        if self.on_new_segment:
+            self.on_new_segment()
+
+    def _stream_id(self, exchange, symbol):
+        key = (exchange.lower(), symbol)
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.streams[key] = len(self.streams)
+        return stream
+
+    def _append(self, ts_ms, records):
+        if self.first_ts is None:
+            self.first_ts = ts_ms
+        if not self.index or ts_ms - self.index[-1][0] >= INDEX_STRIDE_MS:
+            self.index.append((ts_ms, self.records))
+        self.last_ts = ts_ms
+        self.records += len(records)
+        self.buffer.append(records.tobytes())
+        self.buffered += records.nbytes
+        if self.buffered >= FLUSH_BYTES or time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def _begin(self, ts_ms):
+        ts_ms = _now_ms() if ts_ms is None else int(ts_ms)
+        if self.file is None or ts_ms >= self.segment_end:
+            self._open_segment(ts_ms)
+        return ts_ms
+
+    def record_book(self, exchange, symbol, bids, asks, snapshot=True, seq=None, last_seq=None, ts_ms=None):
+        """
+        A full book (snapshot=True) or the changed levels of a delta; qty 0
+        removes a level.
+        """
+        try:
+            ts_ms = self._begin(ts_ms)
+            bids, asks = _levels_array(bids), _levels_array(asks)
+            n_bids, count = len(bids), len(bids) + len(asks)
+
+            records = np.zeros(count + 1, dtype=RECORD_DTYPE)
+            records['ts'] = ts_ms
+            records['stream'] = self._stream_id(exchange, symbol)
+            records['kind'][0] = SNAPSHOT if snapshot else DELTA
+            records['count'][0] = count
+            records['a'][0] = _nan(seq)
+            records['b'][0] = _nan(last_seq)
+            records['kind'][1:n_bids + 1] = BID
+            records['kind'][n_bids + 1:] = ASK
+            if count:
+                levels = np.concatenate((bids, asks))
+                records['a'][1:] = levels[:, 0]
+                records['b'][1:] = levels[:, 1]
+            self._append(ts_ms, records)
+        except Exception as e:
+            print(f"Tick Log Error: {e}")
+
+    def record_ticker(self, exchange, symbol, last, change_pct=None, ts_ms=None):
+        if last is None: return
+        try:
+            ts_ms = self._begin(ts_ms)
+            records = np.zeros(1, dtype=RECORD_DTYPE)
+            records['ts'] = ts_ms
+            records['stream'] = self._stream_id(exchange, symbol)
+            records['kind'] = TICKER
+            records['a'] = last
+            records['b'] = _nan(change_pct)
+            self._append(ts_ms, records)
+        except Exception as e:
+            print(f"Tick Log Error: {e}")
+
+    def flush(self):
+        if self.file is None: return
+        if self.buffer:
+            data = b''.join(self.buffer)
+            self.file.write(data)
+            self.file.flush()
+            self.stats['records'] += len(data) // RECORD_DTYPE.itemsize
+            self.stats['bytes'] += len(data)
+            self.buffer = []
+            self.buffered = 0
+        self._write_index()
+        self.last_flush = time.monotonic()
+
+    def _write_index(self):
+        streams = [None] * len(self.streams)
+        for (exchange, symbol), stream in self.streams.items():
+            streams[stream] = [exchange, symbol]
+        tmp_path = f"{self.path}.idx.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'streams': streams,
+                'records': self.records,
+                'start_ms': self.first_ts,
+                'end_ms': self.last_ts,
+                'index': self.index
+            }, f)
+        os.replace(tmp_path, f"{self.path}.idx")
+
+    def _close_segment(self):
+        if self.file is None: return
+        self.flush()
+        self.file.close()
+        self.file = None
+        if self.compress:
+            self.compressors = [t for t in self.compressors if t.is_alive()]
+            thread = threading.Thread(target=_compress_segment, args=(self.path,), daemon=True)
+            thread.start()
+            self.compressors.append(thread)
+
+    def close(self):
+        """
+        Closes the open segment and waits for pending compression.
+        """
+        self._close_segment()
+        for thread in self.compressors:
+            thread.join()
+        self.compressors = []
+
+def _compress_segment(path):
+    try:
+        with open(path, 'rb') as src, gzip.open(f"{path}.gz.tmp", 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(f"{path}.gz.tmp", f"{path}.gz")
+        os.remove(path)
+    except Exception as e:
+        print(f"Tick Log Compress Error ({path}): {e}")
+
+class TickSegment:
+    """
+    One segment opened for reading: memory-mapped when raw, decompressed
+    into memory when gzipped. `records` is a structured array over the data.
+    """
+    def __init__(self, path):
+        self.path = path
+        base = path[:-3] if path.endswith('.gz') else path
+        with open(f"{base}.idx", 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.streams = [tuple(s) for s in meta['streams']]
+        self.start_ms = meta['start_ms']
+        self.end_ms = meta['end_ms']
+        self.index = meta['index']
+        self.map = None
+
+        if path.endswith('.gz'):
+            with gzip.open(path, 'rb') as f:
+                data = f.read()
+        elif os.path.getsize(path):
+            with open(path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            data = self.map
+        else:
+            data = b''
+        # Only whole records that the sidecar knows about; a writer may be mid-block
+        count = min(len(data) // RECORD_DTYPE.itemsize, meta['records'])
+        self.records = np.frombuffer(data, dtype=RECORD_DTYPE, count=count)
+
+    def headers(self, end_ms=None):
+        """
+        Record positions of every message (book headers and tickers), up to end_ms.
+        """
+        stop = len(self.records)
+        if end_ms is not None and self.index:
+            # First indexed message after end_ms bounds the scan
+            i = bisect.bisect_right([ts for ts, _ in self.index], end_ms)
+            if i < len(self.index):
+                stop = self.index[i][1]
+        kinds = self.records['kind'][:stop]
+        positions = np.flatnonzero((kinds == SNAPSHOT) | (kinds == DELTA) | (kinds == TICKER))
+        if end_ms is not None:
+            positions = positions[self.records['ts'][positions] <= end_ms]
+        return positions
+
+    def book_levels(self, pos):
+        """
+        (bids, asks) as [price, qty] lists for the book message at `pos`.
+        """
+        count = int(self.records['count'][pos])
+        levels = self.records[pos + 1:pos + 1 + count]
+        is_bid = levels['kind'] == BID
+        bids = np.column_stack((levels['a'][is_bid], levels['b'][is_bid])).tolist()
+        asks = np.column_stack((levels['a'][~is_bid], levels['b'][~is_bid])).tolist()
+        return bids, asks
+
+    def close(self):
+        self.records = None
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # A caller still holds a view; the map goes with it
+                pass
+            self.map = None
+
+class TickLogReader:
+    """
+    Reads every segment in a directory. messages() merges segments written
+    at the same time (one per collector process) into timestamp order.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.paths = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.tlog') or name.endswith('.tlog.gz'):
+                base = name[:-3] if name.endswith('.gz') else name
+                if os.path.exists(os.path.join(directory, f"{base}.idx")):
+                    self.paths.append(os.path.join(directory, name))
+
+    def _segment_groups(self, start_ms, end_ms):
+        """
+        Segments overlapping [start_ms, end_ms], grouped where their time
+        ranges overlap each other.
+        """
+        segments = []
+        for path in self.paths:
+            try:
+                segment = TickSegment(path)
+            except Exception as e:
+                print(f"Tick Log Read Error ({path}): {e}")
+                continue
+            if segment.start_ms is None or (end_ms is not None and segment.start_ms > end_ms) \
+                    or (start_ms is not None and segment.end_ms < start_ms):
+                segment.close()
+                continue
+            segments.append(segment)
+        segments.sort(key=lambda s: s.start_ms)
+
+        group, group_end = [], None
+        for segment in segments:
+            if group and segment.start_ms > group_end:
+                yield group
+                group = []
+            group.append(segment)
+            group_end = segment.end_ms if len(group) == 1 else max(group_end, segment.end_ms)
+        if group:
+            yield group
+
+    def messages(self, start_ms=None, end_ms=None):
+        """
+        Yields (ts_ms, exchange, symbol, kind, a, b, bids, asks) in time order.
+        bids/asks are lists of [price, qty] for book messages, else None.
+        Segments are read from their first message so books can be rebuilt
+        from the opening snapshots; callers skip what is before start_ms.
+        """
+        for group in self._segment_groups(start_ms, end_ms):
+            try:
+                parts = [(s, s.headers(end_ms)) for s in group]
+                ts = np.concatenate([s.records['ts'][pos] for s, pos in parts])
+                owner = np.concatenate([np.full(len(pos), i) for i, (_, pos) in enumerate(parts)])
+                position = np.concatenate([pos for _, pos in parts])
+                order = np.argsort(ts, kind='stable')
+
+                for i in order:
+                    segment = group[owner[i]]
+                    pos = position[i]
+                    _, stream, kind, _, _, a, b = segment.records[pos].item()
+                    exchange, symbol = segment.streams[stream]
+                    bids, asks = (None, None) if kind == TICKER else segment.book_levels(pos)
+                    yield int(ts[i]), exchange, symbol, kind, a, b, bids, asks
+            finally:
+                for segment in group:
+                    segment.close()
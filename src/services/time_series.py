@@ -0,0 +1,168 @@
+import numpy as np
+
+CANDLE_COLUMNS = ('open', 'high', 'low', 'price', 'volume')
+SPREAD_COLUMNS = ('bid', 'ask', 'spread')
+
+class TimeSeries:
+    """
+    Structure-of-arrays time series: `ts` as int64 epoch milliseconds plus
+    named float64 columns of the same length, sorted by ts.
+
+    Slicing returns a view over the same buffers without copying. Appending
+    grows the buffers geometrically; a view never has spare capacity, so
+    appending to a view copies it first and never touches its parent.
+    """
+    def __init__(self, ts=(), **columns):
+        self._ts = np.asarray(ts, dtype=np.int64)
+        self._cols = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        self._size = len(self._ts)
+        for name, values in self._cols.items():
+            if len(values) != self._size:
+                raise ValueError(f"Column '{name}' has {len(values)} rows, expected {self._size}")
+
+    @classmethod
+    def empty(cls, *names):
+        return cls((), **{name: () for name in names})
+
+    @classmethod
+    def from_rows(cls, rows, ts_key, names, default=0.0):
+        """
+        Builds a series from dict rows (e.g. a database cursor) in one pass per column.
+        """
+        rows = rows if isinstance(rows, list) else list(rows)
+        count = len(rows)
+        ts = np.fromiter((r[ts_key] for r in rows), dtype=np.int64, count=count)
+        columns = {
+            name: np.fromiter((r.get(name) or default for r in rows), dtype=np.float64, count=count)
+            for name in names
+        }
+        return cls(ts, **columns)
+
+    @classmethod
+    def from_candles(cls, candles):
+        """
+        ccxt OHLCV rows [ts, open, high, low, close, volume] -> series.
+        """
+        if not len(candles):
+            return cls.empty(*CANDLE_COLUMNS)
+        table = np.asarray(candles, dtype=np.float64).reshape(len(candles), -1)
+        columns = {name: table[:, i + 1] for i, name in enumerate(CANDLE_COLUMNS) if i + 1 < table.shape[1]}
+        return cls(table[:, 0].astype(np.int64), **columns)
+
+    @classmethod
+    def concat(cls, parts):
+        non_empty = [p for p in parts if len(p)]
+        if len(non_empty) <= 1:
+            return non_empty[0] if non_empty else parts[0]
+        parts = non_empty
+        names = parts[0].columns
+        return cls(
+            np.concatenate([p.ts for p in parts]),
+            **{name: np.concatenate([p[name] for p in parts]) for name in names}
+        )
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, name):
+        return name in self._cols
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._cols[key][:self._size]
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._size)
+            sl = slice(start, stop, step)
+            return TimeSeries(self._ts[sl], **{name: values[sl] for name, values in self._cols.items()})
+        raise TypeError("TimeSeries indices must be column names or slices")
+
+    def __repr__(self):
+        return f"TimeSeries({self._size} rows, columns={self.columns})"
+
+    @property
+    def ts(self):
+        return self._ts[:self._size]
+
+    @property
+    def columns(self):
+        return tuple(self._cols)
+
+    @property
+    def nbytes(self):
+        return self._size * (8 + 8 * len(self._cols))
+
+    def row(self, i):
+        return {'ts': int(self.ts[i]), **{name: float(values[i]) for name, values in self._cols.items()}}
+
+    def last_ts(self):
+        return int(self._ts[self._size - 1]) if self._size else None
+
+    def between(self, start_ms, end_ms=None):
+        """
+        View of rows with start_ms <= ts <= end_ms.
+        """
+        ts = self.ts
+        lo = int(np.searchsorted(ts, start_ms, side='left'))
+        hi = self._size if end_ms is None else int(np.searchsorted(ts, end_ms, side='right'))
+        return self[lo:hi]
+
+    def before(self, ts_ms):
+        return self[:int(np.searchsorted(self.ts, ts_ms, side='left'))]
+
+    def tail(self, n):
+        return self[max(0, self._size - n):]
+
+    def take(self, indices):
+        """
+        Copy of the rows at `indices` (sorted ascending to keep ts ordered).
+        """
+        return TimeSeries(self.ts[indices], **{name: self[name][indices] for name in self._cols})
+
+    def copy(self):
+        return TimeSeries(self.ts.copy(), **{name: self[name].copy() for name in self._cols})
+
+    def with_columns(self, **columns):
+        """
+        View sharing ts and the existing columns, with columns added or replaced.
+        """
+        return TimeSeries(self.ts, **{**{name: self[name] for name in self._cols}, **columns})
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        if needed <= len(self._ts):
+            return
+        capacity = max(needed, len(self._ts) * 2, 16)
+        ts = np.empty(capacity, dtype=np.int64)
+        ts[:self._size] = self.ts
+        self._ts = ts
+        for name, values in self._cols.items():
+            grown = np.empty(capacity, dtype=np.float64)
+            grown[:self._size] = values[:self._size]
+            self._cols[name] = grown
+
+    def append(self, ts, **values):
+        self._reserve(1)
+        self._ts[self._size] = ts
+        for name, column in self._cols.items():
+            column[self._size] = values.get(name, np.nan)
+        self._size += 1
+
+    def extend(self, other):
+        n = len(other)
+        if not n: return
+        self._reserve(n)
+        end = self._size + n
+        self._ts[self._size:end] = other.ts
+        for name, column in self._cols.items():
+            column[self._size:end] = other[name] if name in other else np.nan
+        self._size = end
+
+    def drop_head(self, n):
+        """
+        Drops the oldest n rows by moving the start of the buffers; earlier views stay valid.
+        """
+        if n <= 0: return
+        n = min(n, self._size)
+        self._ts = self._ts[n:]
+        self._cols = {name: values[n:] for name, values in self._cols.items()}
+        self._size -= n
@@ -0,0 +1,199 @@
+"""
+Local stand-in for a ccxt.async_support exchange, so PriceService can be
+load-tested without touching real venues or their rate limits. Books and
+tickers come from FakeMarket random walks, OHLCV from a deterministic
+curve, and every call can be delayed and fail with errors or 429s.
+
+    FAKE_EXCHANGE=1 python src/main.py
+    FAKE_EXCHANGE="latency=0.08,jitter=0.04,error_rate=0.01,rate_limit_rate=0.01" python src/main.py
+
+Options: latency/jitter (seconds, split around the moment the book is
+stamped), error_rate and rate_limit_rate (probability per call),
+server_rate (calls per second the venue accepts before answering 429,
+0 = unlimited), interval (seconds per market step), depth, seed.
+"""
+import re, math, time, random, asyncio
+
+from services.request_scheduler import TokenBucket
+from simulator.fake_ws_server import FakeMarket, _initial_price
+
+try:
+    from ccxt.base.errors import NetworkError, RateLimitExceeded
+except ImportError:
+    class NetworkError(Exception):
+        pass
+
+    class RateLimitExceeded(NetworkError):
+        pass
+
+FAKE_BASES = [
+    'BTC', 'ETH', 'XRP', 'SOL', 'DOGE', 'ADA', 'TRX', 'AVAX', 'LINK', 'DOT',
+    'BCH', 'LTC', 'NEAR', 'APT', 'ATOM', 'ETC', 'XLM', 'HBAR', 'SUI', 'ARB',
+    'OP', 'FIL', 'SEI', 'SAND', 'AAVE'
+]
+FAKE_QUOTES = {'upbit': ['KRW', 'USDT', 'BTC']}
+DEFAULT_QUOTES = ['USDT', 'USDC', 'BTC']
+
+# ccxt `rateLimit` of the real exchanges, so the scheduler paces the same way
+RATE_LIMITS = {'binance': 50, 'upbit': 50, 'bybit': 20, 'bitfinex': 250, 'kucoin': 10}
+
+CONFIG_KEYS = {
+    'latency': float, 'jitter': float, 'error_rate': float, 'rate_limit_rate': float,
+    'server_rate': float, 'interval': float, 'depth': int, 'seed': int
+}
+
+def parse_config(text):
+    """
+    "latency=0.05,error_rate=0.01" -> {'latency': 0.05, 'error_rate': 0.01}.
+    "1" (or any text without '=') keeps the defaults.
+    """
+    config = {}
+    for part in (text or '').split(','):
+        if '=' not in part: continue
+        key, value = (s.strip() for s in part.split('=', 1))
+        if key not in CONFIG_KEYS:
+            print(f"Fake Exchange Config Error: unknown option '{key}'")
+            continue
+        config[key] = CONFIG_KEYS[key](value)
+    return config
+
+def timeframe_ms(timeframe):
+    match = re.fullmatch(r'(\d+)([mhdw])', timeframe)
+    if not match:
+        raise ValueError(f"Unsupported timeframe '{timeframe}'")
+    unit = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}[match.group(2)]
+    return int(match.group(1)) * unit
+
+class FakeExchange:
+    """
+    The subset of the ccxt.async_support client API that PriceService uses.
+    Markets advance lazily: a call steps a market once with the drift of
+    all the steps it missed, so idle symbols cost nothing.
+    """
+    def __init__(self, exchange_id, latency=0.05, jitter=0.02, error_rate=0.0, rate_limit_rate=0.0,
+                 server_rate=0.0, interval=0.1, depth=50, seed=None):
+        self.id = exchange_id
+        self.rateLimit = RATE_LIMITS.get(exchange_id, 50)
+        self.has = {'fetchTickers': True, 'fetchOHLCV': True}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.bucket = TokenBucket(server_rate, server_rate) if server_rate > 0 else None
+        self.interval = interval
+        self.depth = depth
+        self.rng = random.Random(seed)
+        self.markets = {}
+        self.stepped_at = {}
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0}
+
+    def milliseconds(self):
+        return int(time.time() * 1000)
+
+    def _market(self, symbol):
+        market = self.markets.get(symbol)
+        now = time.monotonic()
+        if market is None:
+            market = self.markets[symbol] = FakeMarket(symbol, self.depth, random.Random(self.rng.random()))
+            self.stepped_at[symbol] = now
+            return market
+
+        steps = int((now - self.stepped_at[symbol]) / self.interval)
+        if steps > 0:
+            if steps > 1:
+                market.mid *= 1 + market.rng.gauss(0, 0.0002 * math.sqrt(steps - 1))
+            market.step()
+            self.stepped_at[symbol] += steps * self.interval
+        return market
+
+    async def _call(self, endpoint, handler):
+        """
+        Waits half the latency, fails or runs handler, then waits the rest,
+        so results are stamped roughly when the venue would have served them.
+        """
+        self.stats['requests'] += 1
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay / 2)
+
+        limited = self.bucket is not None and self.bucket.delay_for(1) > 0
+        if limited or self.rng.random() < self.rate_limit_rate:
+            self.stats['rate_limited'] += 1
+            raise RateLimitExceeded(f"{self.id} {endpoint} 429 Too Many Requests")
+        if self.bucket:
+            self.bucket.take(1)
+        if self.rng.random() < self.error_rate:
+            self.stats['errors'] += 1
+            raise NetworkError(f"{self.id} {endpoint} 503 Service Unavailable")
+
+        result = handler()
+        if delay > 0:
+            await asyncio.sleep(delay / 2)
+        return result
+
+    def _ticker(self, symbol):
+        market = self._market(symbol)
+        ticker = market.ticker()
+        best_bid = max(market.bids) if market.bids else None
+        best_ask = min(market.asks) if market.asks else None
+        return {
+            'symbol': symbol, 'timestamp': self.milliseconds(),
+            'bid': best_bid, 'ask': best_ask, **ticker
+        }
+
+    async def load_markets(self, reload=False, params={}):
+        def handler():
+            quotes = FAKE_QUOTES.get(self.id, DEFAULT_QUOTES)
+            return {
+                f"{base}/{quote}": {'symbol': f"{base}/{quote}", 'base': base, 'quote': quote, 'active': True}
+                for quote in quotes for base in FAKE_BASES if base != quote
+            }
+        return await self._call('load_markets', handler)
+
+    async def fetch_ticker(self, symbol, params={}):
+        return await self._call('fetch_ticker', lambda: self._ticker(symbol))
+
+    async def fetch_tickers(self, symbols=None, params={}):
+        return await self._call('fetch_tickers', lambda: {
+            symbol: self._ticker(symbol) for symbol in (symbols or list(self.markets))
+        })
+
+    async def fetch_l2_order_book(self, symbol, limit=None, params={}):
+        def handler():
+            market = self._market(symbol)
+            book = market.snapshot()
+            if limit:
+                book = {'bids': book['bids'][:limit], 'asks': book['asks'][:limit]}
+            return {'symbol': symbol, 'timestamp': self.milliseconds(), 'nonce': market.seq, **book}
+        return await self._call('fetch_l2_order_book', handler)
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        """
+        Candles up to and including the open one. Prices follow a fixed curve
+        of the candle index, so overlapping requests agree with each other.
+        """
+        def handler():
+            step = timeframe_ms(timeframe)
+            last_open = self.milliseconds() // step * step
+            count = limit or 100
+            if since is None:
+                first = last_open - (count - 1) * step
+            else:
+                first = -(-since // step) * step
+                count = max(0, min(count, (last_open - first) // step + 1))
+            return [self._candle(symbol, step, first + i * step) for i in range(count)]
+        return await self._call('fetch_ohlcv', handler)
+
+    def _candle(self, symbol, step, open_ms):
+        base = _initial_price(symbol)
+        k = open_ms // step
+        level = lambda i: base * (1 + 0.03 * math.sin(i / 40) + 0.01 * math.sin(i / 6.7))
+        rng = random.Random(f"{symbol}:{step}:{open_ms}")
+        open_price, close_price = level(k - 1), level(k)
+        high = max(open_price, close_price) * (1 + rng.uniform(0, 0.002))
+        low = min(open_price, close_price) * (1 - rng.uniform(0, 0.002))
+        return [open_ms, open_price, high, low, close_price, rng.uniform(1, 100)]
+
+    async def close(self):
+        self.markets = {}
+        self.stepped_at = {}
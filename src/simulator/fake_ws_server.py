@@ -0,0 +1,279 @@
+import asyncio, argparse, json, math, random, time
+
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+    print("Warning: 'websockets' not installed. Fake stream server disabled.")
+
+def _initial_price(symbol):
+    if symbol.startswith('USDT/'):
+        return 1_400.0
+    return 130_000_000.0 if symbol.endswith('/KRW') else 95_000.0
+
+class FakeMarket:
+    """
+    Random-walk market on a fixed tick grid. Each step moves the mid price,
+    refreshes part of the book and returns the level changes as a delta.
+    """
+    def __init__(self, symbol, depth=20, rng=None):
+        self.symbol = symbol
+        self.rng = rng or random.Random()
+        self.mid = _initial_price(symbol)
+        self.open = self.mid
+        self.tick = self.mid * 0.00001
+        self.depth = depth
+        self.seq = 0
+        self.bids, self.asks = {}, {}
+        self.step()
+
+    def _levels(self, book, is_bid):
+        if is_bid:
+            best, sign = math.ceil(self.mid / self.tick) - 1, -1
+        else:
+            best, sign = math.floor(self.mid / self.tick) + 1, 1
+        levels = {}
+        for i in range(self.depth):
+            price = round((best + sign * i) * self.tick, 8)
+            qty = book.get(price)
+            if qty is None or self.rng.random() < 0.3:
+                qty = round(self.rng.uniform(0.01, 3), 4)
+            levels[price] = qty
+        return levels
+
+    def step(self):
+        self.mid *= 1 + self.rng.gauss(0, 0.0002)
+        bids, asks = self._levels(self.bids, True), self._levels(self.asks, False)
+        delta = {'bids': _diff(self.bids, bids), 'asks': _diff(self.asks, asks)}
+        self.bids, self.asks = bids, asks
+        self.seq += 1
+        return delta
+
+    def snapshot(self):
+        return {
+            'bids': [[p, q] for p, q in sorted(self.bids.items(), reverse=True)],
+            'asks': [[p, q] for p, q in sorted(self.asks.items())]
+        }
+
+    def ticker(self):
+        return {'last': self.mid, 'percentage': (self.mid / self.open - 1) * 100}
+
+def _diff(old, new):
+    changes = [[p, q] for p, q in new.items() if old.get(p) != q]
+    changes += [[p, 0] for p in old if p not in new]
+    return changes
+
+class FakeStreamServer:
+    """
+    Local WebSocket server speaking a minimal subscribe/push protocol.
+    Order book channels send a snapshot followed by sequenced deltas.
+    latency/jitter delay every push, gap_every drops one delta in N to force
+    a resync, drop_after closes the connection after N messages so reconnect
+    and REST fallback paths can be exercised offline.
+    """
+    def __init__(self, host='127.0.0.1', port=8765, interval=0.1, latency=0.0,
+                 jitter=0.0, drop_after=0, gap_every=0, depth=20, seed=None):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_after = drop_after
+        self.gap_every = gap_every
+        self.depth = depth
+        self.rng = random.Random(seed)
+        self.server = None
+
+    async def start(self):
+        self.server = await websockets.serve(self.handle, self.host, self.port)
+        return self
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    async def handle(self, ws, path=None):
+        subscriptions = set()
+        snapshot_requests = set()
+        pusher = None
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                key = (msg['exchange'], msg['symbol'])
+                if msg.get('op') == 'subscribe':
+                    subscriptions.add((msg['exchange'], msg['channel'], msg['symbol']))
+                    if msg['channel'] == 'orderbook':
+                        snapshot_requests.add(key)
+                elif msg.get('op') == 'snapshot':
+                    snapshot_requests.add(key)
+
+                if pusher is None and subscriptions:
+                    pusher = asyncio.ensure_future(self._push_loop(ws, subscriptions, snapshot_requests))
+        except Exception:
+            pass
+        finally:
+            if pusher:
+                pusher.cancel()
+
+    async def _push_loop(self, ws, subscriptions, snapshot_requests):
+        markets = {}
+        sent = 0
+        while True:
+            deltas = {}
+            for exchange, _, symbol in list(subscriptions):
+                key = (exchange, symbol)
+                if key in deltas:
+                    continue
+                if key not in markets:
+                    markets[key] = FakeMarket(symbol, self.depth, random.Random(self.rng.random()))
+                deltas[key] = markets[key].step()
+
+            for exchange, channel, symbol in list(subscriptions):
+                key = (exchange, symbol)
+                market = markets[key]
+                if channel == 'ticker':
+                    data = market.ticker()
+                elif key in snapshot_requests:
+                    snapshot_requests.discard(key)
+                    data = {'type': 'snapshot', 'seq': market.seq, **market.snapshot()}
+                elif self.gap_every and market.seq % self.gap_every == 0:
+                    continue
+                else:
+                    data = {'type': 'delta', 'first_seq': market.seq, 'last_seq': market.seq, **deltas[key]}
+
+                msg = {
+                    'exchange': exchange, 'channel': channel, 'symbol': symbol,
+                    'timestamp': int(time.time() * 1000), 'data': data
+                }
+                delay = self.latency + random.uniform(0, self.jitter)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await ws.send(json.dumps(msg))
+                sent += 1
+                if self.drop_after and sent >= self.drop_after:
+                    await ws.close()
+                    return
+            await asyncio.sleep(self.interval)
+
+class FakeStreamClient:
+    """
+    Stand-in for a ccxt.pro client backed by FakeStreamServer. Order books
+    are delivered as raw snapshot/delta messages instead of a maintained book.
+    Messages are queued per (channel, symbol) until read, so nothing is lost
+    between two watch calls; a queue that is not read keeps its newest
+    QUEUE_SIZE messages.
+    """
+    QUEUE_SIZE = 1000
+
+    def __init__(self, exchange, url):
+        self.exchange = exchange
+        self.url = url
+        self.ws = None
+        self.reader = None
+        self.lock = asyncio.Lock()
+        self.subscriptions = set()
+        self.queues = {}
+
+    async def _connect(self):
+        async with self.lock:
+            if self.ws is None:
+                self.ws = await websockets.connect(self.url)
+                self.subscriptions = set()
+                self.queues = {}
+                self.reader = asyncio.ensure_future(self._read_loop(self.ws))
+
+    def _queue(self, key):
+        queue = self.queues.get(key)
+        if queue is None:
+            queue = self.queues[key] = asyncio.Queue(self.QUEUE_SIZE)
+        return queue
+
+    def _put(self, queue, item):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+    async def _read_loop(self, ws):
+        error = ConnectionError(f"{self.exchange} fake stream closed")
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                self._put(self._queue((msg['channel'], msg['symbol'])), msg)
+        except Exception as e:
+            error = ConnectionError(f"{self.exchange} fake stream error: {e}")
+        finally:
+            if self.ws is ws:
+                self.ws = None
+                for queue in self.queues.values():
+                    self._put(queue, error)
+
+    async def _next(self, channel, symbol):
+        await self._connect()
+        key = (channel, symbol)
+        queue = self._queue(key)
+        if key not in self.subscriptions:
+            self.subscriptions.add(key)
+            await self.ws.send(json.dumps({
+                'op': 'subscribe', 'exchange': self.exchange, 'channel': channel, 'symbol': symbol
+            }))
+        msg = await queue.get()
+        if isinstance(msg, Exception):
+            raise msg
+        return msg
+
+    async def watch_order_book_delta(self, symbol):
+        msg = await self._next('orderbook', symbol)
+        return {'timestamp': msg['timestamp'], **msg['data']}
+
+    async def request_snapshot(self, symbol):
+        await self._connect()
+        await self.ws.send(json.dumps({
+            'op': 'snapshot', 'exchange': self.exchange, 'channel': 'orderbook', 'symbol': symbol
+        }))
+
+    async def watch_ticker(self, symbol, params={}):
+        msg = await self._next('ticker', symbol)
+        data = msg['data']
+        return {
+            'symbol': symbol, 'timestamp': msg['timestamp'],
+            'last': data['last'], 'percentage': data['percentage']
+        }
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self.reader:
+            self.reader.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake exchange WebSocket server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--interval', type=float, default=0.1)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--drop-after', type=int, default=0)
+    parser.add_argument('--gap-every', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=20)
+    args = parser.parse_args()
+
+    async def run():
+        server = FakeStreamServer(
+            args.host, args.port, interval=args.interval, latency=args.latency,
+            jitter=args.jitter, drop_after=args.drop_after,
+            gap_every=args.gap_every, depth=args.depth
+        )
+        await server.start()
+        print(f"Fake stream server listening on ws://{args.host}:{args.port}")
+        await asyncio.Future()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+"""
+End-to-end load test of the tracker against the fake exchange: runs
+PriceTrackerLayout with 10-100 targets in a real Kivy window and reports
+tick-to-render latency percentiles, from the fake exchange stamping a book
+to the frame that shows it being flipped to the screen.
+
+    (cd src && python -m simulator.load_driver --targets 50 --duration 60 --latency 0.08 --jitter 0.04)
+    (cd src && python -m simulator.load_driver --targets 100 --error-rate 0.02 --rate-limit-rate 0.01 --popups 3)
+    (cd src && python -m simulator.load_driver --targets 30 --stream)
+
+The tracker has ten slots, so targets are spread over one layout per ten,
+all sharing one PriceService as if several trackers were open. REST mode
+runs each layout's fetch_and_update loop; --stream pushes books through
+MarketStream and an in-process FakeStreamServer instead. --popups opens
+DetailGraphPopups during the run and times them from open to first chart.
+"""
+import os, json, math, time, asyncio, argparse
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+
+import numpy as np
+
+from simulator.fake_exchange import FAKE_BASES
+
+LOAD_EXCHANGES = ['Binance', 'Upbit', 'Bybit', 'Bitfinex', 'KuCoin']
+SLOTS_PER_LAYOUT = 10
+UI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ui')
+
+def build_targets(count):
+    """
+    count pairs dealt round-robin over LOAD_EXCHANGES, KRW markets on Upbit.
+    """
+    targets = []
+    for i in range(count):
+        exchange = LOAD_EXCHANGES[i % len(LOAD_EXCHANGES)]
+        base = FAKE_BASES[(i // len(LOAD_EXCHANGES)) % len(FAKE_BASES)]
+        quote = 'KRW' if exchange == 'Upbit' else 'USDT'
+        targets.append({'exchange': exchange, 'symbol': f"{base}/{quote}"})
+    return targets
+
+def percentiles(values):
+    if not values:
+        return None
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'n': len(values), 'p50': p50, 'p90': p90, 'p99': p99, 'max': max(values), 'mean': sum(values) / len(values)}
+
+class RenderProbe:
+    """
+    Wraps OrderBookWidget.render. Each book rendered for the first time is
+    timed when the next frame is flipped; books rendered again unchanged
+    (the tracker redraws every slot on any stream update) are skipped.
+    Event loop lag, how late a short sleep wakes up, shows UI stalls.
+    """
+    def __init__(self):
+        self.recording = False
+        self.pending = []
+        self.latencies = []
+        self.loop_lag = []
+        self.shown = {}
+        self.counts = {'renders': 0, 'error_renders': 0}
+
+    def attach(self, widget):
+        render = widget.render
+
+        def timed_render(exchange_name, data):
+            render(exchange_name, data)
+            ob, ticker = data.get('ob') or {}, data.get('ticker') or {}
+            if not self.recording: return
+            self.counts['renders'] += 1
+            if 'error' in ob or 'error' in ticker:
+                self.counts['error_renders'] += 1
+                return
+            ts = ob.get('timestamp')
+            if ts is None or self.shown.get(id(widget)) == ts: return
+            self.shown[id(widget)] = ts
+            self.pending.append(ts)
+        widget.render = timed_render
+
+    def on_flip(self, *args):
+        if self.pending:
+            now_ms = time.time() * 1000
+            self.latencies.extend(now_ms - ts for ts in self.pending)
+            self.pending = []
+
+    async def watch_loop(self, interval=0.01):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            if self.recording:
+                self.loop_lag.append((time.perf_counter() - start - interval) * 1000)
+
+def run(args):
+    from kivy.core.window import Window
+    from kivy.app import App
+    from kivy.clock import Clock
+    from kivy.lang import Builder
+    from kivy.uix.boxlayout import BoxLayout
+
+    from services.price_service import PriceService
+    from services.database_service import DatabaseService
+    from services.stream_service import RATE_KEY
+    from ui.tracker_layout import PriceTrackerLayout
+
+    Builder.load_file(os.path.join(UI_DIR, 'order_book_widget.kv'))
+    Builder.load_file(os.path.join(UI_DIR, 'tracker_layout.kv'))
+
+    targets = build_targets(args.targets)
+    probe = RenderProbe()
+    popup_loads = []
+
+    class LoadDriverApp(App):
+        def build(self):
+            Window.size = (1400, 900)
+            self.price_service = PriceService()
+            self.db_service = DatabaseService() if args.db or args.popups else None
+            tracker_db = self.db_service if args.db else None
+
+            root = BoxLayout(orientation='vertical')
+            self.layouts = []
+            for i in range(math.ceil(len(targets) / SLOTS_PER_LAYOUT)):
+                layout = PriceTrackerLayout(price_service=self.price_service, db_service=tracker_db)
+                for widget in layout.widget_map.values():
+                    probe.attach(widget)
+                self.layouts.append(layout)
+                root.add_widget(layout)
+            return root
+
+        def on_start(self):
+            Window.bind(on_flip=probe.on_flip)
+            self.lag_task = asyncio.ensure_future(probe.watch_loop())
+            for i, layout in enumerate(self.layouts):
+                layout.update_watching_list(None, targets[i * SLOTS_PER_LAYOUT:(i + 1) * SLOTS_PER_LAYOUT])
+            if args.stream:
+                # One stream per PriceService: start it once for every layout's slots
+                self.price_service.start_stream([
+                    {**t, 'key': f"{i}:{t['key']}"} for i, layout in enumerate(self.layouts) for t in layout.active_targets
+                ], self.route_stream_update)
+
+            Clock.schedule_once(self.start_recording, args.warmup)
+            Clock.schedule_once(lambda dt: self.stop(), args.warmup + args.duration)
+            for n in range(args.popups):
+                Clock.schedule_once(lambda dt, n=n: self.open_popup(n), args.warmup + args.duration * (n + 1) / (args.popups + 1))
+
+        def route_stream_update(self, key, kind, payload):
+            if key == RATE_KEY:
+                for layout in self.layouts:
+                    layout.on_stream_update(key, kind, payload)
+                return
+            index, slot_key = key.split(':', 1)
+            self.layouts[int(index)].on_stream_update(slot_key, kind, payload)
+
+        def exchange_totals(self):
+            totals = {}
+            for client in self.price_service.exchanges.clients.values():
+                for k, v in client.stats.items():
+                    totals[k] = totals.get(k, 0) + v
+            return totals
+
+        def on_stop(self):
+            self.lag_task.cancel()
+            start = self.exchange_start
+            self.exchange_stats = {k: v - start.get(k, 0) for k, v in self.exchange_totals().items()}
+
+        def start_recording(self, dt):
+            probe.recording = True
+            self.started = time.monotonic()
+            self.scheduler_start = dict(self.price_service.scheduler.stats)
+            self.exchange_start = self.exchange_totals()
+
+        def open_popup(self, n):
+            from ui.trend_graph.graph_popup import DetailGraphPopup
+            target = targets[n % len(targets)]
+            opened = time.perf_counter()
+            popup = DetailGraphPopup(db_service=self.db_service, exchange=target['exchange'], symbol=target['symbol'])
+            update_graph = popup.graph_widget.update_graph
+
+            def timed_update(*a, **kw):
+                update_graph(*a, **kw)
+                if popup.graph_widget.update_graph is timed_update:
+                    popup.graph_widget.update_graph = update_graph
+                    popup_loads.append((time.perf_counter() - opened) * 1000)
+            popup.graph_widget.update_graph = timed_update
+            popup.open()
+            Clock.schedule_once(lambda dt: popup.dismiss(), args.popup_seconds)
+
+    async def main():
+        server = None
+        if args.stream:
+            from simulator.fake_ws_server import FakeStreamServer
+            server = await FakeStreamServer(port=0, interval=args.interval, latency=args.latency, jitter=args.jitter).start()
+            os.environ['FAKE_STREAM_URL'] = f"ws://127.0.0.1:{server.server.sockets[0].getsockname()[1]}"
+
+        app = LoadDriverApp()
+        try:
+            await app.async_run()
+        finally:
+            if hasattr(app, 'price_service'):
+                await app.price_service.close_all()
+            if getattr(app, 'db_service', None):
+                app.db_service.close()
+            if server:
+                await server.stop()
+
+        elapsed = time.monotonic() - app.started
+        scheduler = app.price_service.scheduler.stats
+        return {
+            'targets': len(targets),
+            'layouts': len(app.layouts),
+            'mode': 'stream' if args.stream else 'rest',
+            'elapsed_s': elapsed,
+            'tick_to_render_ms': percentiles(probe.latencies),
+            'loop_lag_ms': percentiles(probe.loop_lag),
+            'renders_per_s': probe.counts['renders'] / elapsed,
+            'error_renders': probe.counts['error_renders'],
+            'popup_load_ms': percentiles(popup_loads),
+            'exchange': app.exchange_stats,
+            'scheduler': {k: scheduler[k] - app.scheduler_start.get(k, 0) for k in scheduler}
+        }
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+def _format_stats(stats):
+    if not stats:
+        return "no samples"
+    return (f"n={stats['n']:,}  p50 {stats['p50']:.0f}ms  p90 {stats['p90']:.0f}ms  "
+            f"p99 {stats['p99']:.0f}ms  max {stats['max']:.0f}ms")
+
+def print_report(result, args):
+    print(f"Load: {result['targets']} targets on {result['layouts']} layouts, {result['mode']} mode, "
+          f"{result['elapsed_s']:.0f}s")
+    print(f"Fake exchange: latency {args.latency * 1000:.0f}+{args.jitter * 1000:.0f}ms, "
+          f"errors {args.error_rate:.1%}, 429s {args.rate_limit_rate:.1%}")
+    print(f"  tick-to-render   {_format_stats(result['tick_to_render_ms'])}")
+    print(f"  event loop lag   {_format_stats(result['loop_lag_ms'])}")
+    if args.popups:
+        print(f"  popup load       {_format_stats(result['popup_load_ms'])}")
+    print(f"  renders {result['renders_per_s']:.1f}/s, error renders {result['error_renders']}")
+    ex, sched = result['exchange'], result['scheduler']
+    print(f"  requests {ex.get('requests', 0):,} (injected errors {ex.get('errors', 0)}, 429s {ex.get('rate_limited', 0)}), "
+          f"scheduler coalesced {sched['coalesced']:,}, throttled {sched['throttled_ms']:,.0f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30, help='seconds measured after warm-up')
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--stream', action='store_true', help='stream books instead of REST polling')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per call or push')
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='probability of a 429 per call')
+    parser.add_argument('--server-rate', type=float, default=0.0, help='calls/s per venue before 429s, 0 = unlimited')
+    parser.add_argument('--interval', type=float, default=0.1, help='seconds per market step')
+    parser.add_argument('--popups', type=int, default=0, help='DetailGraphPopups to open during the run')
+    parser.add_argument('--popup-seconds', type=float, default=5)
+    parser.add_argument('--db', action='store_true', help='save spreads to MongoDB like the app does')
+    parser.add_argument('--output', help='also write the results to a JSON file')
+    args = parser.parse_args()
+
+    os.environ['FAKE_EXCHANGE'] = (
+        f"latency={args.latency},jitter={args.jitter},error_rate={args.error_rate},"
+        f"rate_limit_rate={args.rate_limit_rate},server_rate={args.server_rate},interval={args.interval}"
+    )
+    os.environ['BITANALYZER_STREAMING'] = '1' if args.stream else '0'
+    os.environ.pop('TICK_REPLAY_DIR', None)
+
+    result = run(args)
+    print_report(result, args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Replays a tick log written by TickRecorder (TICK_LOG_DIR).
+
+As a backtest, at maximum speed: every book update is scored with
+analyze_order_book_trend, calculate_k_premium and the premium matrix.
+
+    (cd src && python -m simulator.tick_replay --dir ~/ticks --start 2026-10-01 --end 2026-10-14)
+
+Into the tracker UI, at 1x or faster, through PriceService:
+
+    TICK_REPLAY_DIR=~/ticks TICK_REPLAY_SPEED=1 python src/main.py
+"""
+import os, time, asyncio, argparse
+from datetime import datetime, timezone
+
+from services.order_book import LocalOrderBook
+from services.tick_log import TickLogReader, SNAPSHOT, DELTA, TICKER
+from services.stream_service import RATE_KEY
+from services.exchange_registry import display_name
+from services.analysis_service import analyze_order_book_trend, calculate_k_premium
+from services.premium_matrix import FxTable, build_premium_matrix
+
+REPLAY_SPEED = float(os.getenv('TICK_REPLAY_SPEED', 1.0))
+
+class TickReplay:
+    """
+    Rebuilds local books from a tick log and yields what the tracker would
+    have been pushed: (ts_ms, exchange, symbol, kind, payload) with kind
+    'ob' (payload: book.top(depth)) or 'ticker'. Messages before start_ms
+    only warm up the books.
+    """
+    def __init__(self, directory, start_ms=None, end_ms=None, depth=50):
+        self.reader = TickLogReader(directory)
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.depth = depth
+        self.books = {}
+        self.stats = {'messages': 0, 'emitted': 0, 'resyncs': 0}
+
+    def book(self, exchange, symbol):
+        key = (exchange, symbol)
+        if key not in self.books:
+            self.books[key] = LocalOrderBook(symbol)
+        return self.books[key]
+
+    def events(self):
+        start_ms = self.start_ms
+        for ts_ms, exchange, symbol, kind, a, b, bids, asks in self.reader.messages(start_ms, self.end_ms):
+            self.stats['messages'] += 1
+            if kind == TICKER:
+                if start_ms is not None and ts_ms < start_ms: continue
+                self.stats['emitted'] += 1
+                yield ts_ms, exchange, symbol, 'ticker', {
+                    'symbol': symbol, 'last': a, 'change_pct': None if b != b else b
+                }
+                continue
+
+            book = self.book(exchange, symbol)
+            if kind == SNAPSHOT:
+                book.apply_snapshot(bids, asks, seq=None if a != a else int(a), timestamp=ts_ms)
+            elif kind == DELTA:
+                first_seq = None if a != a else int(a)
+                last_seq = None if b != b else int(b)
+                if not book.apply_delta(bids, asks, first_seq, last_seq, ts_ms):
+                    self.stats['resyncs'] += 1
+                    continue
+            if start_ms is not None and ts_ms < start_ms: continue
+            self.stats['emitted'] += 1
+            yield ts_ms, exchange, symbol, 'ob', book.top(self.depth)
+
+class ReplayStream:
+    """
+    Drop-in for MarketStream that feeds the tracker from a tick log instead
+    of the network. speed is a multiple of real time; 0 plays as fast as
+    the event loop allows.
+    """
+    def __init__(self, price_service, on_update, directory, speed=REPLAY_SPEED):
+        self.price_service = price_service
+        self.on_update = on_update
+        self.directory = directory
+        self.speed = speed
+        self.task = None
+        self.running = False
+        self.stats = {}
+
+    def start(self, targets, with_rate=True):
+        self.stop()
+        self.running = True
+        self.task = asyncio.get_event_loop().create_task(self._play(targets, with_rate))
+
+    def stop(self):
+        self.running = False
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def mode(self, exchange):
+        return 'replay'
+
+    def _push(self, key, kind, payload):
+        try:
+            self.on_update(key, kind, payload)
+        except Exception as e:
+            print(f"Replay Update Error ({key}): {e}")
+
+    async def _play(self, targets, with_rate=True):
+        keys = {}
+        for target in targets:
+            keys.setdefault((target['exchange'].lower(), target['symbol']), []).append(target['key'])
+
+        replay = TickReplay(self.directory, depth=self.price_service.book_depth)
+        first_ts = started = None
+        try:
+            for n, (ts_ms, exchange, symbol, kind, payload) in enumerate(replay.events()):
+                if not self.running: break
+                if first_ts is None:
+                    first_ts, started = ts_ms, time.monotonic()
+                if self.speed > 0:
+                    delay = (ts_ms - first_ts) / 1000 / self.speed - (time.monotonic() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif n % 500 == 0:
+                    await asyncio.sleep(0)
+
+                stat = self.stats.setdefault(exchange, {'messages': 0, 'reconnects': 0, 'latency_ms': None})
+                stat['messages'] += 1
+                if with_rate and kind == 'ticker' and (exchange, symbol) == ('upbit', 'USDT/KRW'):
+                    self._push(RATE_KEY, 'rate', payload['last'])
+                for key in keys.get((exchange, symbol), ()):
+                    self._push(key, kind, payload)
+            print(f"Replay finished: {replay.stats}")
+        except asyncio.CancelledError:
+            pass
+
+def backtest(directory, start_ms=None, end_ms=None, depth=50):
+    """
+    Scores every book update with analyze_order_book_trend and tracks the
+    Kimchi premium (calculate_k_premium on the matrix's KRW/USDT pair) and
+    the widest premium across all recorded venues, at maximum speed.
+    """
+    replay = TickReplay(directory, start_ms, end_ms, depth)
+    fx = FxTable(ttl=float('inf'))
+    books, trends, premiums, kimchi = {}, {}, [], []
+    started = time.perf_counter()
+
+    for ts_ms, exchange, symbol, kind, payload in replay.events():
+        key = f"{display_name(exchange)} {symbol}"
+        if kind == 'ticker':
+            if (exchange, symbol) == ('upbit', 'USDT/KRW'):
+                fx.set_cross('KRW', payload['last'], now=0)
+            continue
+
+        if symbol == 'USDT/KRW': continue
+        books[key] = payload
+        verdict = analyze_order_book_trend(payload['bids'], payload['asks'])['text']
+        counts = trends.setdefault(key, {})
+        counts[verdict] = counts.get(verdict, 0) + 1
+
+        if len(books) > 1:
+            matrix = build_premium_matrix(
+                [{'label': label, 'symbol': ob['symbol'], 'ob': ob} for label, ob in books.items()], fx
+            )
+            pair = matrix.kimchi_pair()
+            if pair is not None:
+                krw, usd = pair
+                result = calculate_k_premium(matrix.books[krw], matrix.books[usd], 1 / matrix.rates[krw])
+                if result['premium_pct'] is not None:
+                    kimchi.append((ts_ms, matrix.labels[krw], matrix.labels[usd], result['premium_pct']))
+
+            widest = matrix.widest()
+            if widest:
+                rich, cheap, premium_pct = widest
+                premiums.append((ts_ms, matrix.labels[rich], matrix.labels[cheap], premium_pct))
+
+    elapsed = time.perf_counter() - started
+    return {
+        'stats': replay.stats,
+        'elapsed_s': elapsed,
+        'messages_per_s': replay.stats['messages'] / elapsed if elapsed else 0,
+        'trends': trends,
+        'kimchi': kimchi,
+        'premiums': premiums
+    }
+
+def _parse_time(text):
+    if not text: return None
+    dt = datetime.fromisoformat(text)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dir', default=os.getenv('TICK_LOG_DIR'), required=not os.getenv('TICK_LOG_DIR'))
+    parser.add_argument('--start', help='ISO time, UTC unless an offset is given')
+    parser.add_argument('--end')
+    parser.add_argument('--depth', type=int, default=50)
+    args = parser.parse_args()
+
+    result = backtest(os.path.expanduser(args.dir), _parse_time(args.start), _parse_time(args.end), args.depth)
+    stats = result['stats']
+    print(f"Replayed {stats['messages']:,} messages ({stats['emitted']:,} emitted, {stats['resyncs']} resyncs) "
+          f"in {result['elapsed_s']:.2f}s, {result['messages_per_s']:,.0f} msg/s")
+
+    for key, counts in sorted(result['trends'].items()):
+        total = sum(counts.values())
+        shares = ", ".join(f"{verdict.replace('Trend: ', '')} {n / total:.0%}" for verdict, n in sorted(counts.items()))
+        print(f"  {key}: {total:,} updates ({shares})")
+
+    for title, premiums in (("Kimchi premium", result['kimchi']), ("Widest premium", result['premiums'])):
+        if not premiums: continue
+        values = [p[3] for p in premiums]
+        peak = max(premiums, key=lambda p: p[3])
+        peak_time = datetime.fromtimestamp(peak[0] / 1000, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        print(f"  {title}: mean {sum(values) / len(values):+.3f}%, "
+              f"max {peak[3]:+.3f}% ({peak[1]} over {peak[2]} at {peak_time} UTC)")
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,15 @@
-import time, asyncio
+import asyncio
 from kivy.uix.boxlayout import BoxLayout
 from kivy.properties import StringProperty, BooleanProperty, ObjectProperty, ListProperty
 from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.app import App
 from kivy.clock import Clock
 
+from services.request_scheduler import INTERACTIVE, BACKGROUND
+from services.market_search import MarketSearchIndex
+
+SEARCH_DEBOUNCE = 0.15
+
 class MarketItemRow(RecycleDataViewBehavior, BoxLayout):
     symbol = StringProperty("")
     base_coin = StringProperty("")
@@ -16,7 +21,7 @@ class MarketItemRow(RecycleDataViewBehavior, BoxLayout):
     def refresh_view_attrs(self, rv, index, data):
         super().refresh_view_attrs(rv, index, data)
         self.index = index
-        self.explorer = data.get('explorer')
+        self.explorer = getattr(rv, 'explorer', None)
         
         if self.explorer:
             unique_key = f"{data.get('exchange')}:{data.get('symbol')}"
@@ -50,10 +55,15 @@ class MarketItemRow(RecycleDataViewBehavior, BoxLayout):
 class MarketExplorer(BoxLayout):
     raw_market_data = ListProperty([])
     selected_items = {} 
+    market_index = {}
 
     def __init__(self, price_service, **kwargs):
         super().__init__(**kwargs)
         self.price_service = price_service
+        self.search_index = MarketSearchIndex([])
+        self.rows = {}
+        self.ids.rv.explorer = self
+        self._filter_trigger = Clock.create_trigger(lambda dt: self.apply_filter(), SEARCH_DEBOUNCE)
         Clock.schedule_once(lambda dt: self.load_markets('Binance'), 0.5)
 
     def load_markets(self, exchange_name):
@@ -61,43 +71,73 @@ class MarketExplorer(BoxLayout):
         asyncio.create_task(self.fetch_markets_async(exchange_name))
     
     async def fetch_markets_async(self, exchange_name):
-        self.ids.analyze_btn.text = "Loading..."
-        self.raw_market_data = await self.price_service.get_all_markets(exchange_name)
-        self.filter_list()
+        cached, is_fresh = await self.price_service.get_cached_markets(exchange_name)
+        if cached and self.ids.exchange_spinner.text == exchange_name:
+            self.set_markets(cached)
+            if is_fresh:
+                return
+        else:
+            self.ids.analyze_btn.text = "Loading..."
 
-    def filter_list(self):
-        search_text = self.ids.search_input.text.upper()
-        quote_filter = self.ids.quote_spinner.text
+        priority = BACKGROUND if cached else INTERACTIVE
+        markets = await self.price_service.get_all_markets(exchange_name, priority)
+        if self.ids.exchange_spinner.text != exchange_name:
+            return
+        if not cached or (markets and markets != cached):
+            self.set_markets(markets)
+
+    def set_markets(self, markets):
         current_exchange = self.ids.exchange_spinner.text
-        refresh_trigger = time.time()
-        
-        filtered_data = []
-        for market in self.raw_market_data:
-            if search_text and search_text not in market['base']:
-                continue
-            if quote_filter != 'All' and market['quote'] != quote_filter:
-                continue
-            
-            unique_key = f"{current_exchange}:{market['symbol']}"
-            filtered_data.append({
-                'symbol': market['symbol'],
-                'base_coin': market['base'],
-                'quote_currency': market['quote'],
-                'exchange': current_exchange,
-                'explorer': self,
-                'is_checked': unique_key in self.selected_items,
-                '_refresh_trigger': refresh_trigger
-            })
-            
-        self.ids.rv.data = filtered_data
+        self.raw_market_data = markets
+        self.market_index = {m['symbol']: m for m in markets}
+        self.search_index = MarketSearchIndex(markets)
+        self.rows = {
+            m['symbol']: {
+                'symbol': m['symbol'],
+                'base_coin': m['base'],
+                'quote_currency': m['quote'],
+                'exchange': current_exchange
+            }
+            for m in markets
+        }
+        self.apply_filter()
+
+    def filter_list(self):
+        """
+        Debounced: rapid keystrokes collapse into one search.
+        """
+        self._filter_trigger()
+
+    def apply_filter(self):
+        self._filter_trigger.cancel()
+        matches = self.search_index.search(self.ids.search_input.text, self.ids.quote_spinner.text)
+        self.update_rows([self.rows[m['symbol']] for m in matches])
         self.update_selection_count()
 
+    def update_rows(self, rows):
+        """
+        Row dicts are reused per market, so only the part of the list that
+        differs from what is shown is replaced.
+        """
+        data = self.ids.rv.data
+        keep = 0
+        for shown, row in zip(data, rows):
+            if shown is not row: break
+            keep += 1
+
+        if keep == len(data) == len(rows):
+            return
+        if keep == 0:
+            self.ids.rv.data = rows
+        else:
+            data[keep:] = rows[keep:]
+
     def toggle_selection(self, symbol, value):
         current_exchange = self.ids.exchange_spinner.text
         unique_key = f"{current_exchange}:{symbol}"
         if value:
             current_selections = list(self.selected_items.values())
-            new_market = next((m for m in self.raw_market_data if m['symbol'] == symbol), None)
+            new_market = self.market_index.get(symbol)
             if not new_market: return False
             market_to_save = new_market.copy()
             market_to_save['exchange'] = current_exchange
@@ -147,11 +187,9 @@ class MarketExplorer(BoxLayout):
             self.ids.analyze_btn.text = f"Analyze Selected ({count}/5)"
 
     def reset_selection(self):
-        print("Resetting selection (Nuke Strategy)...")
         self.selected_items.clear()
-        self.ids.rv.data = []
         self.ids.rv.refresh_from_data()
-        Clock.schedule_once(lambda dt: self.filter_list(), 0.1)
+        self.update_selection_count()
 
     def dispatch_analysis(self):
         count = len(self.selected_items)
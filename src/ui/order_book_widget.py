@@ -1,16 +1,41 @@
+import os
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.clock import Clock
-from services.analysis_service import analyze_order_book_trend
+from kivy.properties import NumericProperty
+from services.analysis_service import analyze_order_book_trend, analyze_depth_trend
+
+DEFAULT_ROWS = int(os.getenv('ORDER_BOOK_ROWS', 5))
+
+def _format_price(price, is_krw):
+    return f"₩{price:,.0f}" if is_krw else f"${price:,.2f}"
 
 class OrderBookWidget(BoxLayout):
+    """
+    update_data only records the latest state; the widget renders at most
+    once per frame, and only labels whose level changed are re-formatted.
+    """
+    depth = NumericProperty(DEFAULT_ROWS)
+    populated = False
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         
         self.ask_labels = []
         self.bid_labels = []
+        self.shown_asks = []
+        self.shown_bids = []
+        self.shown_header = None
+        self.pending = None
+        self._render_trigger = Clock.create_trigger(self._render_pending)
 
-        for _ in range(5):
+        self._build_labels()
+        Clock.schedule_once(self._populate_layouts)
+
+    def _build_labels(self):
+        self.ask_labels = []
+        self.bid_labels = []
+        for _ in range(int(self.depth)):
             self.ask_labels.append({
                 'price': Label(text='-', color=(1, 0.4, 0.4, 1), size_hint_x=0.6),
                 'qty': Label(text='-', color=(1, 1, 1, 0.7), size_hint_x=0.4, font_size='12sp')
@@ -19,19 +44,29 @@ class OrderBookWidget(BoxLayout):
                 'price': Label(text='-', color=(0.4, 1, 0.4, 1), size_hint_x=0.6),
                 'qty': Label(text='-', color=(1, 1, 1, 0.7), size_hint_x=0.4, font_size='12sp')
             })
-        
-        Clock.schedule_once(self._populate_layouts)
+        self._forget_shown()
+
+    def _forget_shown(self):
+        self.shown_asks = [None] * len(self.ask_labels)
+        self.shown_bids = [None] * len(self.bid_labels)
+        self.shown_header = None
+
+    def on_depth(self, instance, value):
+        if not self.populated: return
+        self.ids.asks_layout.clear_widgets()
+        self.ids.bids_layout.clear_widgets()
+        self._build_labels()
+        self._populate_layouts(0)
 
     def _populate_layouts(self, dt):
         try:
-            for i in range(5):
-                ask = self.ask_labels[i]
+            for ask, bid in zip(self.ask_labels, self.bid_labels):
                 self.ids.asks_layout.add_widget(ask['price'])
                 self.ids.asks_layout.add_widget(ask['qty'])
                 
-                bid = self.bid_labels[i]
                 self.ids.bids_layout.add_widget(bid['price'])
                 self.ids.bids_layout.add_widget(bid['qty'])
+            self.populated = True
         except Exception as e:
             print(f"Error populating layouts: {e}. Retrying...")
             Clock.schedule_once(self._populate_layouts, 0.1)
@@ -41,13 +76,14 @@ class OrderBookWidget(BoxLayout):
             return
             
         qty_text = qty_text or text
-        for i in range(5):
-            self.ask_labels[i]['price'].text = text
-            self.ask_labels[i]['qty'].text = qty_text
-            self.bid_labels[i]['price'].text = text
-            self.bid_labels[i]['qty'].text = qty_text
+        for labels in self.ask_labels + self.bid_labels:
+            labels['price'].text = text
+            labels['qty'].text = qty_text
+        self._forget_shown()
 
     def set_loading_state(self):
+        self.pending = None
+        self._render_trigger.cancel()
         self.ids.title_label.text = "Loading..."
         self.ids.last_price_label.text = "Last: Loading..."
         self.ids.last_price_label.color = (0.8, 0.8, 0.8, 1)
@@ -56,6 +92,8 @@ class OrderBookWidget(BoxLayout):
         self._set_ob_labels("Loading...")
 
     def set_error_state(self):
+        self.pending = None
+        self._render_trigger.cancel()
         self.ids.title_label.text = "ERROR"
         self.ids.last_price_label.text = "Last: Error"
         self.ids.last_price_label.color = (1, 0.3, 0.3, 1)
@@ -64,6 +102,16 @@ class OrderBookWidget(BoxLayout):
         self._set_ob_labels("Error", "Error")
 
     def update_data(self, exchange_name, data):
+        self.pending = (exchange_name, data)
+        self._render_trigger()
+
+    def _render_pending(self, dt):
+        if self.pending is None: return
+        exchange_name, data = self.pending
+        self.pending = None
+        self.render(exchange_name, data)
+
+    def render(self, exchange_name, data):
         if not self.ask_labels or not self.ids.asks_layout.children:
             self.set_loading_state()
             return
@@ -83,9 +131,10 @@ class OrderBookWidget(BoxLayout):
         bids = ob_data.get('bids', [])
         asks = ob_data.get('asks', [])
         
-        self.ids.title_label.text = f"{exchange_name} ({symbol})"
-        
-        trend_result = analyze_order_book_trend(bids, asks)
+        if ob_data.get('analytics'):
+            trend_result = analyze_depth_trend(ob_data['analytics'])
+        else:
+            trend_result = analyze_order_book_trend(bids, asks)
         self.ids.trend_label.text = trend_result['text']
         self.ids.trend_label.color = trend_result['color']
 
@@ -94,38 +143,44 @@ class OrderBookWidget(BoxLayout):
         last_price = ticker_data.get('last')
         change_pct = ticker_data.get('change_pct')
 
-        if last_price is not None:
-            price_str = f"₩{last_price:,.0f}" if is_krw else f"${last_price:,.2f}"
-            self.ids.last_price_label.text = f"Last: {price_str}"
-            
-            if change_pct is not None:
-                color = (0.4, 1, 0.4, 1) if change_pct > 0 else (1, 0.4, 0.4, 1) if change_pct < 0 else (1,1,1,1)
-                self.ids.last_price_label.color = color
-                self.ids.last_price_label.text += f" ({change_pct:+.2f}%)"
-            else:
-                self.ids.last_price_label.color = (1, 1, 1, 1)
-        else:
-            self.ids.last_price_label.text = "Last: N/A"
-            self.ids.last_price_label.color = (0.8, 0.8, 0.8, 1)
-
-        for i in range(5):
-            if i < len(asks):
-                price, qty = asks[-(i+1)] 
-                price_str = f"₩{price:,.0f}" if is_krw else f"${price:,.2f}"
-                qty_str = f"{qty:.4f}"
-                self.ask_labels[i]['price'].text = price_str
-                self.ask_labels[i]['qty'].text = qty_str
-            else:
-                self.ask_labels[i]['price'].text = '-'
-                self.ask_labels[i]['qty'].text = '-'
-
-        for i in range(5):
-            if i < len(bids):
-                price, qty = bids[i]
-                price_str = f"₩{price:,.0f}" if is_krw else f"${price:,.2f}"
-                qty_str = f"{qty:.4f}"
-                self.bid_labels[i]['price'].text = price_str
-                self.bid_labels[i]['qty'].text = qty_str
+        header = (exchange_name, symbol, last_price, change_pct)
+        if header != self.shown_header:
+            self.shown_header = header
+            self.ids.title_label.text = f"{exchange_name} ({symbol})"
+
+            if last_price is not None:
+                price_str = _format_price(last_price, is_krw)
+                self.ids.last_price_label.text = f"Last: {price_str}"
+                
+                if change_pct is not None:
+                    color = (0.4, 1, 0.4, 1) if change_pct > 0 else (1, 0.4, 0.4, 1) if change_pct < 0 else (1,1,1,1)
+                    self.ids.last_price_label.color = color
+                    self.ids.last_price_label.text += f" ({change_pct:+.2f}%)"
+                else:
+                    self.ids.last_price_label.color = (1, 1, 1, 1)
             else:
-                self.bid_labels[i]['price'].text = '-'
-                self.bid_labels[i]['qty'].text = '-'
\ No newline at end of file
+                self.ids.last_price_label.text = "Last: N/A"
+                self.ids.last_price_label.color = (0.8, 0.8, 0.8, 1)
+
+        rows = len(self.ask_labels)
+        n_asks = min(rows, len(asks))
+        ask_levels = [asks[n_asks - 1 - i][:2] for i in range(n_asks)]
+        bid_levels = [bids[i][:2] for i in range(min(rows, len(bids)))]
+
+        self._update_levels(self.ask_labels, self.shown_asks, ask_levels, is_krw)
+        self._update_levels(self.bid_labels, self.shown_bids, bid_levels, is_krw)
+
+    def _update_levels(self, labels, shown, levels, is_krw):
+        for i, row in enumerate(labels):
+            level = (*levels[i], is_krw) if i < len(levels) else None
+            if level == shown[i]:
+                continue
+            shown[i] = level
+
+            if level is None:
+                row['price'].text = '-'
+                row['qty'].text = '-'
+                continue
+            price, qty, _ = level
+            row['price'].text = _format_price(price, is_krw)
+            row['qty'].text = f"{qty:.4f}"
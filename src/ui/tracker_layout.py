@@ -1,10 +1,14 @@
-import asyncio
+import asyncio, time
 from datetime import datetime
 from kivy.uix.boxlayout import BoxLayout
+from kivy.clock import Clock
 from kivy.graphics import Color, Line
 
-from services.analysis_service import calculate_k_premium
-from ui.trend_graph import DetailGraphPopup
+from services.analysis_service import describe_premium_matrix
+from services.premium_matrix import build_premium_matrix, quote_of
+from services.stream_service import RATE_KEY
+
+SAVE_INTERVAL = 1.0
 
 class PriceTrackerLayout(BoxLayout):
     def __init__(self, price_service, db_service=None, **kwargs):
@@ -19,7 +23,13 @@ class PriceTrackerLayout(BoxLayout):
         self.widget_map = {
             f'slot_{i}': getattr(self.ids, f'slot_{i}') for i in range(10)
         }
-        self.k_premium_data = {'upbit': None, 'binance': None}
+        self.premium_matrix = None
+        self.fx_task = None
+
+        self.stream_data = {}
+        self.stream_rate = None
+        self.last_saved = {}
+        self._stream_trigger = Clock.create_trigger(self.flush_stream_updates)
 
         for key, widget in self.widget_map.items():
             widget.bind(on_touch_down=lambda w, touch, k=key: self.on_slot_touch(k, touch))
@@ -51,6 +61,7 @@ class PriceTrackerLayout(BoxLayout):
             print("DB Service is not available.")
             return
 
+        from ui.trend_graph.graph_popup import DetailGraphPopup
         popup = DetailGraphPopup(
             db_service=self.db_service, 
             exchange=target['exchange'], 
@@ -69,12 +80,18 @@ class PriceTrackerLayout(BoxLayout):
                 Color(1, 1, 0, 1)
                 Line(rectangle=(sel.x, sel.y, sel.width, sel.height), width=2)
 
-    def update_watching_list(self, exchange_name_ignored, selected_items):
+    def stop_tracking(self):
         if self.tracking_task:
             self.tracking_task.cancel()
             self.tracking_task = None
+        self.price_service.stop_stream()
+
+    def update_watching_list(self, exchange_name_ignored, selected_items):
+        self.stop_tracking()
 
         self.active_targets = []
+        self.stream_data = {}
+        self.last_saved = {}
         self.selected_slot_key = None
         keys = [f'slot_{i}' for i in range(10)]
         
@@ -95,7 +112,22 @@ class PriceTrackerLayout(BoxLayout):
                 widget._set_ob_labels("-")
 
         if self.active_targets:
-            self.tracking_task = asyncio.create_task(self.start_tracking_loop())
+            if self.price_service.streaming_enabled:
+                self.price_service.start_stream(self.active_targets, self.on_stream_update)
+            else:
+                self.tracking_task = asyncio.create_task(self.start_tracking_loop())
+
+    def on_stream_update(self, key, kind, payload):
+        if key == RATE_KEY:
+            self.stream_rate = payload
+        else:
+            self.stream_data.setdefault(key, {})[kind] = payload
+        self._stream_trigger()
+
+    def flush_stream_updates(self, dt=None):
+        ready = {k: v for k, v in self.stream_data.items() if 'ob' in v and 'ticker' in v}
+        if ready:
+            self.update_ui(ready, self.stream_rate)
 
     async def start_tracking_loop(self):
         try:
@@ -108,30 +140,43 @@ class PriceTrackerLayout(BoxLayout):
             print(f"Tracking Loop Error: {e}")
 
     async def fetch_and_update(self):
-        tasks = []
-        
+        depth = self.price_service.book_depth
+        by_exchange = {}
         for target in self.active_targets:
-            ex = target['exchange']
-            sym = target['symbol']
-            
-            tasks.append(self.price_service.get_btc_order_book(ex, sym))
-            tasks.append(self.price_service.get_ticker(ex, sym))
+            by_exchange.setdefault(target['exchange'], []).append(target['symbol'])
 
-        tasks.append(self.price_service.get_usdt_krw_price())
+        # USDT/KRW rides along with the Upbit bulk ticker request when there is one
+        rate_exchange = next((ex for ex in by_exchange if ex.lower() == 'upbit'), None)
+        if rate_exchange:
+            by_exchange[rate_exchange].append('USDT/KRW')
+        exchanges = list(by_exchange)
+
+        tasks = [self.price_service.get_btc_order_book(t['exchange'], t['symbol'], depth) for t in self.active_targets]
+        tasks += [self.price_service.get_tickers(ex, by_exchange[ex]) for ex in exchanges]
+        if not rate_exchange:
+            tasks.append(self.price_service.get_usdt_krw_price())
 
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
-        usdt_krw_price = results[-1]
-        if isinstance(usdt_krw_price, Exception): usdt_krw_price = None
+        n = len(self.active_targets)
+        tickers_by_exchange = {}
+        for ex, res in zip(exchanges, results[n:n + len(exchanges)]):
+            tickers_by_exchange[ex] = {'error': str(res)} if isinstance(res, Exception) else res
+
+        if rate_exchange:
+            rate_ticker = tickers_by_exchange[rate_exchange].get('USDT/KRW') or {}
+            usdt_krw_price = rate_ticker.get('last')
+        else:
+            usdt_krw_price = results[-1]
+            if isinstance(usdt_krw_price, Exception): usdt_krw_price = None
 
         data_map = {}
         for i, target in enumerate(self.active_targets):
-            idx = i * 2
-            ob_res = results[idx]
-            ticker_res = results[idx+1]
+            ob_res = results[i]
+            tickers = tickers_by_exchange[target['exchange']]
+            ticker_res = tickers if 'error' in tickers else tickers.get(target['symbol'], {'error': 'No ticker'})
             
             if isinstance(ob_res, Exception): ob_res = {'error': str(ob_res)}
-            if isinstance(ticker_res, Exception): ticker_res = {'error': str(ticker_res)}
 
             data_map[target['key']] = {
                 'ob': ob_res,
@@ -143,8 +188,18 @@ class PriceTrackerLayout(BoxLayout):
     def set_all_loading(self):
         pass 
 
+    def refresh_fx(self):
+        quotes = [quote_of(t['symbol']) for t in self.active_targets]
+        if self.fx_task and not self.fx_task.done():
+            return
+        if self.price_service.fx.missing(quotes):
+            self.fx_task = asyncio.create_task(self.price_service.refresh_fx_rates(quotes))
+
     def update_ui(self, all_data, usdt_krw_price):
-        self.k_premium_data = {'upbit': None, 'binance': None}
+        if usdt_krw_price:
+            self.price_service.fx.set_cross('KRW', usdt_krw_price)
+        self.refresh_fx()
+        premium_entries = []
 
         for target in self.active_targets:
             key = target['key']
@@ -165,7 +220,9 @@ class PriceTrackerLayout(BoxLayout):
                     best_bid = bids[0][0] if bids else 0
                     best_ask = asks[0][0] if asks else 0
                     
-                    if self.db_service:
+                    now = time.monotonic()
+                    if self.db_service and now - self.last_saved.get(key, 0) >= SAVE_INTERVAL:
+                        self.last_saved[key] = now
                         try:
                             self.db_service.save_spread(
                                 target['exchange'], 
@@ -176,22 +233,24 @@ class PriceTrackerLayout(BoxLayout):
                         except Exception as e:
                             print(f"DB Save Error: {e}")
 
-                if 'KRW' in target['symbol']:
-                    if self.k_premium_data['upbit'] is None:
-                        self.k_premium_data['upbit'] = data.get('ob')
-                elif 'USDT' in target['symbol']:
-                    if self.k_premium_data['binance'] is None:
-                        self.k_premium_data['binance'] = data.get('ob')
+                premium_entries.append({
+                    'label': f"{display_exchange} {target['symbol']}",
+                    'symbol': target['symbol'],
+                    'ob': data.get('ob')
+                })
 
-        upbit_data = self.k_premium_data['upbit']
-        bin_data = self.k_premium_data['binance']
-        
-        if upbit_data and bin_data and usdt_krw_price:
-            premium_result = calculate_k_premium(upbit_data, bin_data, usdt_krw_price)
+        self.premium_matrix = build_premium_matrix(premium_entries, self.price_service.fx)
+        if len(self.premium_matrix.valid()) >= 2:
+            premium_result = describe_premium_matrix(self.premium_matrix, usdt_krw_price)
             self.ids.analysis_label.text = premium_result['text']
             self.ids.analysis_label.color = premium_result['color']
         else:
-            self.ids.analysis_label.text = "Kimchi Premium (Select KRW & USDT markets)"
+            self.ids.analysis_label.text = "Premium (Select markets on two or more venues)"
             self.ids.analysis_label.color = (0.5, 0.5, 0.5, 1)
 
-        self.ids.timestamp_label.text = f"Last Updated: {datetime.now().strftime('%H:%M:%S')}"
\ No newline at end of file
+        status = f"Last Updated: {datetime.now().strftime('%H:%M:%S')}"
+        if self.db_service and self.db_service.enabled:
+            stats = self.db_service.get_write_stats()
+            if stats['last_flush_ms'] is not None:
+                status += f"  |  DB Queue: {stats['queue_depth']} (flush {stats['last_flush_ms']:.0f}ms)"
+        self.ids.timestamp_label.text = status
\ No newline at end of file
@@ -0,0 +1,177 @@
+import numpy as np
+from services.time_series import TimeSeries
+
+POINTS_PER_PIXEL = 2
+
+def _first_match_per_segment(values, starts, reduced):
+    """
+    Index of the first element in each segment equal to that segment's reduced value.
+    """
+    sizes = np.diff(np.append(starts, len(values)))
+    hits = np.flatnonzero(values == np.repeat(reduced, sizes))
+    segment = np.searchsorted(starts, hits, side='right') - 1
+    keep = np.ones(len(hits), dtype=bool)
+    keep[1:] = segment[1:] != segment[:-1]
+    return hits[keep]
+
+def _segment_means(values, starts):
+    sizes = np.diff(np.append(starts, len(values)))
+    return np.add.reduceat(values, starts) / sizes
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets down to `threshold` points (first and last
+    kept). Each bucket keeps the point forming the largest triangle with the
+    point kept in the previous bucket and the next bucket's centroid, so the
+    buckets are solved in order; centroids and bucket bounds are vectorized.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    bounds = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    starts = bounds[:-1]
+    mean_x = _segment_means(x[1:n - 1], starts - 1)
+    mean_y = _segment_means(y[1:n - 1], starts - 1)
+    next_x = np.append(mean_x[1:], x[-1]).tolist()
+    next_y = np.append(mean_y[1:], y[-1]).tolist()
+
+    chosen = np.empty(threshold, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, n - 1
+    ax, ay = float(x[0]), float(y[0])
+    for i, (s, e) in enumerate(zip(starts.tolist(), bounds[1:].tolist())):
+        cx, cy = next_x[i], next_y[i]
+        seg_x, seg_y = x[s:e], y[s:e]
+        area = np.abs((ax - cx) * (seg_y - ay) - (ax - seg_x) * (cy - ay))
+        j = s + int(area.argmax())
+        chosen[i + 1] = j
+        ax, ay = float(x[j]), float(y[j])
+    return chosen
+
+def minmax_indices(px, values):
+    """
+    Per pixel column, the rows holding the column's minimum and maximum value.
+    px must be sorted ascending.
+    """
+    if len(px) == 0:
+        return np.arange(0)
+    column = np.floor(px).astype(np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], column[1:] != column[:-1])))
+    if len(starts) == len(px):
+        return np.arange(len(px))
+    lows = _first_match_per_segment(values, starts, np.minimum.reduceat(values, starts))
+    highs = _first_match_per_segment(values, starts, np.maximum.reduceat(values, starts))
+    if len(lows) != len(highs):
+        # NaN columns match neither reduction
+        return np.union1d(lows, highs)
+    # One low and one high per column: interleave them in row order, no sort needed
+    idx = np.column_stack((np.minimum(lows, highs), np.maximum(lows, highs))).ravel()
+    return idx[np.concatenate(([True], idx[1:] != idx[:-1]))]
+
+def _line(series, name, px, width):
+    """
+    A line keeps the rows holding each pixel column's min and max, plus its
+    first and last row so it joins its neighbours. That is at most
+    POINTS_PER_PIXEL points per pixel and draws the same vertical extent in
+    every column as the full line; lines already within that budget are
+    left alone.
+    """
+    values = series[name]
+    n = len(series)
+    if n <= width * POINTS_PER_PIXEL:
+        return TimeSeries(series.ts, **{name: values})
+    idx = minmax_indices(np.clip(px, 0, max(0, width - 1)), values)
+    idx = np.concatenate(([0] if idx[0] else [], idx, [] if idx[-1] == n - 1 else [n - 1])).astype(np.int64)
+    return TimeSeries(series.ts[idx], **{name: values[idx]})
+
+def decimate_for_chart(api, db, start_ms, end_ms, width, is_main):
+    """
+    Reduces one exchange's normalized series to what `width` pixels can show:
+    spread bars keep the min/max spread of each pixel column, bid/ask lines
+    their min/max per column (see _line), and other exchanges' close lines
+    about POINTS_PER_PIXEL points per pixel via LTTB.
+    Main-exchange candles are left alone; there are at most a few hundred.
+    Only the main exchange draws spreads, so other exchanges get none.
+    """
+    width = max(1, int(width))
+    span = max(1, end_ms - start_ms)
+    if not is_main:
+        db = db[:0]
+
+    db = db.between(start_ms, end_ms)
+    px = (db.ts - start_ms) * (width / span)
+    bars = db.take(minmax_indices(px, db['spread']))
+
+    if not is_main and len(api) > width * POINTS_PER_PIXEL:
+        api = api.between(start_ms, end_ms)
+        api_px = (api.ts - start_ms) * (width / span)
+        api = api.take(lttb_indices(api_px, api['price'], width * POINTS_PER_PIXEL))
+
+    return {
+        'api': api,
+        'db': bars,
+        'bid': _line(db, 'bid', px, width),
+        'ask': _line(db, 'ask', px, width)
+    }
+
+def _settled_count(series, settle_ms):
+    """
+    Rows before settle_ms, leaving out the final row, which can still change.
+    """
+    return min(int(np.searchsorted(series.ts, settle_ms)), max(0, len(series) - 1))
+
+def settled_version(api, db, history_start, settle_ms):
+    """
+    Identifies what decimate_settled would draw by the range and final row
+    of each series' settled part, so it stays the same across refreshes
+    that only add or change newer rows.
+    """
+    version = [history_start, settle_ms]
+    for series in (api, db):
+        first = int(np.searchsorted(series.ts, history_start))
+        count = _settled_count(series, settle_ms)
+        if count <= first:
+            version.append(None)
+            continue
+        last = count - 1
+        version.append((count - first, int(series.ts[first]), int(series.ts[last]),
+                        *(float(series[name][last]) for name in series.columns)))
+    return tuple(version)
+
+def decimate_settled(api, db, history_start, settle_ms, width, is_main):
+    """
+    The part of the chart drawn into the history texture: rows from
+    history_start up to settle_ms, decimated to `width` pixels.
+    """
+    api = api[:_settled_count(api, settle_ms)].between(history_start, settle_ms)
+    db = db[:_settled_count(db, settle_ms)]
+    return decimate_for_chart(api, db, history_start, settle_ms, width, is_main)
+
+def decimate_live(api, db, settle_ms, end_ms, px_ms, is_main):
+    """
+    The part of the chart redrawn on every refresh: rows from settle_ms on
+    plus each series' final row. Lines start at the last settled row so they
+    join the history texture; prev_mid is that row's mid price, which colours
+    the first live spread bar.
+    """
+    width = max(1, (end_ms - settle_ms) / px_ms)
+    if not is_main:
+        db = db[:0]
+    count = _settled_count(db, settle_ms)
+    bars = db[count:]
+    lines = db[max(0, count - 1):]
+    line_px = (lines.ts - settle_ms) / px_ms
+    prev_mid = float(db['ask'][count - 1] + db['bid'][count - 1]) / 2 if count else None
+
+    api_count = _settled_count(api, settle_ms)
+    api = api[api_count:] if is_main else api[max(0, api_count - 1):]
+    if not is_main and len(api) > width * POINTS_PER_PIXEL:
+        api = api.take(lttb_indices((api.ts - settle_ms) / px_ms, api['price'], int(width * POINTS_PER_PIXEL)))
+
+    live = {
+        'api': api,
+        'db': bars.take(minmax_indices((bars.ts - settle_ms) / px_ms, bars['spread'])),
+        'bid': _line(lines, 'bid', line_px, width),
+        'ask': _line(lines, 'ask', line_px, width)
+    }
+    return live, prev_mid
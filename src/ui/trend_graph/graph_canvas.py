@@ -1,47 +1,166 @@
+import math
+import numpy as np
 from datetime import datetime, timezone
 from kivy.uix.relativelayout import RelativeLayout
-from kivy.uix.label import Label
-from kivy.graphics import Color, Line, Rectangle
+from kivy.graphics import Color, Line, Rectangle, InstructionGroup, Fbo, ClearColor, ClearBuffers
 from kivy.metrics import dp
 from .constants import *
+from .render_batch import MeshBatch, LabelPool
+
+HISTORY_STEP_PX = 32
+
+def history_window(start_ms, end_ms, chart_w):
+    """
+    Returns (history_start, settle_ms, anchor_end): the window end rounded up
+    to HISTORY_STEP_PX pixels of time, and the span of the history texture
+    before the step boundary settle_ms. Rows from settle_ms on are live.
+    """
+    span_ms = end_ms - start_ms
+    step_ms = span_ms / max(chart_w, 1) * HISTORY_STEP_PX
+    anchor_end = math.ceil(end_ms / step_ms) * step_ms
+    settle_ms = anchor_end - step_ms
+    return settle_ms - span_ms, settle_ms, anchor_end
+
+class SeriesLayer(InstructionGroup):
+    """
+    Persistent instructions for one exchange. Spread bars, wicks and candle
+    bodies are one MeshBatch per colour; bid/ask/close are single Lines.
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.spread_first = MeshBatch()
+        self.spread_up = MeshBatch()
+        self.spread_down = MeshBatch()
+        self.ask_color, self.ask_line = Color(*COLOR_ASK_LINE), Line(width=1.1)
+        self.bid_color, self.bid_line = Color(*COLOR_BID_LINE), Line(width=1.1)
+        self.wicks_up = MeshBatch(mode='lines')
+        self.wicks_down = MeshBatch(mode='lines')
+        self.bodies_up = MeshBatch()
+        self.bodies_down = MeshBatch()
+        self.close_color, self.close_line = Color(*DEFAULT_COLOR), Line(width=1.2)
+
+        for instruction in (self.spread_first, self.spread_up, self.spread_down,
+                            self.ask_color, self.ask_line, self.bid_color, self.bid_line,
+                            self.wicks_up, self.wicks_down, self.bodies_up, self.bodies_down,
+                            self.close_color, self.close_line):
+            self.add(instruction)
+
+    def reset(self):
+        for batch in (self.spread_first, self.spread_up, self.spread_down,
+                      self.wicks_up, self.wicks_down, self.bodies_up, self.bodies_down):
+            batch.reset()
+        for line in (self.ask_line, self.bid_line, self.close_line):
+            line.points = []
 
 class GraphCanvas(RelativeLayout):
+    """
+    Rendered in three layers:
+    - history: candles, spread bars and line segments before the last step
+      boundary drawn into an Fbo texture, refilled only when their version,
+      the step, the scale or the size changes
+    - live: everything after that boundary, redrawn each time
+    - background: grid lines and axis labels, updated when their text,
+      the scale or the size changes
+
+    The history texture is laid out against a window end rounded up to
+    HISTORY_STEP_PX pixels of time, so as time advances it is scrolled by
+    its texture coordinates instead of being redrawn.
+
+    draw_chart takes per exchange the output of decimate_settled and
+    decimate_live for the same window: {'window': (start_ms, end_ms),
+    'version': ..., 'candles': ..., 'settled': ..., 'live': ..., 'prev_mid': ...}.
+    """
     def __init__(self, main_exchange=None, **kwargs):
         super().__init__(**kwargs)
-        self.labels = []
         self.main_exchange = main_exchange
+        self.history_layers = {}
+        self.live_layers = {}
+        self.history_key = None
+        self.background_key = None
+
+        self.history_group = InstructionGroup()
+        self.history_fbo = Fbo(size=(1, 1))
+        with self.history_fbo:
+            ClearColor(*COLOR_BG)
+            ClearBuffers()
+        self.history_fbo.add(self.history_group)
 
-    def clear_graph(self):
-        self.canvas.clear()
-        for lbl in self.labels:
-            self.remove_widget(lbl)
-        self.labels.clear()
         with self.canvas:
             Color(*COLOR_BG)
-            Rectangle(pos=(0, 0), size=self.size)
+            self.bg_rect = Rectangle(pos=(0, 0), size=self.size)
+        self.canvas.add(self.history_fbo)
+        with self.canvas:
+            Color(1, 1, 1, 1)
+            self.history_rect = Rectangle(pos=(0, 0), size=(0, 0), texture=self.history_fbo.texture)
+
+        self.live_group = InstructionGroup()
+        self.canvas.add(self.live_group)
+
+        with self.canvas:
+            Color(*COLOR_GRID)
+            self.price_grid = [Line(width=1) for _ in range(5)]
+            Color(0.5, 0.5, 0.5, 0.5)
+            self.spread_separator = Line(width=1)
+            Color(0.2, 0.2, 0.2, 0.3)
+            self.time_grid = [Line(width=1) for _ in range(5)]
+
+        self.price_labels = LabelPool(self, font_size='11sp', color=COLOR_TEXT,
+                                      size=(dp(60), dp(20)), text_size=(dp(60), dp(20)),
+                                      halign='left', valign='middle')
+        self.time_labels = LabelPool(self, font_size='10sp', color=(0.6, 0.6, 0.6, 1), size=(dp(50), dp(30)))
+        self.spread_labels = LabelPool(self, font_size='10sp', color=(0.6, 0.6, 0.7, 1))
+
+    def _series_layer(self, layers, group, ex_name):
+        layer = layers.get(ex_name)
+        if layer is None:
+            layer = SeriesLayer()
+            group.add(layer)
+            layers[ex_name] = layer
+        return layer
+
+    def plot_window(self, period):
+        """
+        Returns (start_ms, end_ms, chart_w): the time range on screen and the
+        width in pixels it is drawn into.
+        """
+        end_ts = datetime.now(timezone.utc).astimezone(KST).timestamp()
+        start_ts = end_ts - TIME_SPAN_MAP.get(period, 86400)
+        return int(start_ts * 1000), int(end_ts * 1000), max(0, self.width - dp(60))
+
+    def clear_graph(self):
+        self.bg_rect.size = self.size
+        self.history_rect.size = (0, 0)
+        for layer in list(self.history_layers.values()) + list(self.live_layers.values()):
+            layer.reset()
+        for line in self.price_grid + self.time_grid + [self.spread_separator]:
+            line.points = []
+        for pool in (self.price_labels, self.time_labels, self.spread_labels):
+            pool.begin()
+            pool.end()
+        self.history_key = None
+        self.background_key = None
 
     def draw_chart(self, data_map, p_min, p_max, s_max, period):
-        self.clear_graph()
-        if not data_map: return
+        if not data_map:
+            self.clear_graph()
+            return
 
         w, h = self.size
+        self.bg_rect.size = self.size
         PAD_R, PAD_B, PAD_T = dp(60), dp(30), dp(10)
 
         chart_w = w - PAD_R
         chart_h_total = h - PAD_B - PAD_T
         h_price = chart_h_total * 0.75
         h_spread = chart_h_total * 0.25
-        
-        y_spread_start = PAD_B 
+
+        y_spread_start = PAD_B
         y_price_start = PAD_B + h_spread + dp(5)
         h_price_actual = h - y_price_start - PAD_T
 
-        now_kst = datetime.now(timezone.utc).astimezone(KST)
-        end_ts = now_kst.timestamp()
-        
-        time_span_sec = TIME_SPAN_MAP.get(period, 86400)
-        start_ts = end_ts - time_span_sec
-        time_span = end_ts - start_ts
+        start_ms, end_ms = next(iter(data_map.values()))['window']
+        span_ms = end_ms - start_ms
+        ms_per_px = span_ms / max(chart_w, 1)
 
         p_diff = max(p_max - p_min, 0.000001)
         p_base = p_min - (p_diff * 0.05)
@@ -49,110 +168,132 @@ class GraphCanvas(RelativeLayout):
         s_range = s_max * 1.2 if s_max > 0 else 1
 
         def get_clamped_y(val):
-            rel = (val - p_base) / p_range
-            y = y_price_start + (rel * h_price_actual)
-            return max(y_price_start, min(y, y_price_start + h_price_actual))
+            y = y_price_start + ((val - p_base) / p_range) * h_price_actual
+            return np.clip(y, y_price_start, y_price_start + h_price_actual)
 
-        with self.canvas:
-            Color(*COLOR_GRID)
-            for i in range(5):
-                ratio = i / 4
-                py = y_price_start + (h_price_actual * ratio)
-                Line(points=[0, py, chart_w, py], width=1)
-                
-                val = p_base + (p_range * ratio)
-                lbl_text = f"{val:,.0f}" if val > 1000 else f"{val:,.2f}"
-                lbl = Label(text=lbl_text, font_size='11sp', color=COLOR_TEXT,
-                            size_hint=(None, None), size=(PAD_R, dp(20)), text_size=(PAD_R, dp(20)),
-                            pos=(chart_w, py - dp(10)), halign='left', valign='middle')
-                self.add_widget(lbl)
-                self.labels.append(lbl)
+        def get_x(ts_ms):
+            return (ts_ms - start_ms) / ms_per_px
 
-            Color(0.5, 0.5, 0.5, 0.5)
-            Line(points=[0, y_spread_start + h_spread, chart_w, y_spread_start + h_spread], width=1)
-            
-            spread_lbl = Label(text=f"Spread (Max: {s_max:.2f})", font_size='10sp', color=(0.6, 0.6, 0.7, 1),
-                            size_hint=(None, None), pos=(dp(5), y_spread_start + h_spread - dp(20)))
-            self.add_widget(spread_lbl)
-            self.labels.append(spread_lbl)
-
-            for ex_name, data in data_map.items():
-                is_main = (ex_name == self.main_exchange)
-                
-                if data.get('db'):
-                    prev_mid = None
-                    bid_points, ask_points = [], []
-                    
-                    for d in data['db']:
-                        if d['ts'] < start_ts or d['ts'] > end_ts + 600: continue
-                        x_ratio = (d['ts'] - start_ts) / time_span
-                        if not (0 <= x_ratio <= 1): continue
-                        
-                        px = x_ratio * chart_w
-                        
-                        curr_mid = (d['ask'] + d['bid']) / 2
-                        if is_main:
-                            if prev_mid is None: bar_color = COLOR_SPREAD_DEFAULT
-                            elif curr_mid >= prev_mid: bar_color = (*COLOR_UP[:3], 0.5)
-                            else: bar_color = (*COLOR_DOWN[:3], 0.5)
-                            prev_mid = curr_mid
-                            
-                            Color(*bar_color)
-                            bar_h = min((d['spread'] / s_range) * h_spread, h_spread)
-                            Line(points=[px, y_spread_start, px, y_spread_start + max(1, bar_h)], width=1.2)
-                            
-                            bid_points.extend([px, get_clamped_y(d['bid'])])
-                            ask_points.extend([px, get_clamped_y(d['ask'])])
-
-                    if is_main and bid_points:
-                        Color(*COLOR_ASK_LINE)
-                        Line(points=ask_points, width=1.1)
-                        Color(*COLOR_BID_LINE)
-                        Line(points=bid_points, width=1.1)
-
-                api_data = data['api']
-                if not api_data: continue
-
-                if is_main:
-                    base_width = 1.0
-                    if period == '1H': base_width = 2.0
-                    candle_width = max(base_width, min((chart_w / (len(api_data) + 1)) * 0.7, 10.0))
-                    
-                    for d in api_data:
-                        if d['ts'] < start_ts or d['ts'] > end_ts: continue
-                        cx = ((d['ts'] - start_ts) / time_span) * chart_w
-                        y_o, y_c = get_clamped_y(d['o']), get_clamped_y(d['c'])
-                        y_h, y_l = get_clamped_y(d['h']), get_clamped_y(d['l'])
-
-                        Color(*(COLOR_UP if d['c'] >= d['o'] else COLOR_DOWN))
-                        Line(points=[cx, y_l, cx, y_h], width=1)
-                        Rectangle(pos=(cx - candle_width/2, min(y_o, y_c)), size=(candle_width, max(1, abs(y_c - y_o))))
-                else:
-                    c_line = EXCHANGE_COLORS.get(ex_name, DEFAULT_COLOR)
-                    Color(*c_line)
-                    pts = []
-                    for d in api_data:
-                        if d['ts'] < start_ts or d['ts'] > end_ts: continue
-                        pts.extend([((d['ts'] - start_ts) / time_span) * chart_w, get_clamped_y(d['c'])])
-                    if pts: Line(points=pts, width=1.2)
-
-            Color(*COLOR_TEXT)
-            for i in range(5):
-                ratio = i / 4
-                ts_val = start_ts + (time_span * ratio)
-                dt_obj = datetime.fromtimestamp(ts_val, KST)
-                
-                if period in ['1H', '1D']:
-                    t_str = dt_obj.strftime("%H:%M")
-                else:
-                    t_str = dt_obj.strftime("%m-%d")
-                    
-                px = chart_w * ratio
-                
-                Color(0.2, 0.2, 0.2, 0.3)
-                Line(points=[px, PAD_B, px, h], width=1)
-                
-                lbl = Label(text=t_str, font_size='10sp', color=(0.6, 0.6, 0.6, 1),
-                            size_hint=(None, None), size=(dp(50), PAD_B), pos=(px - dp(25), 0))
-                self.add_widget(lbl)
-                self.labels.append(lbl)
\ No newline at end of file
+        base_width = 2.0 if period == '1H' else 1.0
+        main_candles = data_map[self.main_exchange]['candles'] if self.main_exchange in data_map else 0
+        style = {
+            'to_y': get_clamped_y, 'y_spread': y_spread_start, 'h_spread': h_spread, 's_range': s_range,
+            'candle_width': max(base_width, min((chart_w / (main_candles + 1)) * 0.7, 10.0))
+        }
+
+        _, _, anchor_end = history_window(start_ms, end_ms, chart_w)
+        shift = (anchor_end - end_ms) / ms_per_px
+
+        history_key = (
+            w, h, p_base, p_range, s_range, style['candle_width'], anchor_end, span_ms, self.main_exchange,
+            tuple((ex_name, data['version']) for ex_name, data in sorted(data_map.items()))
+        )
+        if history_key != self.history_key:
+            self.history_key = history_key
+            settled = {ex_name: data['settled'] for ex_name, data in data_map.items()}
+            self._draw_history(settled, anchor_end - span_ms, ms_per_px, style)
+
+        fbo_w = self.history_fbo.size[0]
+        u0 = (HISTORY_STEP_PX - shift) / fbo_w
+        u1 = u0 + w / fbo_w
+        self.history_rect.size = (w, h)
+        self.history_rect.tex_coords = (u0, 0, u1, 0, u1, 1, u0, 1)
+
+        for ex_name in [name for name in self.live_layers if name not in data_map]:
+            self.live_layers[ex_name].reset()
+        for ex_name, data in data_map.items():
+            layer = self._series_layer(self.live_layers, self.live_group, ex_name)
+            self._fill_layer(layer, ex_name, data['live'], get_x, style, data['prev_mid'])
+
+        time_texts = []
+        for i in range(5):
+            dt_obj = datetime.fromtimestamp((start_ms + span_ms * i / 4) / 1000, KST)
+            time_texts.append(dt_obj.strftime("%H:%M") if period in ['1H', '1D'] else dt_obj.strftime("%m-%d"))
+
+        background_key = (w, h, p_base, p_range, s_max, tuple(time_texts))
+        if background_key == self.background_key: return
+        self.background_key = background_key
+
+        self.price_labels.begin()
+        for i, line in enumerate(self.price_grid):
+            ratio = i / 4
+            py = y_price_start + (h_price_actual * ratio)
+            line.points = [0, py, chart_w, py]
+
+            val = p_base + (p_range * ratio)
+            lbl_text = f"{val:,.0f}" if val > 1000 else f"{val:,.2f}"
+            self.price_labels.take(lbl_text, (chart_w, py - dp(10)))
+        self.price_labels.end()
+
+        self.spread_separator.points = [0, y_spread_start + h_spread, chart_w, y_spread_start + h_spread]
+        self.spread_labels.begin()
+        self.spread_labels.take(f"Spread (Max: {s_max:.2f})", (dp(5), y_spread_start + h_spread - dp(20)))
+        self.spread_labels.end()
+
+        self.time_labels.begin()
+        for i, (line, t_str) in enumerate(zip(self.time_grid, time_texts)):
+            px = chart_w * i / 4
+            line.points = [px, PAD_B, px, h]
+            self.time_labels.take(t_str, (px - dp(25), 0))
+        self.time_labels.end()
+
+    def _draw_history(self, settled, window_start, ms_per_px, style):
+        fbo_size = (int(self.width) + HISTORY_STEP_PX, max(1, int(self.height)))
+        if tuple(self.history_fbo.size) != fbo_size:
+            self.history_fbo.size = fbo_size
+            self.history_rect.texture = self.history_fbo.texture
+
+        def to_x(ts_ms):
+            return (ts_ms - window_start) / ms_per_px + HISTORY_STEP_PX
+
+        for ex_name in [name for name in self.history_layers if name not in settled]:
+            self.history_layers[ex_name].reset()
+        for ex_name, part in settled.items():
+            layer = self._series_layer(self.history_layers, self.history_group, ex_name)
+            self._fill_layer(layer, ex_name, part, to_x, style)
+
+    def _fill_layer(self, layer, ex_name, data, to_x, style, prev_mid=None):
+        layer.reset()
+        get_clamped_y = style['to_y']
+        y_spread_start, h_spread = style['y_spread'], style['h_spread']
+
+        bars = data['db']
+        if ex_name == self.main_exchange and len(bars):
+            px = to_x(bars.ts)
+            mid = (bars['ask'] + bars['bid']) / 2
+            prev = np.concatenate(([np.nan if prev_mid is None else prev_mid], mid[:-1]))
+            first = np.isnan(prev)
+            rising = ~first & (mid >= prev)
+            bar_top = y_spread_start + np.maximum(1, np.minimum((bars['spread'] / style['s_range']) * h_spread, h_spread))
+
+            for batch, color, mask in ((layer.spread_first, COLOR_SPREAD_DEFAULT, first),
+                                       (layer.spread_up, (*COLOR_UP[:3], 0.5), rising),
+                                       (layer.spread_down, (*COLOR_DOWN[:3], 0.5), ~rising & ~first)):
+                batch.set_quads(color, px[mask] - 0.6, y_spread_start, px[mask] + 0.6, bar_top[mask])
+
+        if ex_name == self.main_exchange:
+            for line, name in ((layer.ask_line, 'ask'), (layer.bid_line, 'bid')):
+                series = data[name]
+                line.points = np.column_stack((to_x(series.ts), get_clamped_y(series[name]))).ravel().tolist()
+
+        api = data['api']
+        if not len(api): return
+        cx = to_x(api.ts)
+
+        if ex_name == self.main_exchange:
+            candle_width = style['candle_width']
+            o, c = api['open'], api['price']
+            y_o, y_c = get_clamped_y(o), get_clamped_y(c)
+            y_h, y_l = get_clamped_y(api['high']), get_clamped_y(api['low'])
+            body_y = np.minimum(y_o, y_c)
+            body_top = body_y + np.maximum(1, np.abs(y_c - y_o))
+            up = c >= o
+
+            for wicks, bodies, color, mask in ((layer.wicks_up, layer.bodies_up, COLOR_UP, up),
+                                               (layer.wicks_down, layer.bodies_down, COLOR_DOWN, ~up)):
+                x = cx[mask]
+                wicks.set_segments(color, x, y_l[mask], x, y_h[mask])
+                bodies.set_quads(color, x - candle_width/2, body_y[mask], x + candle_width/2, body_top[mask])
+        else:
+            layer.close_color.rgba = EXCHANGE_COLORS.get(ex_name, DEFAULT_COLOR)
+            layer.close_line.points = np.column_stack((cx, get_clamped_y(api['price']))).ravel().tolist()
@@ -7,6 +7,7 @@ from kivy.uix.modalview import ModalView
 from kivy.metrics import dp
 from kivy.app import App
 
+from services.request_scheduler import INTERACTIVE, BACKGROUND
 from .constants import *
 from .graph_widget import TrendGraphWidget
 
@@ -123,18 +124,21 @@ class DetailGraphPopup(ModalView):
             self.graph_widget.set_loading()
             
         try:
-            self.usdt_krw_rate = await self.price_service.get_usdt_krw_price() or 1400.0
+            priority = BACKGROUND if silent else INTERACTIVE
+            self.usdt_krw_rate = await self.price_service.get_usdt_krw_price(priority) or 1400.0
             loop = asyncio.get_event_loop()
             
-            api_tasks = [self.price_service.fetch_ohlcv_history(t['exchange'], t['symbol'], period) for t in self.compare_targets]
+            api_tasks = [self.price_service.fetch_ohlcv_history(t['exchange'], t['symbol'], period, priority) for t in self.compare_targets]
             api_results = await asyncio.gather(*api_tasks)
 
+            buckets = max(100, int(self.graph_widget.canvas_area.width))
+
             combined_data = {}
             for i, target in enumerate(self.compare_targets):
                 ex_name = target['exchange']
                 
                 db_history = await loop.run_in_executor(
-                    None, self.db_service.get_spread_history, ex_name, target['symbol'], period
+                    None, self.db_service.get_spread_history, ex_name, target['symbol'], period, buckets
                 )
                 
                 combined_data[ex_name] = {
@@ -1,9 +1,10 @@
-from datetime import datetime, timezone
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.metrics import dp
 from .constants import *
-from .graph_canvas import GraphCanvas
+from services.time_series import TimeSeries
+from .graph_canvas import GraphCanvas, history_window
+from .decimation import settled_version, decimate_settled, decimate_live
 
 class TrendGraphWidget(BoxLayout):
     def __init__(self, main_exchange=None, **kwargs):
@@ -27,6 +28,8 @@ class TrendGraphWidget(BoxLayout):
         self.add_widget(self.canvas_area)
         
         self.raw_data_map = {}
+        self.series_cache = {}
+        self.settled_cache = {}
         self.active_exchanges = set()
         self.current_period = '1D'
         self.current_rate = 1400.0
@@ -44,102 +47,112 @@ class TrendGraphWidget(BoxLayout):
         self.raw_data_map = data_map
         self.current_period = period
         self.current_rate = rate
+
+        for cache in (self.series_cache, self.settled_cache):
+            for ex_name in [name for name in cache if name not in data_map]:
+                del cache[ex_name]
         
         if not self.active_exchanges:
             self.active_exchanges = set(data_map.keys())
             
         self.redraw_with_filter()
 
+    def _cached_series(self, ex_name, start_ms, end_ms, chart_w):
+        """
+        Normalized series, bounds and chart data for one exchange. The
+        normalized series are reused until update_graph hands over different
+        series or the KRW rate changes. The settled part of the chart is kept
+        across refreshes while its version and width stay the same; only the
+        live tail is decimated again on every call.
+        """
+        raw_entry = self.raw_data_map[ex_name]
+        scale = 1.0 / self.current_rate if 'KRW' in raw_entry['symbol'] else 1.0
+
+        entry = self.series_cache.get(ex_name)
+        if (entry is None or entry['scale'] != scale
+                or entry['raw_api'] is not raw_entry['api'] or entry['raw_db'] is not raw_entry['db']):
+            norm_api = _normalize_candles(raw_entry['api'], scale)
+            norm_db = _normalize_spreads(raw_entry['db'], scale)
+            entry = {
+                'raw_api': raw_entry['api'], 'raw_db': raw_entry['db'], 'scale': scale,
+                'api': norm_api, 'db': norm_db,
+                'bounds': (float(norm_api['low'].min()), float(norm_api['high'].max())) if len(norm_api) else None,
+                'last_price': float(norm_api['price'][-1]) if len(norm_api) else None,
+                's_max': float(norm_db['spread'].max()) if len(norm_db) else 0.0,
+                'chart': None
+            }
+            self.series_cache[ex_name] = entry
+
+        is_main = ex_name == self.main_exchange
+        history_start, settle_ms, _ = history_window(start_ms, end_ms, chart_w)
+        version = (int(chart_w), is_main, settled_version(entry['api'], entry['db'], history_start, settle_ms))
+        settled = self.settled_cache.get(ex_name)
+        if settled is None or settled[0] != version:
+            settled = (version, decimate_settled(entry['api'], entry['db'], history_start, settle_ms, chart_w, is_main))
+            self.settled_cache[ex_name] = settled
+
+        px_ms = (end_ms - start_ms) / max(1, chart_w)
+        live, prev_mid = decimate_live(entry['api'], entry['db'], settle_ms, end_ms, px_ms, is_main)
+        entry['chart'] = {
+            'window': (start_ms, end_ms), 'version': version, 'candles': len(entry['api']),
+            'settled': settled[1], 'live': live, 'prev_mid': prev_mid
+        }
+        return entry
+
     def redraw_with_filter(self):
         if not self.raw_data_map: return
 
         visible_data = {}
         info_texts = []
         
-        main_prices = [] 
-        all_prices = []
+        main_bounds = []
+        all_bounds = []
+        s_max = 0.0
+        start_ms, end_ms, chart_w = self.canvas_area.plot_window(self.current_period)
 
         for ex_name in self.active_exchanges:
             if ex_name not in self.raw_data_map: continue
             
-            raw_entry = self.raw_data_map[ex_name]
-            is_krw = 'KRW' in raw_entry['symbol']
-            
-            norm_api = []
-            prev_close = None
-            
-            for h in raw_entry['api']:
-                if isinstance(h['ts'], datetime):
-                    ts_obj = h['ts'].replace(tzinfo=timezone.utc) if h['ts'].tzinfo is None else h['ts']
-                    ts = ts_obj.astimezone(KST).timestamp()
-                else:
-                    ts_val = float(h['ts'])
-                    if ts_val > 3000000000: ts_val /= 1000
-                    ts = datetime.fromtimestamp(ts_val, timezone.utc).astimezone(KST).timestamp()
-
-                c_p = h['price']
-                h_p = h.get('high', c_p)
-                l_p = h.get('low', c_p)
-                o_p = h.get('open', prev_close if prev_close else c_p)
-                prev_close = c_p
-
-                if is_krw:
-                    c_p /= self.current_rate
-                    h_p /= self.current_rate
-                    l_p /= self.current_rate
-                    o_p /= self.current_rate
-
-                norm_api.append({'ts': ts, 'o': o_p, 'h': h_p, 'l': l_p, 'c': c_p})
-                
+            entry = self._cached_series(ex_name, start_ms, end_ms, chart_w)
+            visible_data[ex_name] = entry['chart']
+
+            if entry['bounds']:
+                all_bounds.append(entry['bounds'])
                 if ex_name == self.main_exchange:
-                    main_prices.append(h_p)
-                    main_prices.append(l_p)
-                all_prices.append(h_p)
-                all_prices.append(l_p)
-
-            norm_db = []
-            if raw_entry.get('db'):
-                for d in raw_entry['db']:
-                    if isinstance(d['ts'], datetime):
-                        d_ts_obj = d['ts'].replace(tzinfo=timezone.utc) if d['ts'].tzinfo is None else d['ts']
-                        ts = d_ts_obj.astimezone(KST).timestamp()
-                    else:
-                        ts_val = float(d['ts'])
-                        if ts_val > 3000000000: ts_val /= 1000
-                        ts = datetime.fromtimestamp(ts_val, timezone.utc).astimezone(KST).timestamp()
-
-                    bid = d.get('bid', 0)
-                    ask = d.get('ask', 0)
-                    if is_krw:
-                        bid /= self.current_rate
-                        ask /= self.current_rate
-                    
-                    spread = ask - bid if (ask > 0 and bid > 0) else 0
-                    if spread > 0:
-                        norm_db.append({'ts': ts, 'spread': spread, 'bid': bid, 'ask': ask})
-
-            visible_data[ex_name] = {'api': norm_api, 'db': norm_db}
-
-            if norm_api:
-                last_p = norm_api[-1]['c']
+                    main_bounds.append(entry['bounds'])
+
                 ex_color = EXCHANGE_COLORS.get(ex_name, DEFAULT_COLOR)
                 hex_col = "".join([f"{int(c*255):02x}" for c in ex_color[:3]])
-                info_texts.append(f"[color={hex_col}]{ex_name}[/color] [b]${last_p:,.2f}[/b]")
+                info_texts.append(f"[color={hex_col}]{ex_name}[/color] [b]${entry['last_price']:,.2f}[/b]")
+
+            s_max = max(s_max, entry['s_max'])
 
         if not visible_data:
             self.info_lbl.text = "No Data Available"
             self.canvas_area.clear_graph()
             return
 
-        if main_prices:
-            p_max, p_min = max(main_prices), min(main_prices)
-        elif all_prices:
-            p_max, p_min = max(all_prices), min(all_prices)
+        bounds = main_bounds or all_bounds
+        if bounds:
+            p_min = min(b[0] for b in bounds)
+            p_max = max(b[1] for b in bounds)
         else:
             p_max, p_min = 1, 0
 
-        all_spreads = [d['spread'] for v in visible_data.values() for d in v['db']]
-        s_max = max(all_spreads) if all_spreads else 0
-
         self.info_lbl.text = "  |  ".join(info_texts)
-        self.canvas_area.draw_chart(visible_data, p_min, p_max, s_max, self.current_period)
\ No newline at end of file
+        self.canvas_area.draw_chart(visible_data, p_min, p_max, s_max, self.current_period)
+
+def _normalize_candles(series, scale):
+    if scale == 1.0:
+        return series
+    return series.with_columns(**{name: series[name] * scale for name in ('open', 'high', 'low', 'price')})
+
+def _normalize_spreads(series, scale):
+    bid = series['bid'] * scale
+    ask = series['ask'] * scale
+    spread = ask - bid
+
+    keep = (bid > 0) & (ask > 0) & (spread > 0)
+    if keep.all():
+        return TimeSeries(series.ts, bid=bid, ask=ask, spread=spread)
+    return TimeSeries(series.ts[keep], bid=bid[keep], ask=ask[keep], spread=spread[keep])
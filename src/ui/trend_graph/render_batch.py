@@ -0,0 +1,95 @@
+import numpy as np
+from kivy.uix.label import Label
+from kivy.graphics import Color, Mesh, InstructionGroup
+
+# Mesh indices are unsigned shorts
+MAX_MESH_VERTICES = 65532
+
+QUAD_INDICES = np.array([0, 1, 2, 2, 3, 0], dtype=np.int64)
+SEGMENT_INDICES = np.array([0, 1], dtype=np.int64)
+
+def quad_points(x0, y0, x1, y1):
+    """
+    Axis-aligned rectangles (one per element) -> (n*4, 2) corner points.
+    """
+    return np.stack(np.broadcast_arrays(x0, y0, x1, y0, x1, y1, x0, y1), axis=1).reshape(-1, 2)
+
+def segment_points(x0, y0, x1, y1):
+    return np.stack(np.broadcast_arrays(x0, y0, x1, y1), axis=1).reshape(-1, 2)
+
+class MeshBatch(InstructionGroup):
+    """
+    Same-coloured primitives packed into as few Mesh instructions as the
+    16-bit index limit allows. Meshes are kept and refilled on every update.
+    """
+    def __init__(self, mode='triangles', **kwargs):
+        super().__init__(**kwargs)
+        self.mode = mode
+        self.color = Color(1, 1, 1, 1)
+        self.add(self.color)
+        self.meshes = []
+
+    def set_quads(self, color, x0, y0, x1, y1):
+        self._fill(color, quad_points(x0, y0, x1, y1), 4, QUAD_INDICES)
+
+    def set_segments(self, color, x0, y0, x1, y1):
+        self._fill(color, segment_points(x0, y0, x1, y1), 2, SEGMENT_INDICES)
+
+    def reset(self):
+        for mesh in self.meshes:
+            mesh.indices = []
+            mesh.vertices = []
+
+    def _fill(self, color, points, verts_per_shape, pattern):
+        self.color.rgba = color
+        per_mesh = MAX_MESH_VERTICES // verts_per_shape * verts_per_shape
+        starts = range(0, len(points), per_mesh)
+
+        while len(self.meshes) < len(starts):
+            mesh = Mesh(mode=self.mode)
+            self.add(mesh)
+            self.meshes.append(mesh)
+
+        for mesh, start in zip(self.meshes, starts):
+            chunk = points[start:start + per_mesh]
+            vertices = np.zeros((len(chunk), 4), dtype=np.float32)
+            vertices[:, :2] = chunk
+            offsets = np.arange(len(chunk) // verts_per_shape) * verts_per_shape
+            mesh.indices = []
+            mesh.vertices = vertices.ravel().tolist()
+            mesh.indices = (offsets[:, None] + pattern).ravel().tolist()
+
+        for mesh in self.meshes[len(starts):]:
+            mesh.indices = []
+            mesh.vertices = []
+
+class LabelPool:
+    """
+    Labels sharing one style, created on demand and reused across redraws.
+    Call begin(), take() one label per visible text, then end() to hide the rest.
+    """
+    def __init__(self, parent, **style):
+        self.parent = parent
+        self.style = style
+        self.labels = []
+        self.used = 0
+
+    def begin(self):
+        self.used = 0
+
+    def take(self, text, pos):
+        if self.used < len(self.labels):
+            lbl = self.labels[self.used]
+        else:
+            lbl = Label(size_hint=(None, None), **self.style)
+            self.parent.add_widget(lbl)
+            self.labels.append(lbl)
+        self.used += 1
+        lbl.text = text
+        lbl.pos = pos
+        lbl.opacity = 1
+        return lbl
+
+    def end(self):
+        for lbl in self.labels[self.used:]:
+            lbl.opacity = 0
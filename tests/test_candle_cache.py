@@ -0,0 +1,121 @@
+import asyncio
+import numpy as np
+
+from services.candle_cache import CandleCache, CandleEntry
+
+TF = 60_000
+
+def candle(ts, close, volume=1.0):
+    return [ts, close - 1, close + 2, close - 2, close, volume]
+
+def test_merge_splits_closed_and_open_candles():
+    entry = CandleEntry(TF)
+    entry.limit = 10
+    now_ms = 5 * TF + 30_000
+    entry.merge([candle(i * TF, 100 + i) for i in range(6)], now_ms)
+    assert list(entry.closed.ts) == [i * TF for i in range(5)]
+    assert entry.open.last_ts() == 5 * TF
+    assert len(entry) == 6
+    assert list(entry.candles(3).ts) == [3 * TF, 4 * TF, 5 * TF]
+
+def test_incremental_merge_replaces_the_open_candle_without_duplicates():
+    entry = CandleEntry(TF)
+    entry.limit = 10
+    entry.merge([candle(i * TF, 100 + i) for i in range(6)], 5 * TF + 1_000)
+
+    # The open candle closed with a different price and two more opened since
+    entry.merge([candle(5 * TF, 200), candle(6 * TF, 201), candle(7 * TF, 202)], 7 * TF + 1_000)
+    assert list(entry.closed.ts) == [i * TF for i in range(7)]
+    assert entry.closed['price'][-2] == 200
+    assert entry.open.last_ts() == 7 * TF
+    assert entry.open['price'][0] == 202
+
+    # Overlapping closed candles already cached are not appended again
+    entry.merge([candle(6 * TF, 999), candle(7 * TF, 203)], 7 * TF + 2_000)
+    assert list(entry.closed.ts) == [i * TF for i in range(7)]
+    assert entry.closed['price'][-1] == 201
+    assert entry.open['price'][0] == 203
+
+def test_merge_keeps_only_limit_closed_candles():
+    entry = CandleEntry(TF)
+    entry.limit = 3
+    entry.merge([candle(i * TF, 100 + i) for i in range(6)], 5 * TF + 1_000)
+    assert list(entry.closed.ts) == [2 * TF, 3 * TF, 4 * TF]
+    assert list(entry.candles(3).ts) == [3 * TF, 4 * TF, 5 * TF]
+
+def test_plan_full_fresh_and_incremental():
+    cache = CandleCache(open_ttl=60)
+    key = ('binance', 'BTC/USDT', '1m')
+    now_ms = 5 * TF + 1_000
+    assert cache.plan(key, '1m', 5, now_ms) == (None, None)
+
+    entry = cache.store(key, '1m', 5, [candle(i * TF, 100 + i) for i in range(6)], now_ms)
+    assert cache.plan(key, '1m', 5, now_ms) == (entry, False)
+    # More candles than cached: full fetch
+    assert cache.plan(key, '1m', 50, now_ms) == (entry, None)
+    # The open candle closed: fetch from it onward, ttl or not
+    assert cache.plan(key, '1m', 5, 6 * TF + 1_000) == (entry, 5 * TF)
+    # Idle for longer than the window: full fetch
+    assert cache.plan(key, '1m', 5, 20 * TF) == (entry, None)
+
+    cache.open_ttl = 0
+    assert cache.plan(key, '1m', 5, now_ms) == (entry, 5 * TF)
+
+def test_replacing_an_entry_keeps_the_candle_count():
+    cache = CandleCache()
+    key = ('binance', 'BTC/USDT', '1d')
+    day = 86_400_000
+    now_ms = 400 * day + 1_000
+    cache.store(key, '1d', 90, [candle(i * day, 100 + i) for i in range(310, 401)], now_ms)
+    cache.store(('upbit', 'BTC/KRW', '1d'), '1d', 90, [candle(i * day, 100 + i) for i in range(310, 401)], now_ms)
+
+    # 3M then 1Y on the same key: plan asks for a full fetch of the cached entry
+    entry, since = cache.plan(key, '1d', 365, now_ms)
+    assert since is None
+    cache.store(key, '1d', 365, [candle(i * day, 100 + i) for i in range(36, 401)], now_ms)
+    assert len(cache.entries[key]) == 365
+    assert cache.total == sum(len(e) for e in cache.entries.values())
+
+    # An entry passed back after it was evicted mid-fetch is not subtracted twice
+    cache.entries.pop(key)
+    cache.total = sum(len(e) for e in cache.entries.values())
+    cache.store(key, '1d', 90, [candle(400 * day, 1)], now_ms, entry, full=False)
+    assert cache.total == sum(len(e) for e in cache.entries.values())
+
+def test_store_evicts_least_recently_used_entries():
+    cache = CandleCache(max_candles=15)
+    now_ms = 9 * TF + 1_000
+    rows = [candle(i * TF, 100 + i) for i in range(10)]
+    cache.store('a', '1m', 10, rows, now_ms)
+    cache.store('b', '1m', 10, rows, now_ms)
+    assert list(cache.entries) == ['b']
+    assert cache.total == 10
+
+def test_price_service_incremental_fetch_matches_a_full_fetch(monkeypatch):
+    monkeypatch.setenv('FAKE_EXCHANGE', 'latency=0,jitter=0')
+    from services.price_service import PriceService
+
+    async def scenario():
+        service = PriceService()
+        service.candle_cache.open_ttl = 0
+        try:
+            first = await service.fetch_ohlcv_history('Binance', 'BTC/USDT', '1D')
+            cached = await service.fetch_ohlcv_history('Binance', 'BTC/USDT', '1D')
+            client = service.exchanges.get('Binance')
+            requests = client.stats['requests']
+
+            fresh = PriceService()
+            try:
+                full = await fresh.fetch_ohlcv_history('Binance', 'BTC/USDT', '1D')
+            finally:
+                await fresh.close_all()
+            return first, cached, full, requests
+        finally:
+            await service.close_all()
+
+    first, cached, full, requests = asyncio.run(scenario())
+    assert len(first) > 0
+    assert requests == 2
+    assert np.array_equal(cached.ts, full.ts)
+    for name in cached.columns:
+        assert np.allclose(cached[name], full[name])
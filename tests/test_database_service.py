@@ -0,0 +1,238 @@
+import queue, threading, time
+from datetime import datetime, timedelta, timezone
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+import services.database_service as database_service
+
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+@pytest.fixture
+def db(monkeypatch):
+    if not database_service.MONGO_AVAILABLE:
+        pytest.skip("pymongo not installed")
+    monkeypatch.setenv('MONGO_DB_NAME', 'bitanalyzer_test')
+    monkeypatch.setattr(database_service, 'MongoClient', mongomock.MongoClient)
+    service = database_service.DatabaseService()
+    service.spread_col.delete_many({})
+    for col in service.rollup_cols.values():
+        col.delete_many({})
+    # mongomock re-scans TTL indexes on every insert
+    service.spread_col.drop_index('timestamp_1')
+    yield service
+    service.close()
+
+@pytest.fixture
+def rollups(db, monkeypatch):
+    """
+    mongomock's bulk_write cannot take pymongo's UpdateOne ops, so the
+    rollup upserts are applied one at a time through update_one.
+    """
+    for col in db.rollup_cols.values():
+        def bulk_write(ops, ordered=True, col=col):
+            for op in ops:
+                col.update_one(op._filter, op._doc, upsert=op._upsert)
+        monkeypatch.setattr(col, 'bulk_write', bulk_write, raising=False)
+    return db
+
+def aligned(seconds, back):
+    """
+    A bucket boundary about `back` seconds ago.
+    """
+    now = datetime.now(timezone.utc).timestamp()
+    return datetime.fromtimestamp((now - back) // seconds * seconds, timezone.utc)
+
+def spread_rows(start, count, step_s=10, offset=0):
+    rows = []
+    for i in range(count):
+        bid = 100.0 + (i * 7) % 13
+        ask = bid + 1 + (i % 3)
+        rows.append({'exchange': 'Binance', 'symbol': 'BTC/USDT', 'bid': bid, 'ask': ask, 'spread': ask - bid,
+                     'timestamp': start + timedelta(seconds=offset + i * step_s)})
+    return rows
+
+def ms(dt):
+    return int((dt - EPOCH_UTC).total_seconds() * 1000)
+
+def test_pick_tier_uses_the_coarsest_tier_that_fills_the_chart(db):
+    picked = {period: db._pick_tier(seconds, 1000)[0] for period, seconds in database_service.PERIOD_SECONDS.items()}
+    assert picked == {'1H': None, '1D': '1m', '1M': '1h', '3M': '1h', '1Y': '1d'}
+
+def test_raw_rows_are_bucketed_with_last_min_max_avg(db):
+    start = aligned(40, 1800)
+    rows = spread_rows(start, 60)
+    db.spread_col.insert_many([dict(r) for r in rows])
+
+    # 1H over 90 buckets: too few 1m rollups, so 40 s buckets of four raw rows
+    series = db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=90)
+    assert list(series.ts) == [ms(start) + i * 40_000 for i in range(15)]
+    for i in range(15):
+        bucket = rows[i * 4:(i + 1) * 4]
+        for field in ('bid', 'ask', 'spread'):
+            values = [r[field] for r in bucket]
+            assert series[field][i] == values[-1]
+            assert series[f"{field}_min"][i] == min(values)
+            assert series[f"{field}_max"][i] == max(values)
+            assert series[f"{field}_avg"][i] == pytest.approx(sum(values) / len(values))
+
+def test_other_pairs_and_old_rows_are_left_out(db):
+    start = aligned(40, 1800)
+    db.spread_col.insert_many(spread_rows(start, 4))
+    other = spread_rows(start, 4)
+    for row in other:
+        row['symbol'] = 'ETH/USDT'
+    db.spread_col.insert_many(other + spread_rows(start - timedelta(hours=2), 4))
+
+    series = db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=90)
+    assert list(series.ts) == [ms(start)]
+
+def test_rollup_tier_combines_minute_buckets(db):
+    start = aligned(120, 3 * 3600)
+    docs = []
+    for i in range(4):
+        doc = {'exchange': 'Binance', 'symbol': 'BTC/USDT', 'timestamp': start + timedelta(minutes=i), 'count': i + 1}
+        for field, base in (('bid', 100.0), ('ask', 101.0), ('spread', 1.0)):
+            doc.update({f"{field}_sum": base * (i + 1) + i, f"{field}_min": base - i, f"{field}_max": base + i,
+                        f"{field}_last": base + i / 2})
+        docs.append(doc)
+    db.rollup_cols['1m'].insert_many(docs)
+
+    # 1D over 1000 buckets reads the 1m tier in 2-minute buckets
+    series = db.get_spread_history('Binance', 'BTC/USDT', '1D')
+    assert list(series.ts) == [ms(start), ms(start) + 120_000]
+    for i, pair in enumerate((docs[:2], docs[2:])):
+        count = sum(d['count'] for d in pair)
+        assert series['bid'][i] == pair[-1]['bid_last']
+        assert series['bid_min'][i] == min(d['bid_min'] for d in pair)
+        assert series['bid_max'][i] == max(d['bid_max'] for d in pair)
+        assert series['bid_avg'][i] == pytest.approx(sum(d['bid_sum'] for d in pair) / count)
+
+def full_queue(db, policy, size=2):
+    """
+    Stops the writer and gives the service a small queue already holding `size` rows.
+    """
+    db.close()
+    db.full_policy = policy
+    db.write_queue = queue.Queue(maxsize=size)
+    for i in range(size):
+        db.save_spread('Binance', 'BTC/USDT', 100.0 + i, 101.0 + i)
+    return [row['bid'] for row in list(db.write_queue.queue)]
+
+def test_drop_oldest_is_the_default_and_keeps_the_newest_rows(db):
+    assert db.full_policy == 'drop_oldest'
+    assert full_queue(db, 'drop_oldest') == [100.0, 101.0]
+    db.save_spread('Binance', 'BTC/USDT', 200.0, 201.0)
+    assert [row['bid'] for row in list(db.write_queue.queue)] == [101.0, 200.0]
+    assert db.get_write_stats()['dropped'] == 1
+
+def test_drop_discards_the_new_row(db):
+    full_queue(db, 'drop')
+    db.save_spread('Binance', 'BTC/USDT', 200.0, 201.0)
+    assert [row['bid'] for row in list(db.write_queue.queue)] == [100.0, 101.0]
+    assert db.get_write_stats()['dropped'] == 1
+
+def test_block_waits_for_room_then_gives_up(db):
+    full_queue(db, 'block')
+    db.block_timeout = 0.05
+    start = time.monotonic()
+    db.save_spread('Binance', 'BTC/USDT', 200.0, 201.0)
+    assert time.monotonic() - start >= 0.05
+    assert db.get_write_stats()['dropped'] == 1
+
+    # A writer freeing a slot within the timeout lets the row in
+    db.block_timeout = 2.0
+    threading.Timer(0.05, db.write_queue.get_nowait).start()
+    db.save_spread('Binance', 'BTC/USDT', 300.0, 301.0)
+    assert [row['bid'] for row in list(db.write_queue.queue)] == [101.0, 300.0]
+    assert db.get_write_stats()['dropped'] == 1
+
+def epoch_s(dt):
+    return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+
+def test_flushes_upsert_rollups_that_match_the_raw_ticks(rollups):
+    db = rollups
+    # Stop the writer thread; the queue is flushed by hand below
+    db.close()
+    quotes = [(100.0 + (i * 7) % 13, 102.0 + (i * 5) % 11) for i in range(14)]
+    rows = []
+    for part in (quotes[:6], quotes[6:]):
+        for bid, ask in part:
+            db.save_spread('Binance', 'BTC/USDT', bid, ask)
+        batch = []
+        while not db.write_queue.empty():
+            batch.append(db.write_queue.get_nowait())
+        db._flush(batch)
+        rows += batch
+    assert db.get_write_stats()['written'] == len(quotes)
+    assert db.spread_col.count_documents({}) == len(quotes)
+
+    for tier, seconds, _ in database_service.ROLLUP_TIERS:
+        expected = {}
+        for row in rows:
+            expected.setdefault(int(epoch_s(row['timestamp']) // seconds) * seconds, []).append(row)
+        docs = {int(epoch_s(d['timestamp'])): d for d in db.rollup_cols[tier].find({'symbol': 'BTC/USDT'})}
+        assert sorted(docs) == sorted(expected)
+        for bucket, ticks in expected.items():
+            doc = docs[bucket]
+            assert doc['count'] == len(ticks)
+            assert epoch_s(doc['last_ts']) == pytest.approx(epoch_s(ticks[-1]['timestamp']), abs=0.001)
+            for field in ('bid', 'ask', 'spread'):
+                values = [t[field] for t in ticks]
+                assert doc[f"{field}_sum"] == pytest.approx(sum(values))
+                assert doc[f"{field}_min"] == min(values)
+                assert doc[f"{field}_max"] == max(values)
+                assert doc[f"{field}_last"] == values[-1]
+    # Both batches landed in the same day and were merged, not duplicated
+    assert db.rollup_cols['1d'].count_documents({}) == 1
+
+def assert_same_series(a, b):
+    assert list(a.ts) == list(b.ts)
+    for name in b.columns:
+        assert list(a[name]) == pytest.approx(list(b[name]))
+
+def test_refresh_reaggregates_from_the_newest_bucket_only(db, monkeypatch):
+    start = aligned(40, 1800)
+    db.spread_col.insert_many(spread_rows(start, 10))
+    first = db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=90)
+    assert len(first) == 3
+
+    # Two more rows in the newest bucket, then three new buckets
+    db.spread_col.insert_many(spread_rows(start, 2, offset=100))
+    db.spread_col.insert_many(spread_rows(start, 12, offset=120))
+
+    calls = []
+    aggregate = db._aggregate_history
+    monkeypatch.setattr(db, '_aggregate_history', lambda *args: calls.append(args[-1]) or aggregate(*args))
+    refreshed = db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=90)
+    assert [ms(since) for since in calls] == [ms(start) + 80_000]
+
+    db.history_cache.clear()
+    cold = db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=90)
+    assert len(cold) == 6
+    assert_same_series(refreshed, cold)
+    # The earlier result is not modified in place
+    assert len(first) == 3
+
+def test_refresh_trims_buckets_that_left_the_window(db):
+    from services.time_series import TimeSeries
+    start = aligned(40, 1800)
+    db.spread_col.insert_many(spread_rows(start, 8))
+    db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=90)
+
+    # Pretend the cache was filled two hours ago
+    entry = db.history_cache[('Binance', 'BTC/USDT', '1H')]
+    stale_ms = ms(start) - 2 * 3600 * 1000
+    stale = TimeSeries([stale_ms], **{name: [1.0] for name in entry['series'].columns})
+    entry['series'] = TimeSeries.concat([stale, entry['series']])
+
+    series = db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=90)
+    assert list(series.ts) == [ms(start), ms(start) + 40_000]
+
+def test_bucket_size_change_starts_over(db):
+    start = aligned(120, 1800)
+    db.spread_col.insert_many(spread_rows(start, 12))
+    assert len(db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=90)) == 3
+    # 1H over 200 buckets: 18 s buckets
+    series = db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=200)
+    db.history_cache.clear()
+    assert_same_series(series, db.get_spread_history('Binance', 'BTC/USDT', '1H', buckets=200))
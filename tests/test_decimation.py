@@ -0,0 +1,105 @@
+import numpy as np
+
+from services.time_series import TimeSeries
+from ui.trend_graph.decimation import (
+    POINTS_PER_PIXEL, lttb_indices, minmax_indices, decimate_for_chart, settled_version, decimate_live
+)
+
+def reference_lttb(x, y, threshold):
+    """
+    Textbook LTTB, one bucket at a time, to check the vectorized version against.
+    """
+    n = len(x)
+    chosen, a = [0], 0
+    bounds = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    for i in range(threshold - 2):
+        s, e = bounds[i], bounds[i + 1]
+        if i + 1 < threshold - 2:
+            ns, ne = bounds[i + 1], bounds[i + 2]
+            cx, cy = x[ns:ne].mean(), y[ns:ne].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = [abs((x[a] - cx) * (y[j] - y[a]) - (x[a] - x[j]) * (cy - y[a])) for j in range(s, e)]
+        a = s + int(np.argmax(area))
+        chosen.append(a)
+    return chosen + [n - 1]
+
+def spreads(start_ms, count, step_ms=1_000, seed=1):
+    rng = np.random.default_rng(seed)
+    ts = start_ms + np.arange(count) * step_ms
+    bid = 100 + np.cumsum(rng.normal(0, 0.1, count))
+    ask = bid + rng.uniform(0.01, 0.2, count)
+    return TimeSeries(ts, bid=bid, ask=ask, spread=(ask - bid) / bid * 100)
+
+def test_lttb_matches_the_reference_and_keeps_the_endpoints():
+    rng = np.random.default_rng(7)
+    x = np.sort(rng.uniform(0, 500, 2_000))
+    y = np.cumsum(rng.normal(0, 1, 2_000))
+    idx = lttb_indices(x, y, 200)
+    assert len(idx) == 200
+    assert idx[0] == 0 and idx[-1] == 1_999
+    assert np.all(np.diff(idx) > 0)
+    assert idx.tolist() == reference_lttb(x, y, 200)
+
+def test_lttb_leaves_short_series_alone():
+    x = np.arange(10.0)
+    assert lttb_indices(x, x, 50).tolist() == list(range(10))
+    assert lttb_indices(x, x, 2).tolist() == list(range(10))
+
+def test_minmax_keeps_each_columns_extremes():
+    px = np.array([0.1, 0.4, 0.9, 1.2, 1.5, 3.0])
+    values = np.array([5.0, 1.0, 9.0, 4.0, 4.0, 2.0])
+    assert minmax_indices(px, values).tolist() == [1, 2, 3, 5]
+    assert minmax_indices(np.array([]), np.array([])).tolist() == []
+    # A flat column keeps one row; a NaN column keeps none
+    assert minmax_indices(px, np.array([2.0, 2.0, 2.0, 4.0, 1.0, 2.0])).tolist() == [0, 3, 4, 5]
+    assert minmax_indices(px, np.array([np.nan, np.nan, np.nan, 4.0, 1.0, 2.0])).tolist() == [3, 4, 5]
+
+def test_short_lines_are_not_decimated():
+    db = spreads(0, 150)
+    chart = decimate_for_chart(TimeSeries.empty('price'), db, 0, 150_000, 100, is_main=True)
+    assert len(chart['bid']) == len(chart['ask']) == 150
+
+def test_decimate_for_chart_fits_the_width():
+    db = spreads(0, 10_000)
+    api = TimeSeries(db.ts, price=db['bid'])
+    width = 100
+    chart = decimate_for_chart(api, db, 0, 10_000_000, width, is_main=True)
+    assert len(chart['db']) <= 2 * width
+    for name in ('bid', 'ask'):
+        line = chart[name]
+        assert len(line) <= width * POINTS_PER_PIXEL + 2
+        assert line.ts[0] == db.ts[0] and line.ts[-1] == db.ts[-1]
+        assert np.all(np.diff(line.ts) > 0)
+        assert line[name].min() == db[name].min() and line[name].max() == db[name].max()
+    assert chart['db']['spread'].max() == db['spread'].max()
+    assert chart['db']['spread'].min() == db['spread'].min()
+    assert len(chart['api']) == len(api)
+
+    other = decimate_for_chart(api, db, 0, 10_000_000, width, is_main=False)
+    assert len(other['db']) == 0 and len(other['bid']) == 0
+    assert len(other['api']) == width * POINTS_PER_PIXEL
+
+def test_settled_version_ignores_rows_after_the_settle_point():
+    grown = spreads(0, 1_200)
+    db = grown[:1_000]
+    api = TimeSeries.empty('price')
+    version = settled_version(api, db, 0, 600_000)
+
+    changed = grown.copy()
+    changed['bid'][-1] += 1
+    assert settled_version(api, grown, 0, 600_000) == version
+    assert settled_version(api, changed, 0, 600_000) == version
+
+    edited = db.copy()
+    edited['spread'][100] += 1
+    edited['spread'][599] += 1
+    assert settled_version(api, edited, 0, 600_000) != version
+
+def test_live_lines_start_at_the_last_settled_row():
+    db = spreads(0, 1_000)
+    api = TimeSeries.empty('price')
+    live, prev_mid = decimate_live(api, db, 600_000, 1_000_000, 1_000, is_main=True)
+    assert live['bid'].ts[0] == 599_000
+    assert live['db'].ts[0] == 600_000
+    assert prev_mid == (db['bid'][599] + db['ask'][599]) / 2
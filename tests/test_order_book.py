@@ -0,0 +1,107 @@
+import random
+import pytest
+
+from services.order_book import LocalOrderBook
+
+def make_book(max_depth=500):
+    book = LocalOrderBook('BTC/USDT', max_depth=max_depth)
+    book.apply_snapshot([[100.0, 1.0], [99.0, 2.0], [98.0, 3.0]],
+                        [[101.0, 1.5], [102.0, 2.5], [103.0, 3.5]], seq=10, timestamp=1)
+    return book
+
+def levels(side):
+    return list(zip(side.prices, side.qtys))
+
+def test_snapshot_sorts_sides_best_first():
+    book = LocalOrderBook('BTC/USDT')
+    book.apply_snapshot([[98.0, 3.0], [100.0, 1.0], [99.0, 0.0]], [[103.0, 3.5], [101.0, 1.5]], seq=1)
+    assert levels(book.bids) == [(100.0, 1.0), (98.0, 3.0)]
+    assert levels(book.asks) == [(101.0, 1.5), (103.0, 3.5)]
+    assert book.synced
+
+def test_delta_updates_inserts_and_deletes_levels():
+    book = make_book()
+    assert book.apply_delta([[99.0, 0.0], [99.5, 4.0]], [[101.0, 0.5]], first_seq=11, last_seq=11, timestamp=2)
+    assert levels(book.bids) == [(100.0, 1.0), (99.5, 4.0), (98.0, 3.0)]
+    assert levels(book.asks)[0] == (101.0, 0.5)
+    assert book.seq == 11
+    assert book.timestamp == 2
+
+def test_delta_already_covered_by_snapshot_is_ignored():
+    book = make_book()
+    assert book.apply_delta([[100.0, 9.0]], [], first_seq=9, last_seq=10)
+    assert levels(book.bids)[0] == (100.0, 1.0)
+    assert book.seq == 10
+
+def test_delta_overlapping_snapshot_is_applied():
+    book = make_book()
+    assert book.apply_delta([[100.0, 9.0]], [], first_seq=8, last_seq=12)
+    assert levels(book.bids)[0] == (100.0, 9.0)
+    assert book.seq == 12
+
+def test_gap_unsyncs_until_next_snapshot():
+    book = make_book()
+    assert not book.apply_delta([[100.0, 9.0]], [], first_seq=12, last_seq=12)
+    assert not book.synced
+    assert levels(book.bids)[0] == (100.0, 1.0)
+
+    # Deltas after the gap are dropped, even contiguous ones
+    assert not book.apply_delta([[100.0, 7.0]], [], first_seq=13, last_seq=13)
+    assert levels(book.bids)[0] == (100.0, 1.0)
+
+    book.apply_snapshot([[100.0, 5.0]], [[101.0, 5.0]], seq=20)
+    assert book.synced
+    assert book.apply_delta([[100.0, 6.0]], [], first_seq=21, last_seq=21)
+    assert levels(book.bids) == [(100.0, 6.0)]
+
+def test_delta_before_any_snapshot_asks_for_one():
+    book = LocalOrderBook('BTC/USDT')
+    assert not book.apply_delta([[100.0, 1.0]], [], first_seq=1, last_seq=1)
+    assert len(book.bids) == 0
+
+def test_max_depth_keeps_the_best_levels():
+    book = make_book(max_depth=3)
+    book.apply_delta([[99.5, 1.0]], [[100.5, 1.0]])
+    assert [p for p, _ in levels(book.bids)] == [100.0, 99.5, 99.0]
+    assert [p for p, _ in levels(book.asks)] == [100.5, 101.0, 102.0]
+    # Worse than the deepest kept level: dropped
+    book.apply_delta([[90.0, 1.0]], [])
+    assert len(book.bids) == 3 and 90.0 not in book.bids.prices
+
+def test_top_is_a_view_of_the_best_levels():
+    book = make_book()
+    top = book.top(2)
+    assert list(top['bids']) == [(100.0, 1.0), (99.0, 2.0)]
+    assert top['asks'][-1] == (102.0, 2.5)
+    assert top['asks'][:1] == [(101.0, 1.5)]
+    with pytest.raises(IndexError):
+        top['bids'][2]
+
+def test_analytics_follow_deltas_like_a_fresh_book():
+    rng = random.Random(7)
+    book = LocalOrderBook('BTC/USDT', max_depth=50)
+    book.apply_snapshot([[100.0 - i * 0.5, rng.uniform(0.1, 3)] for i in range(40)],
+                        [[100.5 + i * 0.5, rng.uniform(0.1, 3)] for i in range(40)])
+    for _ in range(300):
+        book.analytics.summary(notional=500)
+        side = rng.choice(['bids', 'asks'])
+        price = (100.0 - rng.randint(0, 45) * 0.5) if side == 'bids' else (100.5 + rng.randint(0, 45) * 0.5)
+        qty = rng.choice([0.0, rng.uniform(0.1, 3)])
+        book.apply_delta([[price, qty]] if side == 'bids' else [], [[price, qty]] if side == 'asks' else [])
+
+    fresh = LocalOrderBook('BTC/USDT', max_depth=50)
+    fresh.apply_snapshot(levels(book.bids), levels(book.asks))
+    got, want = book.analytics.summary(notional=500), fresh.analytics.summary(notional=500)
+    assert got['mid'] == want['mid']
+    assert got['imbalance'] == pytest.approx(want['imbalance'])
+    for pct in want['depth']:
+        assert got['depth'][pct] == pytest.approx(want['depth'][pct])
+    assert got['slippage'] == pytest.approx(want['slippage'])
+
+def test_slippage_walks_the_book():
+    book = LocalOrderBook('BTC/USDT')
+    book.apply_snapshot([[99.0, 1.0]], [[100.0, 1.0], [110.0, 1.0]])
+    slip = book.analytics.slippage(155.0)
+    # 100 USDT at 100 plus 55 USDT at 110: 1.5 units for 155
+    assert slip['buy_vwap'] == pytest.approx(155.0 / 1.5)
+    assert slip['sell'] is None
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+TARGETS = [
+    {'exchange': 'Binance', 'symbol': 'BTC/USDT'},
+    {'exchange': 'Upbit', 'symbol': 'BTC/KRW'},
+    {'exchange': 'Binance', 'symbol': 'ETH/USDT'},
+    {'exchange': 'Upbit', 'symbol': 'XRP/KRW'},
+    {'exchange': 'Binance', 'symbol': 'SOL/USDT'},
+]
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv('FAKE_EXCHANGE', 'latency=0,jitter=0')
+    from services.price_service import PriceService
+    return PriceService()
+
+def requests(service, name):
+    return service.exchanges.get(name).stats['requests']
+
+def scenario(service, call):
+    """
+    Runs call(service) and the request count per exchange, read before
+    close_all drops the clients.
+    """
+    async def body():
+        try:
+            result = await call(service)
+            return result, {name: requests(service, name) for name in ('Binance', 'Upbit')}
+        finally:
+            await service.close_all()
+    return asyncio.run(body())
+
+def test_fetch_all_tickers_makes_one_request_per_exchange(service):
+    tickers, counts = scenario(service, lambda s: s.fetch_all_tickers(TARGETS))
+    assert [t['symbol'] for t in tickers] == [t['symbol'] for t in TARGETS]
+    assert all(t['last'] > 0 for t in tickers)
+    assert counts == {'Binance': 1, 'Upbit': 1}
+
+def test_get_tickers_falls_back_to_single_tickers(service):
+    service.exchanges.get('Binance').has['fetchTickers'] = False
+    tickers, counts = scenario(service, lambda s: s.get_tickers('Binance', ['BTC/USDT', 'ETH/USDT', 'BTC/USDT']))
+    assert list(tickers) == ['BTC/USDT', 'ETH/USDT']
+    assert all('error' not in t for t in tickers.values())
+    assert counts['Binance'] == 2
+
+def test_failed_bulk_request_falls_back_to_single_tickers(service):
+    async def broken(symbols=None, params={}):
+        raise RuntimeError("503 Service Unavailable")
+    service.exchanges.get('Binance').fetch_tickers = broken
+
+    tickers, counts = scenario(service, lambda s: s.get_tickers('Binance', ['BTC/USDT', 'ETH/USDT']))
+    assert [t['symbol'] for t in tickers.values()] == ['BTC/USDT', 'ETH/USDT']
+    assert counts['Binance'] == 2
+
+def test_polling_slots_share_one_ticker_request_per_exchange(service, monkeypatch):
+    from services.stream_service import MarketStream
+    monkeypatch.setattr(service, 'has_stream', lambda exchange: False)
+    targets = [{**t, 'key': str(i)} for i, t in enumerate(TARGETS)]
+    calls = []
+    pushed = {}
+
+    async def body():
+        for name in ('Binance', 'Upbit'):
+            client = service.exchanges.get(name)
+            fetch_tickers = client.fetch_tickers
+
+            async def counted(symbols=None, params={}, name=name, fetch_tickers=fetch_tickers):
+                calls.append((name, sorted(symbols)))
+                return await fetch_tickers(symbols, params)
+            client.fetch_tickers = counted
+            client.fetch_ticker = None
+
+        stream = MarketStream(service, lambda key, kind, payload: pushed.setdefault(kind, {}).__setitem__(key, payload),
+                              poll_interval=0.1)
+        try:
+            stream.start(targets, with_rate=False)
+            await asyncio.sleep(0.35)
+        finally:
+            stream.stop()
+            await service.close_all()
+
+    asyncio.run(body())
+    assert sorted(pushed['ticker']) == [t['key'] for t in targets]
+    assert all('error' not in t for t in pushed['ticker'].values())
+    # Every poll tick asks each exchange once, for all of its slots
+    by_exchange = {}
+    for t in TARGETS:
+        by_exchange.setdefault(t['exchange'], set()).add(t['symbol'])
+    assert calls
+    for name, symbols in calls:
+        assert symbols == sorted(by_exchange[name])
+    assert abs(sum(1 for c in calls if c[0] == 'Binance') - sum(1 for c in calls if c[0] == 'Upbit')) <= 1
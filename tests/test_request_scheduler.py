@@ -0,0 +1,94 @@
+import asyncio
+
+from services.request_scheduler import RequestScheduler, TokenBucket, INTERACTIVE, BACKGROUND
+
+def test_token_bucket_delay_covers_the_missing_tokens():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.delay_for(1) == 0
+    bucket.take(2)
+    assert 0.09 < bucket.delay_for(1) <= 0.1
+    # A weight above capacity waits for a full bucket, not forever
+    assert bucket.delay_for(5) <= 0.2
+
+def test_identical_requests_in_flight_share_one_call():
+    scheduler = RequestScheduler()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'last': 1.0}
+
+    async def scenario():
+        return await asyncio.gather(*[scheduler.submit('binance', 'ticker', fetch) for _ in range(5)])
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == [{'last': 1.0}] * 5
+    assert scheduler.stats['requests'] == 1
+    assert scheduler.stats['coalesced'] == 4
+
+def test_finished_requests_are_not_reused():
+    scheduler = RequestScheduler()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        return [await scheduler.submit('binance', 'ticker', fetch) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [1, 2, 3]
+
+def test_errors_reach_every_caller():
+    scheduler = RequestScheduler()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("503")
+
+    async def scenario():
+        return await asyncio.gather(*[scheduler.submit('binance', 'ticker', fetch) for _ in range(3)],
+                                    return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert not scheduler.inflight
+
+def queued_order(submissions, promote=None):
+    """
+    Drains a bucket with one token, then submits requests that have to
+    queue, and returns the order the exchange served them in. promote is
+    a key joined again at INTERACTIVE once everything is queued.
+    """
+    scheduler = RequestScheduler()
+    scheduler.configure('binance', 20)
+    scheduler.buckets['binance'].tokens = 0
+    served = []
+
+    def fetch(key):
+        async def call():
+            served.append(key)
+            return key
+        return call
+
+    async def scenario():
+        tasks = [asyncio.ensure_future(scheduler.submit('binance', key, fetch(key), priority=p))
+                 for key, p in submissions]
+        await asyncio.sleep(0)
+        if promote:
+            tasks.append(asyncio.ensure_future(
+                scheduler.submit('binance', promote, fetch(promote), priority=INTERACTIVE)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    return served
+
+def test_interactive_requests_are_served_before_background_ones():
+    served = queued_order([('a', BACKGROUND), ('b', BACKGROUND), ('c', INTERACTIVE), ('d', BACKGROUND)])
+    assert served == ['c', 'a', 'b', 'd']
+
+def test_joining_at_a_higher_priority_promotes_the_shared_request():
+    served = queued_order([('a', BACKGROUND), ('b', BACKGROUND), ('c', BACKGROUND)], promote='c')
+    assert served == ['c', 'a', 'b']
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from services.time_series import TimeSeries, CANDLE_COLUMNS
+
+def series(count):
+    return TimeSeries(np.arange(count) * 1_000, price=np.arange(count) * 1.5)
+
+def test_columns_must_match_the_timestamps():
+    with pytest.raises(ValueError):
+        TimeSeries([1, 2, 3], price=[1.0, 2.0])
+
+def test_from_candles_and_from_rows():
+    candles = TimeSeries.from_candles([[0, 1, 3, 0.5, 2, 10], [60_000, 2, 4, 1, 3, 20]])
+    assert candles.columns == CANDLE_COLUMNS
+    assert candles.row(1) == {'ts': 60_000, 'open': 2.0, 'high': 4.0, 'low': 1.0, 'price': 3.0, 'volume': 20.0}
+    assert len(TimeSeries.from_candles([])) == 0
+
+    rows = TimeSeries.from_rows([{'t': 1, 'bid': 2.0}, {'t': 2, 'bid': None}], 't', ('bid', 'ask'))
+    assert rows['bid'].tolist() == [2.0, 0.0]
+    assert rows['ask'].tolist() == [0.0, 0.0]
+
+def test_between_is_inclusive_and_returns_a_view():
+    s = series(10)
+    window = s.between(2_000, 5_000)
+    assert window.ts.tolist() == [2_000, 3_000, 4_000, 5_000]
+    assert np.shares_memory(window['price'], s['price'])
+    assert s.between(8_500).ts.tolist() == [9_000]
+    assert s.before(2_000).ts.tolist() == [0, 1_000]
+    assert s.tail(2).ts.tolist() == [8_000, 9_000]
+
+def test_appending_to_a_view_never_touches_its_parent():
+    s = series(10)
+    view = s[:5]
+    view.append(99_000, price=-1.0)
+    assert s.ts[5] == 5_000 and s['price'][5] == 7.5
+    assert view.last_ts() == 99_000 and len(view) == 6
+
+def test_append_and_extend_grow_the_buffers():
+    s = TimeSeries.empty('bid', 'ask')
+    for i in range(100):
+        s.append(i, bid=i, ask=i + 1)
+    s.extend(TimeSeries([100, 101], bid=[1.0, 2.0]))
+    assert len(s) == 102
+    assert s.ts.tolist() == list(range(102))
+    assert np.isnan(s['ask'][-1])
+    assert s.nbytes == 102 * 24
+
+def test_drop_head_keeps_earlier_views_valid():
+    s = series(10)
+    head = s[:3]
+    s.drop_head(4)
+    assert s.ts[0] == 4_000 and len(s) == 6
+    assert head.ts.tolist() == [0, 1_000, 2_000]
+    s.drop_head(100)
+    assert len(s) == 0 and s.last_ts() is None
+
+def test_concat_skips_empty_parts():
+    a, b = series(3), TimeSeries([5_000], price=[9.0])
+    empty = TimeSeries.empty('price')
+    joined = TimeSeries.concat([empty, a, empty, b])
+    assert joined.ts.tolist() == [0, 1_000, 2_000, 5_000]
+    assert TimeSeries.concat([empty, a]) is a
+    assert TimeSeries.concat([empty, empty]) is empty